@@ -12,8 +12,10 @@ from model import db        # SQLAlchemy db instance
 from .routes import register_blueprints
 from .routes.version_routes import bp as system_info_bp
 from .utils.utils import get_db_uri, get_port
+from .utils import access_counter, config_reload, fast_path, metrics, request_timing
 from .utils.startup import app_startup_banner
 from .CONSTANTS import __version__, get_semver
+from . import version
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -24,7 +26,8 @@ def create_app():
     # Initialize Flask app
     app = Flask(__name__)
 
-    # Expose version in templates
+    # Expose version in templates (resolved once; optionally refreshed from git in the background)
+    version.set_refresh_interval(config.get_configuration().get('version', {}).get('refresh_seconds', 0))
     app.jinja_env.globals['version'] = get_semver()
 
     # Display a custom startup banner
@@ -51,13 +54,25 @@ def create_app():
     try:
         db.init_app(app)
         migrate = Migrate(app, db)
+        access_counter.init_app(app)
         logger.info("✅ Database initialized and migration support enabled.")
     except Exception as e:
         logger.exception("❌ Failed to initialize database.")
 
+    # Server-Timing and on-demand profiling; first, so its timer wraps the other request hooks
+    request_timing.init_app(app)
+
+    # Pick up config changes made by other workers or on disk
+    config_reload.init_app(app)
+
     # Register application routes
     register_blueprints(app)
 
+    # Serve cached redirects without going through Flask (opt-in, see fast_path.enabled)
+    fast_path.init_app(app)
+    # Prometheus metrics (optional dependency); wraps the fast path so its requests are counted too
+    metrics.init_app(app)
+
     # Set the app port inside context
     with app.app_context():
         app.config['port'] = get_port()
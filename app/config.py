@@ -3,12 +3,83 @@ import os
 import logging
 import secrets
 import string
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import MappingProxyType
+
 import redis
 
+try:
+    import fcntl
+except ImportError:  # Windows: a single dev server, no workers to coordinate
+    fcntl = None
+
+
+def freeze(value):
+    """Deep read-only copy of a JSON value: dicts become mappingproxies, lists become tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Plain (mutable, JSON-serialisable) copy of a frozen config value."""
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+def _as_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    Immutable view of redirect.config.json. It is never modified: a reload or save
+    builds a new snapshot and swaps it in, so readers need no lock.
+    """
+    data: Mapping
+    mtime_ns: int = 0
+    port: int = 80
+    auto_redirect_delay: int = 0
+    delete_requires_password: bool = True
+    log_level: str = "INFO"
+    database: str = None
+    upstreams: tuple = ()
+
+    @classmethod
+    def from_dict(cls, cfg, mtime_ns=0):
+        return cls(
+            data=freeze(cfg),
+            mtime_ns=mtime_ns,
+            port=_as_int(cfg.get('port'), 80) or 80,
+            auto_redirect_delay=_as_int(cfg.get('auto_redirect_delay'), 0),
+            delete_requires_password=bool(cfg.get('delete_requires_password', True)),
+            log_level=str(cfg.get('log_level') or 'INFO'),
+            database=cfg.get('database'),
+            upstreams=freeze(cfg.get('upstreams') or []),
+        )
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
 
 class Config:
     """Handles application configurations."""
 
+    # Randomly generated on first start and persisted; never part of the defaults
+    SECRET_KEYS = ('admin_password',)
+
     def __init__(self):
         """Initialize configuration settings."""
         # First setup paths to access config
@@ -17,24 +88,43 @@ class Config:
         self.DATA_DIR = os.path.join(self.PROJECT_ROOT, 'data')
         os.makedirs(self.DATA_DIR, exist_ok=True)
         self.CONFIG_FILE = os.path.join(self.DATA_DIR, 'redirect.config.json')
+        self.LOCK_FILE = f"{self.CONFIG_FILE}.lock"
         # Detect Docker environment
         self.RUNNING_IN_DOCKER = os.path.exists('/.dockerenv') or os.getenv('DOCKER_CONTAINER') is not None
         self.start_mode = "Gunicorn MODE"
-        # Load basic config (used for logging level)
-        temp_cfg = self.load_raw_config()
-        self.ensure_config_defaults(temp_cfg)
+        # Load basic config (used for logging level). Secrets missing from the file are generated and
+        # written here, once, under the file lock: with preload this runs before gunicorn forks, and
+        # without it the first worker writes them and the others read them back.
+        with self._file_lock():
+            temp_cfg = self.load_raw_config()
+            self.ensure_config_defaults(temp_cfg)
         self.setup_logging(temp_cfg.get("log_level", "INFO"))
 
 
 
         # Now reload config fully (including Redis, etc.)
         self.logger.debug(f"Config file path: {self.CONFIG_FILE}")
-        self.cfg = temp_cfg
+        self._write_lock = threading.RLock()
+        self._reload_listeners = []
+        self._save_listeners = []
+        self.snapshot = ConfigSnapshot.from_dict(temp_cfg, self._file_mtime_ns())
 
+        # Redis configuration
+        self.redis_client = None
+        self.redis_binary_client = None  # Same server, bytes in/out (binary cache records)
+        self._apply_redis_settings()
+        self.database = self.snapshot.database
 
+    @property
+    def cfg(self):
+        return self.snapshot.data
 
-        # Redis configuration
-        self.redis_cfg = self.cfg.get('redis', {})
+    def get_configuration(self):
+        """Returns the current read-only config mapping (see `snapshot` for typed fields)."""
+        return self.snapshot.data
+
+    def _apply_redis_settings(self):
+        self.redis_cfg = self.snapshot.get('redis', {})
         self.redis_enabled = self.redis_cfg.get('enabled', False)
         self.redis_host = self.redis_cfg.get('host', 'redis')
         try:
@@ -42,11 +132,40 @@ class Config:
         except ValueError:
             self.logger.error("Invalid Redis port in config, defaulting to 6379.")
             self.redis_port = 6379
-        self.redis_client = None
-        self.database=self.cfg.get('database')
 
-    def get_configuration(self):
-        return self.cfg
+    def _file_mtime_ns(self):
+        try:
+            return os.stat(self.CONFIG_FILE).st_mtime_ns
+        except OSError:
+            return 0
+
+    def add_reload_listener(self, listener):
+        """Registers `listener()`, called in this process after every config reload."""
+        self._reload_listeners.append(listener)
+
+    def add_save_listener(self, listener):
+        """Registers `listener()`, called in this process after the config file was saved."""
+        self._save_listeners.append(listener)
+
+    def _notify(self, listeners):
+        for listener in listeners:
+            try:
+                listener()
+            except Exception:
+                self.logger.exception("❌ Config listener failed.")
+
+    @contextmanager
+    def _file_lock(self):
+        """Serializes writers of the config file across processes (workers, CLI commands)."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.LOCK_FILE, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
 
     def setup_logging(self, log_level_str):
         """Set up logging to print logs to the console with dynamic level."""
@@ -63,20 +182,18 @@ class Config:
         if not os.path.exists(self.CONFIG_FILE) or os.path.getsize(self.CONFIG_FILE) == 0:
             try:
                 default = self.get_default_config()
+                self._fill_missing_secrets(default)
                 with open(self.CONFIG_FILE, 'w') as f:
                     json.dump(default, f, indent=2)
-                print(f"\n🔐 Admin Password (save this): {default['admin_password']}")
                 return default
             except IOError:
                 return {}
+        return self._read_config_file()
 
+    def _read_config_file(self):
         try:
             with open(self.CONFIG_FILE, 'r') as f:
-                config_data = json.load(f)
-                # Only print the password if the key is missing (first-time setup)
-                if 'admin_password' not in config_data:
-                    print(f"\n🔐 Admin Password (save this): {config_data.get('admin_password', '[NOT SET]')}")
-                return config_data
+                return json.load(f)
         except (IOError, json.JSONDecodeError):
             return {}
 
@@ -110,16 +227,23 @@ class Config:
                 socket_connect_timeout=1
             )
             self.redis_client.ping() 
+            self.redis_binary_client = redis.Redis(
+                host=self.redis_host,
+                port=self.redis_port,
+                socket_connect_timeout=1
+            )
 
             self.logger.info(f"✅ Redis connected at {self.redis_host}:{self.redis_port}")
         except redis.exceptions.ConnectionError as e:
             self.logger.warning(f"⚠️ Redis connection failed: {e}")
             self.redis_enabled = False
             self.redis_client = None
+            self.redis_binary_client = None
         except Exception as e:
             self.logger.exception("❌ Unexpected error initializing Redis.")
             self.redis_enabled = False
             self.redis_client = None
+            self.redis_binary_client = None
 
     def reconnect_redis(self):
         """Attempt to reconnect to Redis (e.g., after failure)."""
@@ -128,27 +252,81 @@ class Config:
         self.logger.debug("🔄 Attempting Redis reconnection...")
         self.init_redis()
 
-    def get_default_config(self):
-        """Generate default config values including secure admin password."""
+    def generate_secrets(self):
+        """Fresh random values for the secret keys; only ever written once, see _fill_missing_secrets."""
         random_pwd = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
+        return {"admin_password": random_pwd}
+
+    def _fill_missing_secrets(self, cfg):
+        """Adds generated secrets for keys missing from `cfg`. Returns True if any were added."""
+        missing = {key: value for key, value in self.generate_secrets().items() if key not in cfg}
+        cfg.update(missing)
+        if 'admin_password' in missing:
+            print(f"\n🔐 Admin Password (save this): {missing['admin_password']}")
+        return bool(missing)
+
+    def get_default_config(self):
+        """
+        Default config values. Deterministic, so every worker merges the same values; secrets
+        (see generate_secrets) are not defaults and only come from the config file.
+        """
         redis_default = self.get_redis_default_config()
 
         _default_config = {
+            "access_count": {
+                "write_behind": True,
+                "flush_interval_seconds": 5,
+                "flush_threshold": 500
+            },
+            "access_log": {
+                "enabled": True,
+                "sample_rate": 1.0
+            },
+            "config_reload": {
+                "check_interval_seconds": 2
+            },
             "config_version": 1,
             "port": 80,
             "auto_redirect_delay": 3,
             "database": "sqlite:///" + os.path.join(self.DATA_DIR, "redirect.db"),
-            "admin_password": random_pwd,
             "delete_requires_password": True,
+            "fast_path": {
+                "enabled": False
+            },
             "upstreams": [],
+            "local_cache": {
+                "enabled": True,
+                "max_entries": 10000,
+                "ttl_seconds": 300
+            },
             "log_level": "INFO",
+            "metrics": {
+                "enabled": True
+            },
             "redis": {
                 "enabled": True,
                 "host": redis_default.get("host"),
                 "port": redis_default.get("port")
             },
+            "redis_keys": {
+                "ttl_seconds": 86400
+            },
+            "request_timing": {
+                "server_timing": False
+            },
             "upstream_cache": {
-                "enabled": True
+                "enabled": True,
+                "freshness_seconds": 86400
+            },
+            "upstream_check": {
+                "mode": "parallel"
+            },
+            "upstream_negative_cache": {
+                "enabled": True,
+                "ttl_seconds": 300
+            },
+            "version": {
+                "refresh_seconds": 0
             }
         }
         # Sort the dictionary by keys (case-insensitive)
@@ -157,8 +335,8 @@ class Config:
 
 
     def to_dict(self):
-        """Expose config for external usage like in templates."""
-        return self.cfg
+        """Expose config for external usage like in templates (a mutable copy)."""
+        return thaw(self.snapshot.data)
     
     def ensure_config_defaults(self, config):
         """
@@ -167,6 +345,7 @@ class Config:
         """
         default = self.get_default_config()
         changed = self._merge_config_recursive(config, default)
+        changed = self._fill_missing_secrets(config) or changed
 
         # If config updated, write back to file
         if changed:
@@ -195,8 +374,6 @@ class Config:
 
     def update_from_flat_dict(self, new_data):
         """Update config from a flat dict (supports dot notation for nested keys), then save and reload."""
-        # Update self.cfg in-place so changes persist
-        current = self.cfg
         readonly_keys = {'config_version', 'admin_password'}
         def set_nested(cfg, key_path, value):
             keys = key_path.split('.')
@@ -215,50 +392,88 @@ class Config:
                     d[keys[-1]] = value
             else:
                 d[keys[-1]] = value
-        for k, v in new_data.items():
-            if k in readonly_keys:
-                continue
-            if '.' in k:
-                set_nested(current, k, v)
-            else:
-                if k in current:
-                    if isinstance(current[k], bool):
-                        current[k] = v.lower() == 'true' if isinstance(v, str) else bool(v)
-                    elif isinstance(current[k], int):
-                        try:
-                            current[k] = int(v)
-                        except Exception:
+
+        def apply(current):
+            for k, v in new_data.items():
+                if k in readonly_keys:
+                    continue
+                if '.' in k:
+                    set_nested(current, k, v)
+                else:
+                    if k in current:
+                        if isinstance(current[k], bool):
+                            current[k] = v.lower() == 'true' if isinstance(v, str) else bool(v)
+                        elif isinstance(current[k], int):
+                            try:
+                                current[k] = int(v)
+                            except Exception:
+                                current[k] = v
+                        else:
                             current[k] = v
                     else:
                         current[k] = v
-                else:
-                    current[k] = v
-        # Sort keys for consistency
-        sorted_config = dict(sorted(current.items(), key=lambda x: x[0].lower()))
-        with open(self.CONFIG_FILE, 'w') as f:
-            json.dump(sorted_config, f, indent=2)
-        # Update self.cfg to sorted version
-        self.cfg = sorted_config
-        # Optionally re-init other config-dependent attributes here
+
+        self.save(apply)
         self.logger.info("Config updated successfully.")
-        self.reload()
+
+    def save_values(self, values):
+        """Sets top-level keys and saves the config file."""
+        self.save(lambda cfg: cfg.update(thaw(values)))
+
+    def save(self, mutate):
+        """
+        The only way the config file is written at runtime. `mutate(cfg)` edits a mutable
+        copy of the current config; the result is written atomically, swapped in as the
+        new snapshot and announced to the other workers.
+        """
+        with self._write_lock, self._file_lock():
+            self.reload_if_changed()  # Don't overwrite another worker's save
+            current = thaw(self.snapshot.data)
+            mutate(current)
+            self._fill_missing_secrets(current)
+            # Sort keys for consistency
+            sorted_config = dict(sorted(current.items(), key=lambda x: x[0].lower()))
+            tmp_file = f"{self.CONFIG_FILE}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(sorted_config, f, indent=2)
+            os.replace(tmp_file, self.CONFIG_FILE)
+            self._swap(sorted_config)
+        self._notify(self._save_listeners)
+
+    def reload_if_changed(self):
+        """Reloads the config if the file changed since the current snapshot was read."""
+        if self._file_mtime_ns() != self.snapshot.mtime_ns:
+            self.reload()
+            return True
+        return False
 
     def reload(self):
         """Reload config from disk and update all attributes."""
-        temp_cfg = self.load_raw_config()
-        self.ensure_config_defaults(temp_cfg)
-        self.cfg = temp_cfg
-        self.redis_cfg = self.cfg.get('redis', {})
-        self.redis_enabled = self.redis_cfg.get('enabled', False)
-        self.redis_host = self.redis_cfg.get('host', 'redis')
-        try:
-            self.redis_port = int(self.redis_cfg.get('port', 6379))
-        except ValueError:
-            self.redis_port = 6379
-        self.database = self.cfg.get('database')
-        self.init_redis()
+        with self._write_lock:
+            mtime_ns = self._file_mtime_ns()
+            temp_cfg = self._read_config_file()
+            if not temp_cfg:
+                self.logger.warning("⚠️ Config file empty or unreadable; keeping the current config.")
+                return
+            # Fill in missing keys in memory only; the file is written by explicit saves. Secrets are
+            # never generated here, or each worker would end up with its own: a secret removed from the
+            # file keeps its current value until the next save writes it back.
+            self._merge_config_recursive(temp_cfg, self.get_default_config())
+            for key in self.SECRET_KEYS:
+                if key not in temp_cfg and key in self.snapshot.data:
+                    temp_cfg[key] = self.snapshot.data[key]
+            self._swap(temp_cfg, mtime_ns)
         self.logger.info("Config reloaded from disk.")
 
+    def _swap(self, cfg, mtime_ns=None):
+        old = self.snapshot
+        self.snapshot = ConfigSnapshot.from_dict(cfg, self._file_mtime_ns() if mtime_ns is None else mtime_ns)
+        self.database = self.snapshot.database
+        if old.get('redis') != self.snapshot.get('redis'):
+            self._apply_redis_settings()
+            self.init_redis()
+        self._notify(self._reload_listeners)
+
 config=Config()
 
 def get_config_data():
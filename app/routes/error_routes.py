@@ -3,6 +3,8 @@ from flask import Blueprint,request,jsonify,render_template
 
 import logging
 
+from app.utils import access_log
+
 logger = logging.getLogger(__name__)
 bp = Blueprint('error', __name__)
 
@@ -10,6 +12,8 @@ bp = Blueprint('error', __name__)
 @bp.app_errorhandler(500)
 def handle_500_error(e):
     logger.exception("An unhandled 500 error occurred.")  # Log the exception at ERROR level
+    if request.endpoint == 'redirection.handle_redirect':
+        access_log.log_error(request.path, getattr(e, 'original_exception', None) or e)
     if request.accept_mimetypes['application/json'] >= request.accept_mimetypes['text/html']:
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
     return render_template('500.html'), 500
\ No newline at end of file
@@ -0,0 +1,16 @@
+from flask import Blueprint, Response, jsonify
+
+from app.utils import metrics
+import logging
+
+bp = Blueprint('metrics', __name__)
+logger = logging.getLogger(__name__)
+
+
+# Prometheus scrape target: lookup latency per cache tier, redirects, upstream probes, DB/Redis calls.
+@bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not metrics.is_enabled():
+        return jsonify({'success': False, 'error': 'Metrics are disabled or prometheus_client is not installed.'}), 404
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
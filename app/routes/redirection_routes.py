@@ -1,4 +1,4 @@
-import re
+import time
 from datetime import datetime, timezone
 
 from flask import Blueprint, request, redirect, url_for, render_template
@@ -6,7 +6,7 @@ from flask import Blueprint, request, redirect, url_for, render_template
 from app import CONSTANTS
 from app.routes.routesUtils import login_required
 
-from app.utils import utils
+from app.utils import access_log, metrics, negative_cache, pattern_index, target_template, upstream_revalidation, utils
 import logging
 bp=Blueprint('redirection', __name__)
 logger = logging.getLogger(__name__)
@@ -72,25 +72,27 @@ def edit_redirect(subpath):
 
 @bp.route('/<path:subpath>', methods=['GET'])
 def handle_redirect(subpath):
-    logger.info(f"Attempting to handle redirect for subpath: '{subpath}'")
-    # sanitize  pattern
-    pattern,dynamicProp= utils.destructureSubPath(subpath)
+    started = time.perf_counter()
+    # Per-request logging is lazy debug output; served redirects go to the sampled access log
+    logger.debug("Attempting to handle redirect for subpath: '%s'", subpath)
+    # sanitize  pattern; a namespaced pattern ('team/foo') wins over its first segment
+    pattern,dynamicProp= utils.destructureSubPath(subpath, pattern_index.get_index())
     shortcut, data_source, resp_time = utils.get_shortcut(pattern)
-    print(shortcut,data_source,resp_time)
     if shortcut:
         if (data_source == CONSTANTS.data_source_redirect or data_source == CONSTANTS.data_source_redis) and \
                 shortcut.get(CONSTANTS.KEY_DATA_TYPE) == CONSTANTS.DATA_TYPE_STATIC:
             utils.increment_access_count(subpath)
-            logger.info(
-                f"Redirecting static shortcut: '{subpath}' -> '{shortcut['target']}' (Source: {data_source}, Time: {resp_time:.4f}s)")
+            access_log.log_redirect(subpath, pattern, data_source, shortcut['target'], started)
+            metrics.count_redirect(CONSTANTS.DATA_TYPE_STATIC)
             if utils.get_auto_redirect_delay() > 0:
                 return render_template('redirect.html', target=shortcut['target'], delay=utils.get_auto_redirect_delay(), source=data_source, response_time=resp_time)
             return redirect(shortcut['target'], code=302)
 
         # UPSTREAM _HANDLING :::
         if data_source == CONSTANTS.data_source_upstream and shortcut.get('resolved_url'):
-            logger.info(
-                f"Redirecting upstream shortcut: '{subpath}' -> '{shortcut['resolved_url']}' (Source: {data_source}, Time: {resp_time:.4f}s)")
+            upstream_revalidation.revalidate_if_stale(pattern, shortcut)
+            access_log.log_redirect(subpath, pattern, data_source, shortcut['resolved_url'], started)
+            metrics.count_redirect('upstream')
             if utils.get_auto_redirect_delay() > 0:
                 return render_template('redirect.html', target=shortcut['resolved_url'],
                                        delay=utils.get_auto_redirect_delay(), source=data_source,
@@ -99,30 +101,40 @@ def handle_redirect(subpath):
 
         if (data_source == CONSTANTS.data_source_redirect or data_source == CONSTANTS.data_source_redis) and \
                 shortcut.get(CONSTANTS.KEY_DATA_TYPE) == CONSTANTS.DATA_TYPE_DYNAMIC:
-            target=shortcut['target']
+            template = shortcut.get('template') or target_template.compile_template(shortcut['target'])
 
             if subpath == pattern:
                 example_var = 'yourvalue'
-                example_target = utils.replacePlaceHolders(target, example_var)
-                logger.info(f"Dynamic shortcut '{pattern}' accessed without variable. Showing usage instructions.")
-                return render_template('dynamic_shortcut_usage.html', pattern=pattern, var_name=utils.get_placeholder_vars(target)[0],
+                example_target = template.fill(example_var)
+                logger.debug("Dynamic shortcut '%s' accessed without variable. Showing usage instructions.", pattern)
+                return render_template('dynamic_shortcut_usage.html', pattern=pattern,
+                                       var_name=template.names[0] if template.names else '',
                                        example_target=example_target)
             if subpath.startswith(pattern + "/"):
                 variable = subpath[len(pattern) + 1:]
-                dest_url = re.sub(r"\{\w+\}", variable, target)
+                dest_url = template.expand(variable)
                 utils.increment_access_count(pattern)
-                logger.info(f"Redirecting dynamic shortcut: '{subpath}' -> '{dest_url}' (Source: {data_source})")
+                access_log.log_redirect(subpath, pattern, data_source, dest_url, started)
+                metrics.count_redirect(CONSTANTS.DATA_TYPE_DYNAMIC)
                 if utils.get_auto_redirect_delay() > 0:
                     return render_template('redirect.html', target=dest_url, delay=utils.get_auto_redirect_delay(), source=data_source)
                 return redirect(dest_url, code=302)
 
-    logger.info(f"No direct shortcut found for '{subpath}'. Checking live upstreams.")
+    logger.info("No direct shortcut found for '%s'. Checking live upstreams.", subpath)
     if utils.get_upstreams():
         first_segment = subpath.split('/')[0]
-        logger.debug(f"Redirecting to upstream check UI for first segment: '{first_segment}'")
+        if negative_cache.is_known_miss(first_segment):
+            # Every upstream recently said no: skip the fan-out and offer to create it.
+            negative_cache.count_miss(first_segment)
+            logger.info("'%s' is negatively cached for upstreams. Redirecting to create page.", first_segment)
+            access_log.log_miss(subpath, 'negative_cache')
+            return redirect(url_for('redirection.edit_redirect', subpath=subpath))
+        logger.debug("Redirecting to upstream check UI for first segment: '%s'", first_segment)
+        access_log.log_miss(subpath, 'upstream_check')
         return redirect(url_for('upstream.check_upstreams_ui', pattern=first_segment), code=302)
 
-    logger.info(f"No upstreams configured. Redirecting to create shortcut page for '{subpath}'.")
+    logger.info("No upstreams configured. Redirecting to create shortcut page for '%s'.", subpath)
+    access_log.log_miss(subpath, 'create')
     return redirect(url_for('redirection.edit_redirect', subpath=subpath))
 
 @bp.route('/edit/', methods=['GET', 'POST'])
@@ -1,15 +1,13 @@
-import io
-import json
 import logging  # Import logging
 from datetime import datetime
 import os
 
 from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify, \
-    send_file, flash
+    flash, Response, send_file, stream_with_context
 from flask import session as flask_session
 
 from app.routes.routesUtils import login_required
-from app.utils import utils
+from app.utils import import_stream, redirect_export, redis_scan, request_timing, upstream_revalidation, utils
 from model.redirect import Redirect  # Import Redirect model for export/import
 
 # Get a logger instance for this module
@@ -51,6 +49,7 @@ def dashboard():
             latest_shortcuts = Redirect.query.order_by(Redirect.created_at.desc()).limit(count).all()
         else:
             latest_shortcuts = Redirect.query.order_by(Redirect.updated_at.desc()).limit(count).all()
+        latest_shortcuts = utils.shortcuts_with_live_counts(latest_shortcuts)
         logger.debug(f"Retrieved {len(latest_shortcuts)} latest shortcuts for dashboard.")
     except Exception as e:
         logger.exception("Failed to retrieve latest shortcuts for dashboard.")
@@ -93,29 +92,23 @@ def tutorial():
 @bp.route('/admin/export-redirects')
 @login_required
 def admin_export_redirects():
-    redirects = Redirect.query.all()
-    exported_data = []
-    for r in redirects:
-        exported_data.append({
-            'id': r.id,
-            'pattern': r.pattern,
-            'type': r.type,
-            'target': r.target,
-            'access_count': r.access_count,
-            'created_at': r.created_at,
-            'updated_at': r.updated_at,
-            'created_ip': r.created_ip,
-            'updated_ip': r.updated_ip
-        })
-
-    buf = io.BytesIO(json.dumps(exported_data, indent=2).encode('utf-8'))
-    buf.seek(0)
+    # ?format=json (default, importable) | ndjson | csv, and ?gzip=1 to compress the stream
+    fmt = request.args.get('format', 'json').lower()
+    compress = request.args.get('gzip') in ('1', 'true')
+    try:
+        mimetype, extension, chunks = redirect_export.export_redirects(fmt, compress=compress)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
     timestamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
-    filename = f'redirects-{timestamp}.json'
-    logger.info(f"Exported {len(exported_data)} redirects to {filename}.")
-    return send_file(buf, mimetype='application/json', as_attachment=True, download_name=filename)
+    filename = f'redirects-{timestamp}.{extension}'
+    logger.info(f"Streaming redirects export to {filename}.")
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 
+IMPORT_EXTENSIONS = ('.json', '.ndjson', '.jsonl', '.json.gz', '.ndjson.gz', '.jsonl.gz')
+
 
 @bp.route('/admin/import-redirects', methods=['GET', 'POST'])
 @login_required
@@ -123,15 +116,19 @@ def admin_import_redirects():
     error = None
     success = None
     if request.method == 'POST':
-        file = request.files.get('file')
-        if file and file.filename.endswith('.json'):
+        # The multipart body is decoded straight from the request stream instead of request.files,
+        # which would spool the whole upload to a temporary file before the first row is written
+        file = None
+        boundary = request.mimetype_params.get('boundary')
+        if request.mimetype == 'multipart/form-data' and boundary:
             try:
-                # Read file content first
-                file_content = file.read()
-                data = json.loads(file_content)
-
-                # Call the utility function
-                import_result = utils.import_redirects_from_json(data)
+                file = import_stream.open_multipart_file(request.stream, boundary)
+            except ValueError as e:
+                logger.warning(f"Import failed: unreadable multipart upload: {e}")
+        if file and file.filename.lower().endswith(IMPORT_EXTENSIONS):
+            try:
+                # Parsed incrementally as it is uploaded; rows are written in chunks as they are read
+                import_result = utils.import_redirects_from_stream(file)
 
                 if import_result['success']:
                     success = import_result['message']
@@ -140,14 +137,11 @@ def admin_import_redirects():
                     error = import_result['message']
                     logger.error(f"Admin import operation failed: {error}")
 
-            except json.JSONDecodeError as e:
-                error = f'Import failed: Invalid JSON file content: {e}'
-                logger.error(f"Import failed due to JSONDecodeError: {e}")
             except Exception as e:
                 error = f'Import failed: An unexpected error occurred during file processing: {e}'
                 logger.exception(f"Unexpected error during file processing for redirect import.")
         else:
-            error = 'Please upload a valid .json file.'
+            error = 'Please upload a valid .json or .ndjson file (optionally .gz compressed).'
             logger.warning("Import failed: No file or invalid file type uploaded.")
 
     logger.debug("Rendering admin import/export page.")
@@ -170,20 +164,22 @@ def enable_r_instructions():
 @bp.route('/admin/redis-cache', methods=['GET'])
 @login_required
 def admin_redis_cache():
-    redis_keys = []
-    redis_values = {}
+    # Browsed with SCAN a page at a time (never KEYS); ?prefix= narrows the match, ?cursor= continues
+    prefix = request.args.get('prefix', '')
+    cursor = request.args.get('cursor', 0, type=int)
+    count = request.args.get('count', redis_scan.DEFAULT_PAGE_SIZE, type=int)
+    entries = []
+    next_cursor = 0
     error = None
     if utils.config.redis_enabled and utils.config.redis_client:
         try:
-            redis_keys = utils.config.redis_client.keys('*')
-            for k in redis_keys:
-                try:
-                    redis_values[k] = utils.config.redis_client.get(k)
-                except Exception:
-                    redis_values[k] = '[Error reading value]'
+            keys, next_cursor = redis_scan.scan_page(utils.config.redis_client, redis_scan.prefix_match(prefix),
+                                                     cursor=cursor, count=count)
+            entries = redis_scan.describe_keys(utils.config.redis_client, keys)
         except Exception as e:
             error = str(e)
-    return render_template('admin_redis_cache.html', redis_keys=redis_keys, redis_values=redis_values, error=error)
+    return render_template('admin_redis_cache.html', entries=entries, prefix=prefix, cursor=cursor,
+                           next_cursor=next_cursor, count=count, error=error)
 
 @bp.route('/admin/redis-cache/delete', methods=['POST'])
 @login_required
@@ -194,17 +190,46 @@ def admin_redis_cache_delete():
     try:
         if utils.config.redis_enabled and utils.config.redis_client:
             if key == '*':
-                keys = utils.config.redis_client.keys('*')
-                if keys:
-                    utils.config.redis_client.delete(*keys)
+                # Everything under ?prefix= (or the whole database), SCANned and UNLINKed in batches
+                match = redis_scan.prefix_match(request.form.get('prefix', ''))
+                removed = redis_scan.unlink_matching(utils.config.redis_client, match)
+                logger.info(f"Admin deleted {removed} Redis keys matching '{match}'.")
             else:
-                utils.config.redis_client.delete(key)
-            return jsonify({'success': True})
+                removed = utils.config.redis_client.unlink(key)
+            return jsonify({'success': True, 'deleted': removed})
         else:
             return jsonify({'success': False, 'error': 'Redis not enabled'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Admin: Hit/miss counters of this worker's in-process shortcut cache
+@bp.route('/admin/local-cache-stats', methods=['GET'])
+@login_required
+def admin_local_cache_stats():
+    return jsonify({'success': True, 'pid': os.getpid(), 'shortcut_cache': utils.get_local_cache_stats(),
+                    'upstream_revalidation': upstream_revalidation.stats()})
+
+# Admin: Request profiles recorded with ?_profile=1 (or the X-Profile header) while logged in
+@bp.route('/admin/profiles', methods=['GET'])
+@login_required
+def admin_profiles():
+    return jsonify({'success': True, 'profiles': request_timing.list_profiles()})
+
+
+# Admin: One stored profile as a text summary, or the raw pstats file with ?download=1
+@bp.route('/admin/profiles/<name>', methods=['GET'])
+@login_required
+def admin_profile(name):
+    path = request_timing.profile_path(name)
+    if not path:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    if request.args.get('download'):
+        return send_file(path, as_attachment=True, download_name=name, mimetype='application/octet-stream')
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'calls'):
+        sort = 'cumulative'
+    return Response(request_timing.format_profile(path, sort=sort), mimetype='text/plain')
+
 # Dashboard: Dynamic shortcut count selection
 @bp.route('/dashboard-shortcuts', methods=['GET'])
 def dashboard_shortcuts():
@@ -215,16 +240,7 @@ def dashboard_shortcuts():
             shortcuts = Redirect.query.order_by(Redirect.created_at.desc()).limit(count).all()
         else:
             shortcuts = Redirect.query.order_by(Redirect.updated_at.desc()).limit(count).all()
-        result = []
-        for s in shortcuts:
-            result.append({
-                'pattern': s.pattern,
-                'type': s.type,
-                'target': s.target,
-                'access_count': s.access_count,
-                'created_at': s.created_at,
-                'updated_at': s.updated_at
-            })
+        result = utils.shortcuts_with_live_counts(shortcuts)
         return jsonify({'success': True, 'shortcuts': result})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -233,19 +249,10 @@ def dashboard_shortcuts():
 @login_required
 def api_delete_shortcut(pattern):
     try:
-        shortcut = Redirect.query.filter_by(pattern=pattern).first()
-        if not shortcut:
+        if not utils.isPatternExists(pattern):
             return jsonify({'success': False, 'error': 'Shortcut not found'}), 404
-        utils.db.session.delete(shortcut)
-        utils.db.session.commit()
-        # Clear Redis cache for this shortcut if enabled
-        try:
-            if utils.config.redis_enabled and utils.config.redis_client:
-                redis_key = f"shortcut:{pattern}"
-                utils.config.redis_client.delete(redis_key)
-                logger.info(f"Cleared Redis cache for shortcut '{pattern}' after deletion.")
-        except Exception as e:
-            logger.warning(f"Failed to clear Redis cache for shortcut '{pattern}': {e}")
+        # Same ordered path as /delete: DB, then Redis, then the local caches
+        utils.deleteShortCut(pattern)
         logger.info(f"Shortcut '{pattern}' deleted by admin.")
         return jsonify({'success': True})
     except Exception as e:
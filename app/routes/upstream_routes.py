@@ -3,22 +3,28 @@ import time
 from datetime import datetime, timezone
 
 import requests
-from flask import Blueprint, request, redirect, url_for, render_template, stream_with_context, Response, jsonify
+from flask import Blueprint, request, redirect, url_for, render_template, stream_with_context, Response, jsonify, \
+    current_app
 import logging
+from gevent.pool import Pool
+from gevent.queue import Queue
 
 from app.routes.routesUtils import login_required
-from app.utils import utils
+from app.utils import negative_cache, resync_jobs, upstream_logs, upstream_probe, utils
 from model import UpstreamCheckLog
 
 logger = logging.getLogger(__name__)
 bp=Blueprint('upstream', __name__)
 
+UPSTREAM_TUNING_KEYS = ('connect_timeout', 'read_timeout', 'pool_size', 'retries', 'retry_backoff',
+                        'freshness_seconds')
+
 # --- Upstreams Config API ---
 @bp.route('/admin/upstreams', methods=['GET', 'POST'])
 @login_required
 def admin_upstreams():
     error = None
-    upstreams = utils.get_upstreams()
+    upstreams = list(utils.get_upstreams())
     if request.method == 'POST':
         if 'delete' in request.form:
             idx = int(request.form['delete'])
@@ -31,6 +37,8 @@ def admin_upstreams():
             else:
                 logger.warning(f"Attempted to delete non-existent upstream index: {idx}")
         else:
+            # Connection tuning keys (timeouts, pool size, retries) are not part of the form; keep them.
+            existing_by_name = {u.get('name'): u for u in upstreams}
             new_upstreams = []
             i = 0
             while True:
@@ -49,13 +57,16 @@ def admin_upstreams():
                         fail_status_code = None
                         logger.warning(
                             f"Invalid fail_status_code for upstream '{name}': '{request.form.get(f'fail_status_code_{i}')}'. Setting to None.")
-                    new_upstreams.append({
+                    entry = {k: v for k, v in existing_by_name.get(name, {}).items()
+                             if k in UPSTREAM_TUNING_KEYS}
+                    entry.update({
                         'name': name or '',
                         'base_url': base_url or '',
                         'fail_url': fail_url or '',
                         'fail_status_code': fail_status_code,
                         'verify_ssl': verify_ssl
                     })
+                    new_upstreams.append(entry)
                 i += 1
             utils.set_upstreams(new_upstreams)
             logger.info("Upstream configuration updated.")
@@ -73,11 +84,16 @@ def check_upstreams_ui(pattern):
 
 @bp.route('/stream/check-upstreams/<path:pattern>')  # Use path converter
 def stream_check_upstreams(pattern):
+    # 'parallel' probes every upstream at once; 'sequential' checks them one after another.
+    mode = request.args.get('mode')
+    if mode not in utils.UPSTREAM_CHECK_MODES:
+        if mode:
+            logger.warning(f"Unknown upstream check mode '{mode}' requested; using the configured mode.")
+        mode = utils.get_upstream_check_mode()
+    force = request.args.get('force') == '1'  # Bypass the negative cache
+
     @stream_with_context
     def event_stream():
-        found = False
-        redirect_url = None
-
         def send_log(message, extra_data=None):
             timestamp = datetime.now(timezone.utc).strftime("%H:%M:%S")
             data = {'log': f"[{timestamp}] {message}"}
@@ -86,88 +102,25 @@ def stream_check_upstreams(pattern):
             yield f"data: {json.dumps(data)}\n\n"
 
         yield from send_log(f"🔍 Starting upstream check for pattern: `{pattern}`")
-        logger.info(f"Stream initiated for upstream check of pattern: '{pattern}'")
+        logger.info(f"Stream initiated for upstream check of pattern: '{pattern}' ({mode} mode)")
 
-        for up in utils.get_upstreams():
-            up_name = up.get('name', '[unnamed]')
-            base_url = up.get('base_url', '').rstrip('/')
-            fail_url = up.get('fail_url', '')  # Keep as is, rstrip is not desired for comparison here
-            fail_status_code = str(up.get('fail_status_code')) if up.get('fail_status_code') else None
-            verify_ssl = up.get('verify_ssl', False)
-
-            # Basic validation of upstream config for current check
-            if not base_url:
-                yield from send_log(f"⚠️ Warning: Upstream '{up_name}' has no base_url configured. Skipping.")
-                logger.warning(f"Upstream '{up_name}' missing base_url, skipping check.")
-                continue
-            if not fail_url:
-                yield from send_log(
-                    f"⚠️ Warning: Upstream '{up_name}' missing fail_url. This might lead to incorrect detections.")
-                logger.warning(f"Upstream '{up_name}' missing fail_url.")
-
-            check_url = f"{base_url}/{pattern}"
-            yield from send_log(f"🌐 Checking upstream: {up_name}")
-            yield from send_log(f"Constructed URL: {check_url}")
-            yield from send_log(f"Fail criteria → URL: '{fail_url}', Status: {fail_status_code or 'Not specified'}")
-            yield from send_log(f"SSL Verification: {'Enabled' if verify_ssl else 'Disabled'}")
-
-            try:
-                resp = requests.get(check_url, allow_redirects=True, timeout=5, verify=verify_ssl)
-                actual_url = resp.url
-                status_code = str(resp.status_code)
-
-                yield from send_log(f"➡️ Response received from {check_url} → {actual_url} (status {status_code})")
-                logger.debug(f"Upstream '{up_name}' response: actual_url='{actual_url}', status='{status_code}'")
-
-                fail_url_match = actual_url.startswith(fail_url) if fail_url else False
-                fail_status_match = (fail_status_code is not None and status_code == fail_status_code)
-
-                if not fail_url_match or (fail_status_code and not fail_status_match):
-                    found = True
-                    redirect_url = actual_url
-                    utils.log_upstream_check(
-                       pattern= pattern,upstream_name= up_name,check_url= check_url, result='success',
-                        detail=f"actual_url={actual_url}, status_code={status_code}",cached=utils.is_upstream_cache_enabled()
-                    )
-                    if utils.is_upstream_cache_enabled():
-                        utils.cache_upstream_result(pattern, up_name, actual_url)
-                    yield from send_log(
-                        f"✅ Shortcut found in {up_name} (redirected to {actual_url}, status {status_code})",
-                        {'found': True, 'redirect_url': redirect_url}
-                    )
-                    logger.info(f"Shortcut '{pattern}' successfully found in upstream '{up_name}'.")
-                    break
-                else:
-                    utils.log_upstream_check(
-                        pattern, up_name, check_url, 'fail',
-                        f"actual_url={actual_url}, status_code={status_code}, fail_url_match={fail_url_match}, fail_status_match={fail_status_code}",
-
-                    )
-                    yield from send_log(f"❌ Shortcut not found in {up_name} — matched fail criteria.")
-                    logger.info(f"Shortcut '{pattern}' not found in upstream '{up_name}' (matched fail criteria).")
-
-            except requests.exceptions.Timeout:
-                utils.log_upstream_check(pattern, up_name, check_url, 'timeout', 'Request timed out')
-                yield from send_log(f"⚠️ Timeout checking {up_name}: Request timed out after 5 seconds.",
-                                    {'error': True})
-                logger.error(f"Upstream check for '{up_name}' timed out for pattern '{pattern}'.")
-            except requests.exceptions.ConnectionError as e:
-                utils.log_upstream_check(pattern, up_name, check_url, 'connection_error', str(e))
-                yield from send_log(f"⚠️ Connection error checking {up_name}: {str(e)}", {'error': True})
-                logger.error(f"Connection error for upstream '{up_name}' and pattern '{pattern}': {e}")
-            except requests.exceptions.RequestException as e:
-                utils.log_upstream_check(pattern, up_name, check_url, 'request_exception', str(e))
-                yield from send_log(f"⚠️ HTTP request error for {up_name}: {str(e)}", {'error': True})
-                logger.error(f"HTTP request error for upstream '{up_name}' and pattern '{pattern}': {e}")
-            except Exception as e:
-                utils.log_upstream_check(pattern, up_name, check_url, 'exception', str(e))
-                yield from send_log(f"⚠️ An unexpected error occurred for {up_name}: {str(e)}", {'error': True})
-                logger.exception(f"Unexpected error during upstream check for '{up_name}' and pattern '{pattern}'.")
-
-            yield from send_log(f"--- Finished check for {up_name} ---")
-            time.sleep(0.5)
-
-        if not found:
+        if not force and negative_cache.is_known_miss(pattern):
+            negative_cache.count_miss(pattern)
+            yield from send_log(f"♻️ `{pattern}` was recently not found in any upstream (cached result). Skipping checks.")
+            yield f"data: {json.dumps({'done': True, 'cached_miss': True})}\n\n"
+            return
+
+        upstreams = utils.get_upstreams()
+        if mode == 'parallel':
+            redirect_url, outcomes = yield from _check_upstreams_parallel(pattern, upstreams, send_log)
+        else:
+            redirect_url, outcomes = yield from _check_upstreams_sequential(pattern, upstreams, send_log)
+
+        # Only cache a miss every upstream answered definitively; timeouts and errors may be transient.
+        if not redirect_url and outcomes and all(o['result'] in ('fail', 'skipped') for o in outcomes):
+            negative_cache.record_miss(pattern)
+
+        if not redirect_url:
             yield from send_log("🔚 No upstream found containing the shortcut.")
             logger.info(f"No upstream found for pattern: '{pattern}'.")
             yield f"data: {json.dumps({'done': True})}\n\n"
@@ -177,12 +130,188 @@ def stream_check_upstreams(pattern):
     return Response(event_stream(), mimetype='text/event-stream')
 
 
+def _announce_upstream(pattern, up, send_log):
+    up_name = up.get('name', '[unnamed]')
+    base_url = up.get('base_url', '').rstrip('/')
+    fail_url = up.get('fail_url', '')
+    fail_status_code = str(up.get('fail_status_code')) if up.get('fail_status_code') else None
+    verify_ssl = up.get('verify_ssl', False)
+
+    # Basic validation of upstream config for current check
+    if not base_url:
+        yield from send_log(f"⚠️ Warning: Upstream '{up_name}' has no base_url configured. Skipping.")
+        logger.warning(f"Upstream '{up_name}' missing base_url, skipping check.")
+        return
+    if not fail_url:
+        yield from send_log(
+            f"⚠️ Warning: Upstream '{up_name}' missing fail_url. This might lead to incorrect detections.")
+        logger.warning(f"Upstream '{up_name}' missing fail_url.")
+
+    yield from send_log(f"🌐 Checking upstream: {up_name}")
+    yield from send_log(f"Constructed URL: {base_url}/{pattern}")
+    yield from send_log(f"Fail criteria → URL: '{fail_url}', Status: {fail_status_code or 'Not specified'}")
+    yield from send_log(f"SSL Verification: {'Enabled' if verify_ssl else 'Disabled'}")
+
+
+def _report_outcome(pattern, outcome, send_log, accept=True):
+    """
+    Logs a probe_upstream() outcome to the check log and the event stream.
+    A success is only cached and announced as the redirect target when `accept` is True.
+    """
+    up_name = outcome['upstream']
+    check_url = outcome['check_url']
+    result = outcome['result']
+    if result == 'skipped':
+        return
+    if result in ('success', 'fail'):
+        yield from send_log(f"➡️ Response received from {check_url} → {outcome['actual_url']} "
+                            f"(status {outcome['status_code']}) in {outcome['elapsed']:.2f}s")
+        logger.debug(f"Upstream '{up_name}' response: actual_url='{outcome['actual_url']}', status='{outcome['status_code']}'")
+
+    if result == 'success':
+        if accept:
+            yield from _accept_outcome(pattern, outcome, send_log)
+        else:
+            yield from send_log(f"⏳ Shortcut found in {up_name}, waiting for higher-priority upstreams.")
+        return
+    if result == 'fail':
+        utils.log_upstream_check(pattern, up_name, check_url, 'fail', outcome['detail'])
+        yield from send_log(f"❌ Shortcut not found in {up_name} — matched fail criteria.")
+        logger.info(f"Shortcut '{pattern}' not found in upstream '{up_name}' (matched fail criteria).")
+    elif result == 'timeout':
+        utils.log_upstream_check(pattern, up_name, check_url, 'timeout', outcome['detail'])
+        yield from send_log(f"⚠️ Timeout checking {up_name}: Request timed out after "
+                            f"{outcome['timeout']:g} seconds.", {'error': True})
+        logger.error(f"Upstream check for '{up_name}' timed out for pattern '{pattern}'.")
+    elif result == 'connection_error':
+        utils.log_upstream_check(pattern, up_name, check_url, 'connection_error', outcome['detail'])
+        yield from send_log(f"⚠️ Connection error checking {up_name}: {outcome['detail']}", {'error': True})
+        logger.error(f"Connection error for upstream '{up_name}' and pattern '{pattern}': {outcome['detail']}")
+    elif result == 'request_exception':
+        utils.log_upstream_check(pattern, up_name, check_url, 'request_exception', outcome['detail'])
+        yield from send_log(f"⚠️ HTTP request error for {up_name}: {outcome['detail']}", {'error': True})
+        logger.error(f"HTTP request error for upstream '{up_name}' and pattern '{pattern}': {outcome['detail']}")
+    else:
+        utils.log_upstream_check(pattern, up_name, check_url, 'exception', outcome['detail'])
+        yield from send_log(f"⚠️ An unexpected error occurred for {up_name}: {outcome['detail']}", {'error': True})
+    yield from send_log(f"--- Finished check for {up_name} ---")
+
+
+def _accept_outcome(pattern, outcome, send_log):
+    """Records a successful outcome as the resolution of `pattern` and tells the client to redirect."""
+    up_name = outcome['upstream']
+    redirect_url = outcome['actual_url']
+    cache_enabled = utils.is_upstream_cache_enabled()
+    utils.log_upstream_check(pattern=pattern, upstream_name=up_name, check_url=outcome['check_url'],
+                             result='success', detail=outcome['detail'], cached=cache_enabled)
+    if cache_enabled:
+        utils.cache_upstream_result(pattern, up_name, redirect_url)
+    yield from send_log(
+        f"✅ Shortcut found in {up_name} (redirected to {redirect_url}, status {outcome['status_code']})",
+        {'found': True, 'redirect_url': redirect_url}
+    )
+    logger.info(f"Shortcut '{pattern}' successfully found in upstream '{up_name}'.")
+    yield from send_log(f"--- Finished check for {up_name} ---")
+
+
+def _record_passed_over(pattern, outcome, winner, send_log):
+    """Logs a success that lost to the higher-priority `winner`; it is neither cached nor followed."""
+    utils.log_upstream_check(pattern=pattern, upstream_name=outcome['upstream'], check_url=outcome['check_url'],
+                             result='success', detail=outcome['detail'], cached=False)
+    yield from send_log(f"↪️ Shortcut also found in {outcome['upstream']}; {winner['upstream']} takes priority.")
+
+
+def _check_upstreams_sequential(pattern, upstreams, send_log):
+    """Checks upstreams one at a time. Returns (redirect_url or None, list of outcomes)."""
+    outcomes = []
+    for up in upstreams:
+        yield from _announce_upstream(pattern, up, send_log)
+        outcome = upstream_probe.probe_upstream(up, pattern)
+        outcomes.append(outcome)
+        if outcome['result'] == 'skipped':
+            continue
+        yield from _report_outcome(pattern, outcome, send_log)
+        if outcome['result'] == 'success':
+            return outcome['actual_url'], outcomes
+        time.sleep(0.5)
+    return None, outcomes
+
+
+def _check_upstreams_parallel(pattern, upstreams, send_log):
+    """
+    Probes every upstream concurrently and streams each outcome as it arrives.
+    The earliest upstream in the configured order that matches wins; once it is
+    known, the probes still in flight are cancelled.
+    Returns (redirect_url or None, list of finished outcomes).
+    """
+    for up in upstreams:
+        yield from _announce_upstream(pattern, up, send_log)
+    if not upstreams:
+        return None, []
+
+    finished = Queue()
+
+    def probe(idx, up):
+        finished.put((idx, upstream_probe.probe_upstream(up, pattern)))
+
+    pool = Pool(len(upstreams))
+    for idx, up in enumerate(upstreams):
+        pool.spawn(probe, idx, up)
+
+    outcomes = {}
+    try:
+        while len(outcomes) < len(upstreams):
+            idx, outcome = finished.get()
+            outcomes[idx] = outcome
+            winner = upstream_probe.pick_winner(outcomes, len(upstreams))
+            yield from _report_outcome(pattern, outcome, send_log, accept=(winner == idx))
+            if winner is not None:
+                if winner != idx:
+                    # A lower-priority match arrived first and is now confirmed as the winner.
+                    yield from _accept_outcome(pattern, outcomes[winner], send_log)
+                for other, other_outcome in sorted(outcomes.items()):
+                    if other != winner and other_outcome['result'] == 'success':
+                        yield from _record_passed_over(pattern, other_outcome, outcomes[winner], send_log)
+                cancelled = len(upstreams) - len(outcomes)
+                if cancelled:
+                    yield from send_log(f"⏹️ Cancelled {cancelled} remaining upstream check(s).")
+                return outcomes[winner]['actual_url'], list(outcomes.values())
+        return None, list(outcomes.values())
+    finally:
+        pool.kill(block=False)
+
+
+def _upstream_log_filters():
+    return {key: (request.args.get(key) or '').strip() or None for key in ('pattern', 'upstream', 'result')}
+
+
 @bp.route('/admin/upstream-logs')
 @login_required
 def admin_upstream_logs():
-    logs = utils.get_upstream_logs()
+    filters = _upstream_log_filters()
+    cursor = request.args.get('cursor') or None
+    try:
+        page = upstream_logs.get_logs_page(limit=request.args.get('limit', type=int), cursor=cursor, **filters)
+    except ValueError:
+        # A stale or hand-edited cursor just restarts from the newest logs
+        cursor = None
+        page = upstream_logs.get_logs_page(limit=request.args.get('limit', type=int), **filters)
     logger.debug("Rendering admin upstream logs page.")
-    return render_template('admin_upstream_logs.html', logs=logs)
+    return render_template('admin_upstream_logs.html', logs=page['logs'], next_cursor=page['next_cursor'],
+                           cursor=cursor, filters=filters, results=upstream_logs.RESULTS,
+                           upstreams=[u.get('name') for u in utils.get_upstreams()])
+
+
+@bp.route('/api/upstream-logs')
+@login_required
+def api_upstream_logs():
+    """JSON page of upstream check logs; pass `next_cursor` back as ?cursor= for the next page."""
+    try:
+        page = upstream_logs.get_logs_page(limit=request.args.get('limit', type=int),
+                                           cursor=request.args.get('cursor') or None, **_upstream_log_filters())
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, **page})
 
 
 # --- Upstream Cache Management ---
@@ -190,8 +319,9 @@ def admin_upstream_logs():
 @login_required
 def admin_upstream_cache(upstream):
     cached = utils.list_upstream_cache(upstream)
+    last_job = next(iter(resync_jobs.list_jobs(upstream)), None)
     logger.debug(f"Rendering admin upstream cache page for '{upstream}'.")
-    return render_template('admin_upstream_cache.html', upstream=upstream, cached=cached)
+    return render_template('admin_upstream_cache.html', upstream=upstream, cached=cached, last_job=last_job)
 
 
 @bp.route('/admin/upstream-cache/resync/<upstream>/<path:pattern>', methods=['GET', 'POST'])
@@ -204,12 +334,8 @@ def admin_upstream_cache_resync(upstream, pattern):
             logger.warning(f"Upstream '{upstream}' not found during resync operation.")
             return jsonify({'success': False, 'error': 'Upstream not found'}), 404
 
-        base_url = up.get('base_url', '').rstrip('/')
-        check_url = f"{base_url}/{pattern}"
-
         try:
-            verify_ssl = up.get('verify_ssl', False)
-            resp = requests.get(check_url, allow_redirects=True, timeout=5, verify=verify_ssl)
+            resp = upstream_probe.fetch(up, pattern)
             actual_url = resp.url
             status_code = str(resp.status_code)
 
@@ -265,11 +391,7 @@ def admin_upstream_cache_purge_entry(upstream, pattern):
 @login_required
 def admin_upstream_cache_purge(upstream):
     try:
-        cached_entries_for_upstream = utils.list_upstream_cache(upstream)
-        purged_count = 0
-        for entry in cached_entries_for_upstream:
-            utils.clear_upstream_cache(entry['pattern'], upstream_name=upstream)
-            purged_count += 1
+        purged_count = utils.purge_upstream_cache(upstream)
         logger.info(f"Purged {purged_count} cache entries for upstream: '{upstream}'.")
         return jsonify({'success': True, 'purged': purged_count})
     except Exception as e:
@@ -277,63 +399,103 @@ def admin_upstream_cache_purge(upstream):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _find_upstream(name):
+    return next((u for u in utils.get_upstreams() if u.get('name') == name), None)
+
+
+def _start_resync_job(up):
+    patterns = [entry['pattern'] for entry in utils.list_upstream_cache(up.get('name'))]
+    concurrency = request.args.get('concurrency', type=int)
+    return resync_jobs.start_job(current_app._get_current_object(), up, patterns, concurrency=concurrency)
+
+
 @bp.route('/admin/upstream-cache/resync-all/<upstream>', methods=['POST'])
 @login_required
 def admin_upstream_cache_resync_all(upstream):
     try:
         logger.info(f"Admin initiated full resync for all cached patterns in upstream: '{upstream}'.")
-        up = next((u for u in utils.get_upstreams() if u.get('name') == upstream), None)
+        up = _find_upstream(upstream)
         if not up:
             logger.warning(f"Upstream '{upstream}' not found during resync-all operation.")
             return jsonify({'success': False, 'error': 'Upstream not found'}), 404
 
-        base_url = up.get('base_url', '').rstrip('/')
-        fail_url = up.get('fail_url', '')
-        fail_status_code = str(up.get('fail_status_code')) if up.get('fail_status_code') else None
-        verify_ssl = up.get('verify_ssl', False)
+        # The job runs in the background; callers poll its status URL instead of holding the request open
+        job = _start_resync_job(up)
+        logger.info(f"Started resync job {job.id} for upstream '{upstream}' ({len(job.patterns)} patterns).")
+        return jsonify({'success': True, 'job_id': job.id, 'total': len(job.patterns),
+                        'status_url': url_for('upstream.admin_upstream_cache_resync_job', job_id=job.id)}), 202
+    except Exception as e:
+        logger.exception(f"Top-level error during admin_upstream_cache_resync_all for '{upstream}'.")
+        return jsonify(
+            {'success': False, 'error': 'Unexpected server error during resync-all operation', 'details': str(e)}), 500
+
 
-        cached_entries_for_upstream = utils.list_upstream_cache(upstream)
-        patterns_to_check = [entry['pattern'] for entry in cached_entries_for_upstream]
+@bp.route('/stream/admin/upstream-cache/resync-all/<upstream>')
+@login_required
+def stream_upstream_cache_resync_all(upstream):
+    """Starts a resync-all job and streams its progress; the job keeps running if the client goes away."""
+    up = _find_upstream(upstream)
+    if not up:
+        logger.warning(f"Upstream '{upstream}' not found during resync-all operation.")
+        return jsonify({'success': False, 'error': 'Upstream not found'}), 404
+    logger.info(f"Admin initiated streaming resync for all cached patterns in upstream: '{upstream}'.")
+    job = _start_resync_job(up)
 
-        results = []
-        for pattern in patterns_to_check:
-            check_url = f"{base_url}/{pattern}"
-            try:
-                resp = requests.get(check_url, allow_redirects=True, timeout=5, verify=verify_ssl)
-                actual_url = resp.url
-                status_code = str(resp.status_code)
+    def event_stream():
+        yield f"data: {json.dumps({'job_id': job.id, 'total': len(job.patterns), 'concurrency': job.concurrency})}\n\n"
+        sent = 0
+        while True:
+            finished = job.done
+            results = job.results[sent:]
+            for result in results:
+                sent += 1
+                yield f"data: {json.dumps({'progress': sent, 'total': len(job.patterns), 'result': result})}\n\n"
+            if finished:
+                break
+            if not results:
+                time.sleep(0.2)
+        yield f"data: {json.dumps({'done': True, 'job': job.to_dict(include_results=False)})}\n\n"
 
-                fail_url_match = actual_url.startswith(fail_url) if fail_url else False
-                fail_status_match = (fail_status_code is not None and status_code == fail_status_code)
-                tried_at = datetime.utcnow().isoformat(sep=' ', timespec='seconds')
+    return Response(event_stream(), mimetype='text/event-stream')
 
-                if not fail_url_match and (fail_status_code is None or not fail_status_match):
-                    utils.cache_upstream_result(pattern, upstream, actual_url, tried_at)
-                    results.append(
-                        {'pattern': pattern, 'success': True, 'resolved_url': actual_url, 'checked_at': tried_at})
-                    logger.debug(f"Resync-all: Pattern '{pattern}' in '{upstream}' successful.")
-                else:
-                    utils.clear_upstream_cache(pattern)
-                    results.append({'pattern': pattern, 'success': False, 'error': 'Fail criteria matched',
-                                    'checked_at': tried_at})
-                    logger.debug(f"Resync-all: Pattern '{pattern}' in '{upstream}' failed (matched fail criteria).")
-            except requests.exceptions.RequestException as e:
-                utils.clear_upstream_cache(pattern)
-                results.append({'pattern': pattern, 'success': False, 'error': f"Upstream check failed: {str(e)}",
-                                'checked_at': datetime.utcnow().isoformat(sep=' ', timespec='seconds')})
-                logger.error(f"Resync-all: HTTP error for '{pattern}' in '{upstream}': {e}")
-            except Exception as e:
-                utils.clear_upstream_cache(pattern)
-                results.append(
-                    {'pattern': pattern, 'success': False, 'error': f"An unexpected error occurred: {str(e)}",
-                     'checked_at': datetime.utcnow().isoformat(sep=' ', timespec='seconds')})
-                logger.exception(f"Resync-all: Unexpected error for '{pattern}' in '{upstream}'.")
-        logger.info(f"Finished full resync for upstream: '{upstream}'. Processed {len(patterns_to_check)} patterns.")
-        return jsonify({'success': True, 'results': results})
+
+@bp.route('/admin/upstream-cache/resync-jobs/<job_id>')
+@login_required
+def admin_upstream_cache_resync_job(job_id):
+    job = resync_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Resync job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+
+@bp.route('/admin/upstream-cache/resync-jobs')
+@login_required
+def admin_upstream_cache_resync_jobs():
+    return jsonify({'success': True, 'jobs': resync_jobs.list_jobs(request.args.get('upstream'))})
+
+
+@bp.route('/admin/upstream-misses')
+@login_required
+def admin_upstream_misses():
+    misses = negative_cache.get_top_misses(limit=int(request.args.get('limit', 50)))
+    logger.debug("Rendering admin upstream misses page.")
+    return render_template('admin_upstream_misses.html', misses=misses,
+                           enabled=negative_cache.is_enabled(), ttl=negative_cache.get_ttl())
+
+
+@bp.route('/admin/upstream-misses/clear', methods=['POST'])
+@login_required
+def admin_upstream_misses_clear():
+    try:
+        pattern = request.form.get('pattern') or None
+        negative_cache.clear(pattern)
+        if not pattern:
+            negative_cache.reset_counts()
+        logger.info(f"Cleared upstream negative cache for '{pattern or '*'}'.")
+        return jsonify({'success': True})
     except Exception as e:
-        logger.exception(f"Top-level error during admin_upstream_cache_resync_all for '{upstream}'.")
-        return jsonify(
-            {'success': False, 'error': 'Unexpected server error during resync-all operation', 'details': str(e)}), 500
+        logger.exception("Error clearing upstream negative cache.")
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @bp.route('/admin/clear-upstream-logs', methods=['POST'])
@@ -1,9 +1,10 @@
 from flask import Blueprint, render_template, request, session
-import subprocess
+import os
 import socket
+from app.config import config
 from app.utils.utils import  get_port
 import requests
-from app.CONSTANTS import __version__, get_semver
+from app.version import get_semver, get_version_info
 import logging
 import time
 from flask import current_app
@@ -46,18 +47,14 @@ def get_accessible_urls(port):
 
 @bp.route('/system-info', methods=['GET', 'POST'])
 def system_info_page():
-    from datetime import datetime
-    from app.utils.utils import get_config, set_config
-    import json
-    config_path = 'data/redirect.config.json'
     config_update_success = None
     config_update_error = None
     allowed_keys = {'upstream_cache.enabled', 'log_level', 'port', 'auto_redirect_delay', 'database'}
     if request.method == 'POST' and session.get('admin_logged_in'):
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            for k, v in request.form.items():
+        form = request.form.to_dict()
+
+        def apply(config_data):
+            for k, v in form.items():
                 if k == 'config_version':
                     continue  # Prevent editing config_version
                 if k not in allowed_keys:
@@ -80,7 +77,6 @@ def system_info_page():
                         config_data[k] = v
                 elif k == 'database':
                     # Only allow folder, append redirects.db
-                    import os
                     folder = v
                     if folder.endswith('redirects.db'):
                         folder = os.path.dirname(folder)
@@ -88,26 +84,19 @@ def system_info_page():
                     config_data[k] = db_path
                 else:
                     config_data[k] = v
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2)
+
+        try:
+            # Saved through the config object so every worker picks the change up
+            config.save(apply)
             config_update_success = 'Configuration updated successfully.'
         except Exception as e:
             config_update_error = f'Failed to update config: {e}'
-    try:
-        commit_count = subprocess.check_output(['git', 'rev-list', '--count', 'HEAD'], encoding='utf-8').strip()
-        commit_hash = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], encoding='utf-8').strip()
-        commit_date = subprocess.check_output(['git', 'log', '-1', '--format=%cd', '--date=short'], encoding='utf-8').strip()
-        semver = get_semver()
-    except Exception:
-        commit_count = commit_hash = commit_date = semver = 'unknown'
+    info = get_version_info()
+    commit_count, commit_hash, commit_date = info['commit_count'], info['commit_hash'], info['commit_date']
+    semver = info['semver']
     port = get_port()
     urls = get_accessible_urls(port)
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
-        config_data = {k: v for k, v in config_data.items() if 'password' not in k.lower() and k != 'upstreams'}
-    except Exception:
-        config_data = {}
+    config_data = {k: v for k, v in config.to_dict().items() if 'password' not in k.lower() and k != 'upstreams'}
     return render_template('system_info.html', version=semver, commit_count=commit_count, commit_hash=commit_hash, commit_date=commit_date, urls=urls, config_data=config_data, config_update_success=config_update_success, config_update_error=config_update_error)
 
 # Simple in-memory cache for version check
@@ -0,0 +1,320 @@
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, update
+from sqlalchemy.exc import IntegrityError
+
+from model import db
+from model.access_count_batch import AccessCountBatch
+from model.redirect import Redirect
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# Two bind parameters per pattern (CASE + IN); stays well under SQLite's variable limit.
+MAX_PATTERNS_PER_STATEMENT = 400
+
+# Redis hash of pattern -> hits not yet folded into redirects.access_count.
+REDIS_COUNTS_KEY = "access_counts"
+# Snapshot of REDIS_COUNTS_KEY being reconciled; kept until the DB commit succeeds.
+REDIS_RECONCILING_KEY = "access_counts:reconciling"
+# Id of the snapshot in REDIS_RECONCILING_KEY, recorded in access_count_batches when it is applied.
+REDIS_RECONCILING_BATCH_KEY = "access_counts:reconciling:batch"
+REDIS_RECONCILE_LOCK_KEY = "access_counts:reconcile_lock"
+# Applied batch ids are only needed until their staging hash is gone; older ones are pruned.
+APPLIED_BATCH_RETENTION = timedelta(days=1)
+
+# Moves the live hash to the staging key under a new batch id, unless a staging hash is left over;
+# returns the id of the staging hash, or nil when nothing was counted.
+_STAGE_SCRIPT = """
+if redis.call('exists', KEYS[2]) == 0 then
+    if redis.call('exists', KEYS[1]) == 0 then
+        return false
+    end
+    redis.call('rename', KEYS[1], KEYS[2])
+    redis.call('set', KEYS[3], ARGV[1])
+    return ARGV[1]
+end
+local batch_id = redis.call('get', KEYS[3])
+if not batch_id then
+    redis.call('set', KEYS[3], ARGV[1])
+    batch_id = ARGV[1]
+end
+return batch_id
+"""
+# Drops the staging hash only if it is still the batch that was applied.
+_FINISH_SCRIPT = """
+if redis.call('get', KEYS[2]) == ARGV[1] then
+    return redis.call('del', KEYS[1], KEYS[2])
+end
+return 0
+"""
+# Releases the lock only if this worker still holds it.
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def apply_access_counts(counts, batch_id=None):
+    """
+    Adds `counts` ({pattern: n}) to redirects.access_count using one
+    `UPDATE ... SET access_count = access_count + CASE pattern ... END` per chunk
+    and commits once. Must run inside an app context.
+
+    With a `batch_id`, the id is recorded in access_count_batches in the same transaction, and a batch
+    that was already applied is skipped. Returns False in that case, True otherwise.
+    """
+    patterns = list(counts)
+    try:
+        if batch_id is not None:
+            if db.session.get(AccessCountBatch, batch_id) is not None:
+                return False
+            now = datetime.utcnow()
+            db.session.add(AccessCountBatch(batch_id=batch_id, applied_at=now.isoformat(sep=' ', timespec='seconds')))
+            cutoff = (now - APPLIED_BATCH_RETENTION).isoformat(sep=' ', timespec='seconds')
+            db.session.execute(delete(AccessCountBatch).where(AccessCountBatch.applied_at < cutoff))
+        for i in range(0, len(patterns), MAX_PATTERNS_PER_STATEMENT):
+            chunk = {p: counts[p] for p in patterns[i:i + MAX_PATTERNS_PER_STATEMENT]}
+            stmt = (
+                update(Redirect)
+                .where(Redirect.pattern.in_(list(chunk)))
+                .values(access_count=Redirect.access_count + case(chunk, value=Redirect.pattern, else_=0))
+                .execution_options(synchronize_session=False)
+            )
+            db.session.execute(stmt)
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        if batch_id is None:
+            raise
+        return False  # Another worker committed the same batch first
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+class AccessCountBuffer:
+    """
+    Collects access-count increments in memory and writes them behind the
+    request, either every `flush_interval` seconds or as soon as
+    `flush_threshold` hits are pending.
+    """
+
+    def __init__(self, flush_interval=5.0, flush_threshold=500):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.app = None
+        self.flushed_hits = 0
+        self.failed_flushes = 0
+        self._pending = {}
+        self._pending_hits = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def add(self, pattern, n=1):
+        with self._lock:
+            self._pending[pattern] = self._pending.get(pattern, 0) + n
+            self._pending_hits += n
+            over_threshold = self._pending_hits >= self.flush_threshold
+        self._ensure_flusher()
+        if over_threshold:
+            self._wake.set()
+
+    def pending(self, pattern=None):
+        with self._lock:
+            if pattern is None:
+                return dict(self._pending)
+            return self._pending.get(pattern, 0)
+
+    def flush(self):
+        """Writes all pending increments. Failed batches are put back for the next flush."""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._pending = self._pending, {}
+                self._pending_hits = 0
+            if not counts:
+                return 0
+            if self.app is None:
+                logger.warning(f"Access count buffer not bound to an app; {len(counts)} patterns kept pending.")
+                self._restore(counts)
+                return 0
+            try:
+                with self.app.app_context():
+                    apply_access_counts(counts)
+            except Exception:
+                self.failed_flushes += 1
+                logger.exception(f"Failed to flush access counts for {len(counts)} shortcuts; will retry.")
+                self._restore(counts)
+                return 0
+            hits = sum(counts.values())
+            self.flushed_hits += hits
+            logger.debug(f"Flushed {hits} access count increments for {len(counts)} shortcuts.")
+            return hits
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_patterns': len(self._pending),
+                'pending_hits': self._pending_hits,
+                'flushed_hits': self.flushed_hits,
+                'failed_flushes': self.failed_flushes,
+                'flush_interval': self.flush_interval,
+                'flush_threshold': self.flush_threshold,
+            }
+
+    def _restore(self, counts):
+        with self._lock:
+            for pattern, n in counts.items():
+                self._pending[pattern] = self._pending.get(pattern, 0) + n
+                self._pending_hits += n
+
+    def _ensure_flusher(self):
+        # gunicorn forks after preload, so each worker starts its own flusher on first use.
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+        threading.Thread(target=self._run, name="access-count-flusher", daemon=True).start()
+
+    def _run(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            if _redis_client() is not None and self.app is not None:
+                try:
+                    reconcile_redis_counts(self.app)
+                except Exception:
+                    logger.exception("Failed to reconcile Redis access counts.")
+
+
+def _build_buffer():
+    cfg = config.get_configuration().get('access_count', {})
+    return AccessCountBuffer(
+        flush_interval=float(cfg.get('flush_interval_seconds', 5)),
+        flush_threshold=int(cfg.get('flush_threshold', 500)),
+    )
+
+
+access_buffer = _build_buffer()
+
+
+def is_write_behind_enabled():
+    return config.get_configuration().get('access_count', {}).get('write_behind', True)
+
+
+def init_app(app):
+    access_buffer.init_app(app)
+
+
+def _redis_client():
+    if config.redis_enabled and config.redis_client:
+        return config.redis_client
+    return None
+
+
+def record_hit(pattern):
+    """Counts one access: HINCRBY in Redis when available, otherwise the in-worker buffer."""
+    client = _redis_client()
+    if client is not None:
+        try:
+            client.hincrby(REDIS_COUNTS_KEY, pattern, 1)
+            # The buffer's flusher thread also runs the Redis reconciler for this worker.
+            access_buffer._ensure_flusher()
+            return
+        except Exception as e:
+            logger.error(f"Redis HINCRBY failed for '{pattern}', buffering locally: {e}")
+    access_buffer.add(pattern)
+
+
+def reconcile_redis_counts(app):
+    """
+    Folds the Redis hit hash into redirects.access_count in bulk.
+
+    The live hash is renamed to a staging key, under a new batch id, so new hits keep
+    landing in a fresh hash. The batch id is committed with the counts, and the staging
+    key is only deleted after that commit. A staging key left behind by a crashed worker
+    is picked up by the next run, which skips the DB write if its batch was already
+    applied. So does a worker that takes over after the lock expired mid-run.
+    The lock only stops workers from reconciling concurrently. It holds a random token
+    and is released only by the worker that owns it.
+    """
+    client = _redis_client()
+    if client is None:
+        return 0
+    interval = access_buffer.flush_interval
+    token = uuid.uuid4().hex
+    if not client.set(REDIS_RECONCILE_LOCK_KEY, token, nx=True, ex=max(int(interval * 6), 30)):
+        return 0
+    try:
+        batch_id = client.register_script(_STAGE_SCRIPT)(
+            keys=[REDIS_COUNTS_KEY, REDIS_RECONCILING_KEY, REDIS_RECONCILING_BATCH_KEY], args=[uuid.uuid4().hex])
+        if not batch_id:
+            return 0  # Nothing counted since the last run
+        counts = {p: int(n) for p, n in client.hgetall(REDIS_RECONCILING_KEY).items() if int(n)}
+        applied = 0
+        if counts:
+            start_time = time.time()
+            with app.app_context():
+                if apply_access_counts(counts, batch_id=batch_id):
+                    applied = sum(counts.values())
+                    logger.debug(f"Reconciled {applied} Redis hits for {len(counts)} shortcuts "
+                                 f"in {time.time() - start_time:.3f}s.")
+                else:
+                    logger.info(f"Redis access count batch {batch_id} was already applied; dropping it.")
+        _finish_batch(client, batch_id)
+        return applied
+    finally:
+        client.register_script(_RELEASE_SCRIPT)(keys=[REDIS_RECONCILE_LOCK_KEY], args=[token])
+
+
+def _finish_batch(client, batch_id):
+    client.register_script(_FINISH_SCRIPT)(keys=[REDIS_RECONCILING_KEY, REDIS_RECONCILING_BATCH_KEY],
+                                           args=[batch_id])
+
+
+def get_pending_counts(patterns):
+    """Returns {pattern: hits not yet in the DB} from Redis and this worker's buffer."""
+    patterns = list(patterns)
+    pending = {p: access_buffer.pending(p) for p in patterns}
+    client = _redis_client()
+    if client is not None and patterns:
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.hmget(REDIS_COUNTS_KEY, patterns)
+            pipe.hmget(REDIS_RECONCILING_KEY, patterns)
+            for values in pipe.execute():
+                for p, n in zip(patterns, values):
+                    if n:
+                        pending[p] += int(n)
+        except Exception as e:
+            logger.error(f"Failed to read live access counts from Redis: {e}")
+    return pending
+
+
+def drain():
+    """Flushes every pending increment; called on worker shutdown."""
+    flushed = access_buffer.flush()
+    if flushed:
+        logger.info(f"Drained {flushed} pending access count increments on shutdown.")
+
+
+atexit.register(drain)
@@ -0,0 +1,181 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler
+
+from gevent import monkey
+
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# Structured access log, one JSON object per line on stdout. Kept off the root logger so the
+# app's own log format and level don't apply to it.
+access_logger = logging.getLogger('redirector.access')
+access_logger.setLevel(logging.INFO)
+access_logger.propagate = False
+
+# Records waiting for the writer thread; past this, new records are dropped instead of blocking requests
+MAX_QUEUED_RECORDS = 10000
+# Seconds stop() waits for the writer to write out what is queued
+STOP_TIMEOUT = 5
+
+# Under gevent.monkey.patch_all() the patched threading/queue would make the writer a greenlet in the
+# worker's own OS thread, where a blocking write to stdout stalls every request. The writer is a real
+# OS thread instead, fed through the unpatched queue.
+_SimpleQueue = monkey.get_original('queue', 'SimpleQueue')
+_start_new_thread, _allocate_lock, _RLock = monkey.get_original('_thread', ['start_new_thread', 'allocate_lock',
+                                                                           'RLock'])
+_STOP = object()
+
+_state = {'pid': None, 'writer': None, 'dropped': 0}
+_lock = threading.Lock()
+
+
+class JsonAccessFormatter(logging.Formatter):
+    """Renders the fields of an access record as JSON, in the writer thread."""
+
+    def format(self, record):
+        entry = {'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'), 'event': record.getMessage()}
+        entry.update(getattr(record, 'access', {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The record is rendered by the listener's formatter; skip QueueHandler's formatting copy
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _state['dropped'] += 1
+
+
+class _Writer:
+    """Writes queued records through `handler` from its own OS thread."""
+
+    def __init__(self, handler, max_records=MAX_QUEUED_RECORDS):
+        handler.lock = _RLock()  # The handler is only used from the writer thread; keep gevent out of it
+        self.handler = handler
+        self.max_records = max_records
+        self.records = _SimpleQueue()
+        self._finished = _allocate_lock()
+        self._finished.acquire()
+        _start_new_thread(self._run, ())
+
+    def put_nowait(self, record):
+        if self.records.qsize() >= self.max_records:
+            raise queue.Full
+        self.records.put(record)
+
+    def qsize(self):
+        return self.records.qsize()
+
+    def _run(self):
+        try:
+            while True:
+                record = self.records.get()
+                if record is _STOP:
+                    return
+                self.handler.handle(record)
+        finally:
+            self._finished.release()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        self.records.put(_STOP)
+        if not self._finished.acquire(timeout=timeout):
+            logger.warning(f"Access log writer did not finish within {timeout}s; "
+                           f"{self.records.qsize()} records not written.")
+
+
+def get_sample_rate():
+    """Share of successful redirects written to the access log (0 to 1). Misses and errors are always written."""
+    try:
+        rate = float(config.get_configuration().get('access_log', {}).get('sample_rate', 1.0))
+    except (TypeError, ValueError):
+        return 1.0
+    return min(max(rate, 0.0), 1.0)
+
+
+def is_enabled():
+    return bool(config.get_configuration().get('access_log', {}).get('enabled', True))
+
+
+def ensure_started():
+    """
+    Starts this worker's writer thread (gunicorn forks after preload, so once per pid). Requests only put
+    records on a bounded queue; formatting and the write to stdout happen in the writer, a real OS thread,
+    so a slow or blocked stdout never holds up a request.
+    """
+    pid = os.getpid()
+    if _state['pid'] == pid:
+        return
+    with _lock:
+        if _state['pid'] == pid:
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonAccessFormatter())
+        writer = _Writer(stream)
+        for handler in list(access_logger.handlers):
+            access_logger.removeHandler(handler)
+        access_logger.addHandler(_DroppingQueueHandler(writer))
+        _state.update(pid=pid, writer=writer)
+    logger.debug(f"Access log writer started (pid {pid}).")
+
+
+def stop():
+    """Writes out queued records and stops the writer thread (worker shutdown)."""
+    with _lock:
+        writer = _state['writer']
+        if writer is None or _state['pid'] != os.getpid():
+            return
+        for handler in list(access_logger.handlers):
+            access_logger.removeHandler(handler)
+        _state.update(pid=None, writer=None)
+        writer.stop()
+
+
+def _emit(event, level, fields):
+    ensure_started()
+    access_logger.log(level, event, extra={'access': fields})
+
+
+def log_redirect(subpath, pattern, source, target, started=None, fast_path=False):
+    """A served redirect, written for a `sample_rate` share of requests."""
+    rate = get_sample_rate()
+    if not rate or (rate < 1.0 and random.random() >= rate) or not is_enabled():
+        return
+    fields = {'path': subpath, 'pattern': pattern, 'source': source, 'target': target, 'sample_rate': rate}
+    if started is not None:
+        fields['ms'] = round((time.perf_counter() - started) * 1000, 3)
+    if fast_path:
+        fields['fast_path'] = True
+    _emit('redirect', logging.INFO, fields)
+
+
+def log_miss(subpath, outcome):
+    """A path with no shortcut, always written. `outcome` says where the request was sent."""
+    if is_enabled():
+        _emit('miss', logging.INFO, {'path': subpath, 'outcome': outcome})
+
+
+def log_error(subpath, error):
+    """A redirect that failed, always written."""
+    if is_enabled():
+        _emit('error', logging.ERROR, {'path': subpath, 'error': str(error)})
+
+
+def stats():
+    writer = _state['writer']
+    return {'queued': writer.qsize() if writer is not None else 0, 'dropped': _state['dropped']}
+
+
+atexit.register(stop)
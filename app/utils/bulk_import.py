@@ -0,0 +1,180 @@
+import logging
+import time
+from datetime import datetime, timezone
+from itertools import islice
+
+from sqlalchemy import insert, select, update
+
+from app import CONSTANTS
+from model import db
+from model.redirect import Redirect
+
+logger = logging.getLogger(__name__)
+
+# Rows per transaction; also bounds the size of each chunk's `pattern IN (...)` prefetch.
+DEFAULT_CHUNK_SIZE = 500
+
+_EXISTING_COLUMNS = ('id', 'pattern', 'access_count', 'created_at', 'updated_at', 'created_ip', 'updated_ip')
+
+
+def parse_timestamp(value):
+    """Parses an `updated_at` value ('YYYY-MM-DD HH:MM:SS', optionally with an offset) as naive UTC."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _insert_ignoring_conflicts(rows):
+    """
+    Inserts `rows`, skipping patterns created concurrently. Executed as an executemany of one
+    cached statement, which SQLAlchemy sends as batched multi-row INSERTs ("insertmanyvalues")
+    on SQLite, Postgres and MySQL.
+
+    Returns:
+        tuple: (inserted, exact). Where the dialect supports RETURNING with executemany the
+        inserted ids are counted; otherwise the driver's rowcount is used, and if that is
+        unknown every row is counted and `exact` is False.
+    """
+    table = Redirect.__table__
+    dialect = db.session.get_bind().dialect
+    name = dialect.name
+    if name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).on_conflict_do_nothing(index_elements=['pattern'])
+    elif name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table).on_conflict_do_nothing(index_elements=['pattern'])
+    elif name in ('mysql', 'mariadb'):
+        stmt = insert(table).prefix_with('IGNORE')
+    else:
+        stmt = insert(table)
+    connection = db.session.connection()
+    if dialect.insert_executemany_returning:
+        # Rows skipped by the conflict clause return nothing
+        return len(connection.execute(stmt.returning(table.c.id), rows).all()), True
+    result = connection.execute(stmt, rows)
+    if result.rowcount is not None and result.rowcount >= 0:
+        return result.rowcount, True
+    return len(rows), False
+
+
+def _newer(candidate, current):
+    """'Newer wins': True if `candidate` (an import entry) should replace `current`."""
+    candidate_dt = parse_timestamp(candidate.get('updated_at'))
+    current_dt = parse_timestamp(current.get('updated_at'))
+    return candidate_dt is not None and (current_dt is None or candidate_dt > current_dt)
+
+
+def _import_chunk(entries, now):
+    chunk_stats = {'rows': len(entries), 'inserted': 0, 'updated': 0, 'skipped': 0, 'invalid': 0,
+                   'approximate': False}
+
+    # The entry to apply per pattern; duplicates within the chunk follow the same newer-wins rule.
+    by_pattern = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get('pattern') or not entry.get('target'):
+            logger.warning(f"Skipping malformed entry during import: {entry}")
+            chunk_stats['invalid'] += 1
+            continue
+        pattern = entry['pattern']
+        if pattern in by_pattern:
+            chunk_stats['skipped'] += 1
+            if not _newer(entry, by_pattern[pattern]):
+                continue
+        by_pattern[pattern] = entry
+
+    if not by_pattern:
+        return chunk_stats
+
+    columns = [getattr(Redirect, c) for c in _EXISTING_COLUMNS]
+    existing = {
+        row.pattern: row._asdict()
+        for row in db.session.execute(select(*columns).where(Redirect.pattern.in_(list(by_pattern))))
+    }
+
+    inserts, updates = [], []
+    for pattern, entry in by_pattern.items():
+        current = existing.get(pattern)
+        if current is None:
+            inserts.append({
+                'pattern': pattern,
+                'type': entry.get('type', CONSTANTS.DATA_TYPE_STATIC),
+                'target': entry['target'],
+                'access_count': entry.get('access_count', 0),
+                'created_at': entry.get('created_at', now),
+                'updated_at': entry.get('updated_at', now),
+                'created_ip': entry.get('created_ip', 'import'),
+                'updated_ip': entry.get('updated_ip', 'import'),
+            })
+        elif _newer(entry, current):
+            updates.append({
+                'id': current['id'],
+                'type': entry.get('type', CONSTANTS.DATA_TYPE_STATIC),
+                'target': entry['target'],
+                'access_count': entry.get('access_count', current['access_count']),
+                'created_at': entry.get('created_at', current['created_at']),
+                'updated_at': entry['updated_at'],
+                'created_ip': entry.get('created_ip', current['created_ip']),
+                'updated_ip': entry.get('updated_ip', current['updated_ip']),
+            })
+        else:
+            chunk_stats['skipped'] += 1
+
+    if inserts:
+        inserted, exact = _insert_ignoring_conflicts(inserts)
+        chunk_stats['inserted'] = inserted
+        chunk_stats['approximate'] = not exact
+        chunk_stats['skipped'] += len(inserts) - inserted
+    if updates:
+        # Bulk UPDATE by primary key: one executemany for the whole chunk
+        db.session.execute(update(Redirect), updates)
+        chunk_stats['updated'] = len(updates)
+    return chunk_stats
+
+
+def import_redirects(entries, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Upserts redirects from an iterable of dicts in chunks, each in its own short transaction.
+    Existing patterns are only updated when the imported `updated_at` is newer; nothing is deleted.
+    Must run inside an app context.
+
+    Returns:
+        dict: 'inserted', 'updated', 'skipped', 'invalid' and 'rows' totals, 'seconds', and
+        'chunks', a list with the same counts and the time spent per chunk. 'approximate' is True
+        when the database couldn't report how many rows were inserted; 'inserted' then also counts
+        patterns created concurrently, which were skipped.
+    """
+    report = {'rows': 0, 'inserted': 0, 'updated': 0, 'skipped': 0, 'invalid': 0, 'approximate': False,
+              'seconds': 0.0, 'chunks': []}
+    now = datetime.utcnow().isoformat(sep=' ', timespec='seconds')
+    start = time.perf_counter()
+    iterator = iter(entries)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        chunk_start = time.perf_counter()
+        try:
+            chunk_stats = _import_chunk(chunk, now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception(f"Import chunk {len(report['chunks']) + 1} failed; rolled back that chunk.")
+            raise
+        chunk_stats['seconds'] = round(time.perf_counter() - chunk_start, 4)
+        report['chunks'].append(chunk_stats)
+        for key in ('rows', 'inserted', 'updated', 'skipped', 'invalid'):
+            report[key] += chunk_stats[key]
+        report['approximate'] = report['approximate'] or chunk_stats['approximate']
+        logger.debug(f"Import chunk {len(report['chunks'])}: {chunk_stats}")
+    report['seconds'] = round(time.perf_counter() - start, 4)
+    logger.info(f"Import finished: {'~' if report['approximate'] else ''}{report['inserted']} inserted, {report['updated']} updated, "
+                f"{report['skipped']} skipped, {report['invalid']} invalid in {report['seconds']}s "
+                f"({len(report['chunks'])} chunks).")
+    return report
@@ -0,0 +1,78 @@
+import logging
+import os
+import threading
+import time
+
+from ..config import config
+from . import invalidation, negative_cache, request_timing, upstream_probe
+from .local_cache import shortcut_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_INTERVAL = 2
+
+_state = {'pid': None}
+_lock = threading.Lock()
+
+
+def _on_reload():
+    # Upstream sessions carry per-upstream timeouts/retries, and cached lookups depend on the
+    # upstream list and cache settings; drop them so they are rebuilt from the new snapshot.
+    upstream_probe.reset_sessions()
+    shortcut_cache.invalidate()
+    negative_cache.invalidate_local()
+
+
+def _on_save():
+    # Other workers reload on this signal; without Redis they notice the new mtime.
+    invalidation.publish('config')
+
+
+def _on_invalidate(key=None):
+    config.reload_if_changed()
+
+
+config.add_reload_listener(_on_reload)
+config.add_save_listener(_on_save)
+invalidation.subscribe('config', _on_invalidate)
+
+
+def get_check_interval():
+    return float(config.get_configuration().get('config_reload', {}).get('check_interval_seconds',
+                                                                       DEFAULT_CHECK_INTERVAL))
+
+
+def ensure_started():
+    """Starts this worker's config file watcher (gunicorn forks after preload, so once per pid)."""
+    pid = os.getpid()
+    if _state['pid'] == pid:
+        return
+    invalidation.is_live()  # Also starts this worker's invalidation listener, which carries 'config'
+    with _lock:
+        if _state['pid'] == pid:
+            return
+        _state['pid'] = pid
+    threading.Thread(target=_watch, name="config-watcher", daemon=True).start()
+
+
+def _watch():
+    pid = os.getpid()
+    while _state['pid'] == pid:
+        interval = get_check_interval()
+        time.sleep(interval if interval > 0 else DEFAULT_CHECK_INTERVAL)
+        if interval <= 0:
+            continue
+        try:
+            if config.reload_if_changed():
+                logger.info(f"🔁 Config file changed; reloaded in worker {pid}.")
+        except Exception:
+            logger.exception("❌ Failed to reload config.")
+
+
+def _before_request():
+    with request_timing.phase('config'):
+        ensure_started()
+
+
+def init_app(app):
+    app.before_request(_before_request)
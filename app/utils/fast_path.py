@@ -0,0 +1,129 @@
+import functools
+import logging
+import time
+
+from werkzeug.urls import iri_to_uri
+
+from app import CONSTANTS
+from ..config import config
+from . import access_counter, access_log, config_reload, metrics, pattern_index, request_timing, target_template
+from .local_cache import MISSING, shortcut_cache
+from .utils import destructureSubPath
+
+logger = logging.getLogger(__name__)
+
+# Endpoint every path not claimed by another route falls through to
+REDIRECT_ENDPOINT = 'redirection.handle_redirect'
+
+_LOCAL_SOURCES = (CONSTANTS.data_source_redirect, CONSTANTS.data_source_redis)
+
+
+def is_enabled():
+    return bool(config.get_configuration().get('fast_path', {}).get('enabled', False))
+
+
+@functools.lru_cache(maxsize=4096)
+def _redirect_headers(location):
+    """Prebuilt 302 headers for `location`, shared by every request to the same target."""
+    return [('Location', iri_to_uri(location)), ('Content-Length', '0')]
+
+
+class FastPathMiddleware:
+    """
+    WSGI middleware answering `GET /<pattern>` with a 302 straight from this worker's shortcut cache,
+    skipping Flask routing, sessions and templates. Only redirects Flask would send immediately are
+    served here: a local (DB/Redis) static or dynamic shortcut already in the local cache, with
+    `auto_redirect_delay` at 0 and write-behind access counting. Everything else (other routes,
+    cache misses, upstream hits, delay and usage pages, profiled requests) goes to the wrapped Flask app unchanged.
+    Enabled with `fast_path.enabled` in the config.
+    """
+
+    def __init__(self, wsgi_app, flask_app):
+        self.wsgi_app = wsgi_app
+        self.flask_app = flask_app
+        self._reserved = None
+        self.served = 0
+
+    def reserved_segments(self):
+        """
+        First path segments claimed by a route other than the redirect handler ('admin', 'edit', ...),
+        read once from the URL map. None when some other route starts with a variable, in which case
+        the fast path can't tell routes apart and stays off.
+        """
+        if self._reserved is None:
+            reserved = set()
+            for rule in self.flask_app.url_map.iter_rules():
+                if rule.endpoint == REDIRECT_ENDPOINT:
+                    continue
+                first = rule.rule.lstrip('/').split('/', 1)[0]
+                if '<' in first:
+                    logger.warning(f"Route '{rule.rule}' starts with a variable; fast path disabled.")
+                    reserved = False
+                    break
+                reserved.add(first)
+            self._reserved = reserved
+        return self._reserved or None
+
+    def resolve(self, environ, started=None):
+        """Location to redirect to, or None to hand the request to Flask."""
+        if environ.get('REQUEST_METHOD') != 'GET' or not is_enabled():
+            return None
+        if config.snapshot.auto_redirect_delay > 0 or not access_counter.is_write_behind_enabled():
+            return None
+        # Same decoding as werkzeug, so the subpath matches what the Flask route would see
+        subpath = environ.get('PATH_INFO', '').encode('latin1').decode('utf-8', 'replace')[1:]
+        if not subpath or '//' in subpath:
+            return None
+        # Profiling needs the admin session, which only Flask reads
+        if 'HTTP_' + request_timing.PROFILE_HEADER.upper().replace('-', '_') in environ or \
+                request_timing.PROFILE_ARG in environ.get('QUERY_STRING', ''):
+            return None
+        reserved = self.reserved_segments()
+        if reserved is None or subpath.split('/', 1)[0] in reserved:
+            return None
+
+        index = pattern_index.current_index()
+        if index is None:
+            return None
+        pattern, dynamic_prop = destructureSubPath(subpath, index)
+        cached = shortcut_cache.get(pattern, count_miss=False)
+        if cached is MISSING:
+            return None
+        shortcut, data_source = cached
+        if not shortcut or data_source not in _LOCAL_SOURCES:
+            return None
+
+        data_type = shortcut.get(CONSTANTS.KEY_DATA_TYPE)
+        if data_type == CONSTANTS.DATA_TYPE_STATIC:
+            location = shortcut['target']
+        elif data_type == CONSTANTS.DATA_TYPE_DYNAMIC and subpath.startswith(pattern + '/'):
+            template = shortcut.get('template') or target_template.compile_template(shortcut['target'])
+            location = template.expand(subpath[len(pattern) + 1:])
+        else:
+            return None
+        access_counter.record_hit(pattern)
+        access_log.log_redirect(subpath, pattern, data_source, location, started, fast_path=True)
+        metrics.count_redirect(data_type)
+        return location
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        try:
+            location = self.resolve(environ, started)
+        except Exception:
+            logger.exception("Fast path lookup failed; handing the request to Flask.")
+            location = None
+        if location is None:
+            return self.wsgi_app(environ, start_response)
+        config_reload.ensure_started()
+        self.served += 1
+        headers = list(_redirect_headers(location))
+        if request_timing.is_server_timing_enabled():
+            headers.append(('Server-Timing', f'total;dur={(time.perf_counter() - started) * 1000:.3f};desc="fast path"'))
+        start_response('302 FOUND', headers)
+        return [b'']
+
+
+def init_app(app):
+    """Puts the fast path in front of `app`; it stays idle until `fast_path.enabled` is set."""
+    app.wsgi_app = FastPathMiddleware(app.wsgi_app, app)
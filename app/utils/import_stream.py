@@ -0,0 +1,236 @@
+import codecs
+import json
+import logging
+import zlib
+
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+READ_SIZE = 64 * 1024
+# A single array element larger than this is treated as a malformed file rather than buffered forever.
+MAX_ENTRY_CHARS = 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+
+
+def iter_bytes(stream, read_size=None):
+    """Yields the upload in raw blocks, transparently gunzipping it if it starts with the gzip magic bytes."""
+    read_size = read_size or READ_SIZE
+    first = stream.read(read_size)
+    if not first.startswith(GZIP_MAGIC):
+        block = first
+        while block:
+            yield block
+            block = stream.read(read_size)
+        return
+
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    block = first
+    while block:
+        data = decompressor.decompress(block)
+        # Concatenated gzip members (e.g. `cat a.gz b.gz`) continue in a fresh decompressor
+        while decompressor.eof and decompressor.unused_data:
+            rest = decompressor.unused_data
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            data += decompressor.decompress(rest)
+        if data:
+            yield data
+        block = stream.read(read_size)
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+    if not decompressor.eof:
+        raise ValueError('Truncated gzip upload.')
+
+
+def iter_text(blocks):
+    """Decodes UTF-8 blocks incrementally, dropping a leading BOM."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for block in blocks:
+        text = decoder.decode(block)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def _iter_ndjson(chunks):
+    line_no = 0
+    pending = ''
+    for chunk in chunks:
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            line_no += 1
+            entry = _parse_line(line, line_no)
+            if entry is not None:
+                yield entry
+    if pending:
+        entry = _parse_line(pending, line_no + 1)
+        if entry is not None:
+            yield entry
+
+
+def _parse_line(line, line_no):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        # Passed through as-is so the importer counts it as an invalid entry and carries on
+        logger.warning(f"Invalid JSON on line {line_no} of NDJSON import: {e}")
+        return line
+
+
+def _iter_json_array(chunks, buf):
+    """Yields the elements of a top-level JSON array one at a time with JSONDecoder.raw_decode."""
+    pos = 1  # past the '['
+    eof = False
+    expect_value = True
+    first = True
+    while True:
+        # Skip whitespace and the separator; pull more text whenever the buffer runs dry
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = buf[pos:], 0
+            try:
+                buf += next(chunks)
+            except StopIteration:
+                eof = True
+        if pos >= len(buf):
+            raise ValueError('Invalid JSON file content: unterminated array.')
+        char = buf[pos]
+        if char == ']' and (first or not expect_value):
+            return
+        if not expect_value:
+            if char != ',':
+                raise ValueError(f"Invalid JSON file content: expected ',' or ']' but found {char!r}.")
+            pos += 1
+            expect_value = True
+            continue
+
+        try:
+            entry, end = _decoder.raw_decode(buf, pos)
+            # A value touching the end of the buffer may be cut short (e.g. a number); it needs a delimiter.
+            complete = end < len(buf) or eof
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f"Invalid JSON file content: {e}")
+            complete = False
+        if not complete:
+            if len(buf) - pos > MAX_ENTRY_CHARS:
+                raise ValueError('Invalid JSON file content: an entry exceeds the maximum size.')
+            buf, pos = buf[pos:], 0
+            try:
+                buf += next(chunks)
+            except StopIteration:
+                eof = True
+            continue
+
+        yield entry
+        first = False
+        expect_value = False
+        pos = end
+        if pos > READ_SIZE:
+            buf, pos = buf[pos:], 0
+
+
+def iter_entries(stream):
+    """
+    Parses an import upload incrementally from a binary file object, yielding one entry at a time.
+    Accepts a JSON array (as written by the JSON export) or NDJSON, either optionally gzip-compressed;
+    the format is detected from the content, not the filename. Memory use is bounded by the read
+    size and the largest single entry, not the file size.
+
+    Raises:
+        ValueError: If the upload is not a JSON array / NDJSON or the array is malformed.
+    """
+    chunks = iter_text(iter_bytes(stream))
+    buf = ''
+    for chunk in chunks:
+        buf += chunk
+        if buf.strip():
+            break
+    buf = buf.lstrip()
+    if not buf:
+        return
+    if buf[0] == '[':
+        yield from _iter_json_array(chunks, buf)
+    elif buf[0] == '{':
+        yield from _iter_ndjson(_prepend(buf, chunks))
+    else:
+        raise ValueError('Invalid JSON data format: expected a list of redirects or NDJSON.')
+
+
+def _prepend(first, chunks):
+    yield first
+    yield from chunks
+
+
+class MultipartFileStream:
+    """
+    Read-only file object over one file part of a multipart/form-data body, decoded straight from the
+    request stream with Werkzeug's sans-IO MultipartDecoder. Unlike request.files, nothing is spooled:
+    the part is read as the importer consumes it, so the first rows are written before the upload ends.
+    """
+
+    def __init__(self, stream, boundary, field_name='file', read_size=None):
+        self._stream = stream
+        self._read_size = read_size or READ_SIZE
+        self._decoder = MultipartDecoder(boundary.encode('latin-1'))
+        self._field_name = field_name
+        self._buffer = b''
+        self._in_part = False
+        self._done = False
+        self.filename = None
+
+    def _next_event(self):
+        event = self._decoder.next_event()
+        while isinstance(event, NeedData):
+            block = self._stream.read(self._read_size)
+            self._decoder.receive_data(block or None)  # None marks the end of the body
+            event = self._decoder.next_event()
+            if not block and isinstance(event, NeedData):
+                raise ValueError('Truncated multipart upload.')
+        return event
+
+    def open(self):
+        """Skips to the file part named `field_name`. Returns False if the body has none."""
+        while True:
+            event = self._next_event()
+            if isinstance(event, File) and event.name == self._field_name:
+                self.filename = event.filename or ''
+                self._in_part = True
+                return True
+            if isinstance(event, Epilogue):
+                self._done = True
+                return False
+
+    def read(self, size=-1):
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            event = self._next_event()
+            if isinstance(event, Data) and self._in_part:
+                self._buffer += event.data
+                if not event.more_data:
+                    self._in_part = False
+                    self._done = True  # The rest of the body (other fields) is not needed
+            elif isinstance(event, Epilogue):
+                self._done = True
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def open_multipart_file(stream, boundary, field_name='file'):
+    """Returns a MultipartFileStream positioned at the `field_name` file part, or None if there is none."""
+    upload = MultipartFileStream(stream, boundary, field_name)
+    return upload if upload.open() else None
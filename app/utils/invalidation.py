@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel used to fan invalidations out to every gunicorn worker.
+CHANNEL = "redirector:invalidate"
+
+# Topic -> list of handlers. A handler receives the invalidated key, or None for "everything".
+_handlers = {}
+
+_state = {
+    'pid': None,          # Process that owns the listener (gunicorn forks after preload)
+    'listening': False,   # True while the Redis subscription is connected
+    'stamp': None,        # Last seen signature of the stamp file (Redis disabled)
+}
+_lock = threading.Lock()
+
+
+def subscribe(topic, handler):
+    """Register a handler called whenever `topic` is invalidated in any worker."""
+    _handlers.setdefault(topic, []).append(handler)
+
+
+def publish(topic, key=None):
+    """
+    Invalidates `key` (or the whole topic when key is None) in every worker.
+
+    The local worker is invalidated synchronously. Other workers are told through
+    Redis pub/sub when Redis is available, otherwise through a stamp file in the
+    data directory that each worker checks before trusting its local caches.
+    """
+    _dispatch(topic, key)
+    if config.redis_enabled and config.redis_client:
+        try:
+            message = json.dumps({'topic': topic, 'key': key, 'pid': os.getpid()})
+            config.redis_client.publish(CHANNEL, message)
+            return
+        except Exception as e:
+            logger.error(f"Failed to publish invalidation for {topic}:{key}: {e}")
+    _touch_stamp()
+
+
+def is_live():
+    """
+    Returns True when this worker is guaranteed to hear about invalidations,
+    i.e. when it is safe to serve from a local cache.
+    """
+    _ensure_started()
+    if config.redis_enabled and config.redis_client:
+        return _state['listening']
+    _check_stamp()
+    return True
+
+
+def _dispatch(topic, key):
+    topics = _handlers.keys() if topic is None else (topic,)
+    for t in list(topics):
+        for handler in _handlers.get(t, []):
+            try:
+                handler(key)
+            except Exception:
+                logger.exception(f"Invalidation handler failed for {t}:{key}.")
+
+
+def _dispatch_all():
+    _dispatch(None, None)
+
+
+# --- Redis pub/sub listener ---
+def _ensure_started():
+    pid = os.getpid()
+    if _state['pid'] == pid:
+        return
+    with _lock:
+        if _state['pid'] == pid:
+            return
+        _state['pid'] = pid
+        _state['listening'] = False
+        _state['stamp'] = _read_stamp()
+        if config.redis_enabled and config.redis_client:
+            threading.Thread(target=_listen_forever, name="cache-invalidation", daemon=True).start()
+
+
+def _listen_forever():
+    pid = os.getpid()
+    while _state['pid'] == pid:
+        pubsub = None
+        try:
+            client = config.redis_client
+            if client is None:
+                time.sleep(1)
+                continue
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            # Anything cached before the subscription was confirmed may have missed a message.
+            _dispatch_all()
+            _state['listening'] = True
+            logger.debug(f"Listening for cache invalidations on '{CHANNEL}' (pid {pid}).")
+            for message in pubsub.listen():
+                if message.get('type') != 'message':
+                    continue
+                try:
+                    payload = json.loads(message['data'])
+                except (TypeError, ValueError):
+                    continue
+                if payload.get('pid') == pid:
+                    continue  # Already applied locally by publish()
+                _dispatch(payload.get('topic'), payload.get('key'))
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener disconnected: {e}")
+        finally:
+            _state['listening'] = False
+            _dispatch_all()
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+        time.sleep(1)
+
+
+# --- Stamp file fallback (Redis disabled) ---
+def _stamp_path():
+    return os.path.join(config.DATA_DIR, '.cache_invalidation_stamp')
+
+
+def _read_stamp():
+    try:
+        st = os.stat(_stamp_path())
+        return st.st_ino, st.st_mtime_ns
+    except OSError:
+        return None
+
+
+def _touch_stamp():
+    path = _stamp_path()
+    tmp_path = f"{path}.{os.getpid()}"
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(str(time.time_ns()))
+        # os.replace gives the stamp a new inode, so even coarse mtimes change signature.
+        os.replace(tmp_path, path)
+        _state['stamp'] = _read_stamp()
+    except OSError as e:
+        logger.error(f"Failed to write cache invalidation stamp {path}: {e}")
+
+
+def _check_stamp():
+    stamp = _read_stamp()
+    if stamp != _state['stamp']:
+        _state['stamp'] = stamp
+        _dispatch_all()
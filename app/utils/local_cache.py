@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import config
+from . import invalidation
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class LocalCache:
+    """Bounded LRU cache with a per-entry TTL, private to one worker process."""
+
+    def __init__(self, name, max_entries=10000, ttl_seconds=300, enabled=True, guard=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        # Called before every lookup; a falsy result bypasses the cache (e.g. invalidation bus down).
+        self.guard = guard
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, count_miss=True):
+        """
+        Cached value for `key`, or MISSING. Pass count_miss=False for a speculative lookup whose miss
+        is followed by a regular one, so it isn't counted twice.
+        """
+        if not self.enabled:
+            return MISSING
+        if self.guard is not None and not self.guard():
+            if count_miss:
+                self.bypassed += 1
+            return MISSING
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += count_miss
+                return MISSING
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += count_miss
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, generation=None, ttl_seconds=None):
+        """
+        Stores `value` for `ttl_seconds` (default: the cache's TTL). When `generation` is given and an
+        invalidation happened since it was read, the value may already be stale and is dropped.
+        """
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        with self._lock:
+            self.generation += 1
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'enabled': self.enabled,
+            'size': len(self._data),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _build_shortcut_cache():
+    cfg = config.get_configuration().get('local_cache', {})
+    cache = LocalCache(
+        'shortcut',
+        max_entries=int(cfg.get('max_entries', 10000)),
+        ttl_seconds=float(cfg.get('ttl_seconds', 300)),
+        enabled=bool(cfg.get('enabled', True)),
+        guard=invalidation.is_live,
+    )
+    invalidation.subscribe('shortcut', cache.invalidate)
+    return cache
+
+
+# Resolved get_shortcut() results keyed by pattern: (shortcut, data_source).
+shortcut_cache = _build_shortcut_cache()
@@ -0,0 +1,150 @@
+import logging
+import os
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.wsgi import ClosingIterator
+
+from app import CONSTANTS
+from ..config import config
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # Optional: without it metrics are not recorded and /metrics is unavailable
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+# Set (by gunicorn.conf.py) before prometheus_client is imported, every worker writes its samples to files
+# in this directory and /metrics sums them, whichever worker serves the scrape.
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+# Lookup tier label for each get_shortcut data source
+TIERS = {
+    CONSTANTS.data_source_redis: 'redis',
+    CONSTANTS.data_source_redirect: 'db',
+    CONSTANTS.data_source_upstream: 'upstream_cache',
+}
+LOOKUP_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+PROBE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+if prometheus_client is not None:
+    LOOKUP_SECONDS = prometheus_client.Histogram(
+        'redirector_shortcut_lookup_seconds', 'Shortcut lookup latency by the tier that answered.',
+        ['tier'], buckets=LOOKUP_BUCKETS)
+    REDIRECTS = prometheus_client.Counter(
+        'redirector_redirects', 'Redirects served, by shortcut type.', ['type'])
+    PROBE_SECONDS = prometheus_client.Histogram(
+        'redirector_upstream_probe_seconds', 'Upstream probe latency, by upstream and result.',
+        ['upstream', 'result'], buckets=PROBE_BUCKETS)
+    DB_QUERIES = prometheus_client.Counter(
+        'redirector_db_queries', 'SQL statements executed.')
+    REDIS_ROUND_TRIPS = prometheus_client.Counter(
+        'redirector_redis_round_trips', 'Commands or pipelines sent to Redis.')
+    IN_FLIGHT = prometheus_client.Gauge(
+        'redirector_requests_in_progress', 'Requests being handled.', multiprocess_mode='livesum')
+
+_state = {'hooked': False}
+_lock = threading.Lock()
+
+
+def is_available():
+    return prometheus_client is not None
+
+
+def is_enabled():
+    return is_available() and bool(config.get_configuration().get('metrics', {}).get('enabled', True))
+
+
+def observe_lookup(data_source, seconds, local=False):
+    """Records a get_shortcut lookup; `local` for a hit in the worker's local cache."""
+    if prometheus_client is not None:
+        tier = 'local' if local else TIERS.get(data_source, 'miss')
+        LOOKUP_SECONDS.labels(tier).observe(seconds)
+
+
+def count_redirect(type_):
+    if prometheus_client is not None:
+        REDIRECTS.labels(type_).inc()
+
+
+def observe_probe(upstream, result, seconds):
+    if prometheus_client is not None:
+        PROBE_SECONDS.labels(upstream, result).observe(seconds)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    DB_QUERIES.inc()
+
+
+def _counting_connection_class(cls):
+    if getattr(cls, '_counts_round_trips', False):
+        return cls
+
+    def send_packed_command(self, command, check_health=True):
+        REDIS_ROUND_TRIPS.inc()
+        return cls.send_packed_command(self, command, check_health)
+
+    return type(f"Counting{cls.__name__}", (cls,), {'send_packed_command': send_packed_command,
+                                                    '_counts_round_trips': True})
+
+
+def instrument_redis():
+    """
+    Counts round trips of the app's Redis clients. New connections of their pools get a subclass that
+    counts each packed command it sends (a pipeline is one). Re-run whenever the clients are rebuilt.
+    """
+    if prometheus_client is None:
+        return
+    for client in (config.redis_client, getattr(config, 'redis_binary_client', None)):
+        if client is not None:
+            pool = client.connection_pool
+            pool.connection_class = _counting_connection_class(pool.connection_class)
+
+
+class _InFlightMiddleware:
+    """Counts a request as in flight until its response is closed, so streamed responses count until they end."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        IN_FLIGHT.inc()
+        try:
+            app_iter = self.wsgi_app(environ, start_response)
+        except BaseException:
+            IN_FLIGHT.dec()
+            raise
+        return ClosingIterator(app_iter, IN_FLIGHT.dec)
+
+
+def init_app(app):
+    """Instruments `app` (outermost WSGI layer, so fast-path requests count too), SQLAlchemy and Redis."""
+    if prometheus_client is None:
+        logger.info("prometheus_client is not installed; /metrics is disabled.")
+        return
+    app.wsgi_app = _InFlightMiddleware(app.wsgi_app)
+    with _lock:
+        if not _state['hooked']:
+            event.listen(Engine, 'before_cursor_execute', _count_query)
+            config.add_reload_listener(instrument_redis)  # Runs after a Redis settings change rebuilt the clients
+            _state['hooked'] = True
+    instrument_redis()
+
+
+def render():
+    """Returns (body, content_type) of the metrics exposition, summed over all workers in multiprocess mode."""
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drops the live gauges of an exited worker (gunicorn child_exit hook)."""
+    if prometheus_client is not None and os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,141 @@
+import logging
+import threading
+from collections import Counter
+
+from ..config import config
+from . import invalidation, redis_scan
+from .local_cache import LocalCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+# Redis key marking a pattern that no upstream knows (expires after the configured TTL).
+REDIS_MISS_KEY = "upstream_miss:{pattern}"
+# Redis sorted set of pattern -> number of times it was looked up and missed.
+REDIS_MISS_COUNTS_KEY = "upstream_miss_counts"
+
+
+def _settings():
+    return config.get_configuration().get('upstream_negative_cache', {})
+
+
+def is_enabled():
+    return bool(_settings().get('enabled', True))
+
+
+def get_ttl():
+    return int(_settings().get('ttl_seconds', 300))
+
+
+def _build_local_cache():
+    # Entries are stored with the TTL configured when they are set (or what is left of the Redis key's)
+    cache = LocalCache('upstream_miss', max_entries=10000, ttl_seconds=get_ttl(), guard=invalidation.is_live)
+    invalidation.subscribe('upstream_miss', cache.invalidate)
+    return cache
+
+
+_local = _build_local_cache()
+# Per-worker miss counts, used when Redis is unavailable.
+_local_counts = Counter()
+_local_counts_lock = threading.Lock()
+
+
+def _redis_client():
+    if config.redis_enabled and config.redis_client:
+        return config.redis_client
+    return None
+
+
+def is_known_miss(pattern):
+    """True if `pattern` was recently confirmed missing from every upstream."""
+    if not is_enabled():
+        return False
+    if _local.get(pattern) is not MISSING:
+        return True
+    client = _redis_client()
+    if client is not None:
+        try:
+            # PTTL is -2 for a missing key and -1 for one without an expiry
+            remaining_ms = client.pttl(REDIS_MISS_KEY.format(pattern=pattern))
+        except Exception as e:
+            logger.error(f"Redis PTTL failed for negative cache of '{pattern}': {e}")
+            return False
+        if remaining_ms == -2:
+            return False
+        # Kept locally no longer than Redis keeps it, so the miss expires everywhere at once
+        ttl = get_ttl() if remaining_ms < 0 else min(remaining_ms / 1000, get_ttl())
+        _local.set(pattern, True, ttl_seconds=ttl)
+        return True
+    return False
+
+
+def record_miss(pattern):
+    """Remembers that no upstream knows `pattern` for the configured TTL."""
+    if not is_enabled():
+        return
+    _local.set(pattern, True, ttl_seconds=get_ttl())
+    client = _redis_client()
+    if client is not None:
+        try:
+            client.set(REDIS_MISS_KEY.format(pattern=pattern), 1, ex=get_ttl())
+        except Exception as e:
+            logger.error(f"Redis SET failed for negative cache of '{pattern}': {e}")
+    count_miss(pattern)
+    logger.info(f"Pattern '{pattern}' not found in any upstream; negatively cached for {get_ttl()}s.")
+
+
+def count_miss(pattern):
+    client = _redis_client()
+    if client is not None:
+        try:
+            client.zincrby(REDIS_MISS_COUNTS_KEY, 1, pattern)
+            return
+        except Exception as e:
+            logger.error(f"Redis ZINCRBY failed for miss count of '{pattern}': {e}")
+    with _local_counts_lock:
+        _local_counts[pattern] += 1
+
+
+def clear(pattern=None):
+    """Forgets the negative result for `pattern` (or every pattern) in all workers."""
+    invalidation.publish('upstream_miss', pattern)
+    client = _redis_client()
+    if client is None:
+        return
+    try:
+        if pattern is not None:
+            client.delete(REDIS_MISS_KEY.format(pattern=pattern))
+        else:
+            redis_scan.unlink_matching(client, REDIS_MISS_KEY.format(pattern='*'))
+    except Exception as e:
+        logger.error(f"Failed to clear negative cache for '{pattern or '*'}': {e}")
+
+
+def invalidate_local():
+    """Drops this worker's in-process copy of the negative cache (Redis entries are kept)."""
+    _local.invalidate()
+
+
+def get_top_misses(limit=50):
+    """Returns [(pattern, miss_count, currently_cached)] for the most-missed patterns."""
+    client = _redis_client()
+    top = None
+    if client is not None:
+        try:
+            top = [(p, int(n)) for p, n in client.zrevrange(REDIS_MISS_COUNTS_KEY, 0, limit - 1, withscores=True)]
+        except Exception as e:
+            logger.error(f"Failed to read miss counts from Redis: {e}")
+    if top is None:
+        with _local_counts_lock:
+            top = _local_counts.most_common(limit)
+    return [(p, n, is_known_miss(p)) for p, n in top]
+
+
+def reset_counts():
+    client = _redis_client()
+    if client is not None:
+        try:
+            client.delete(REDIS_MISS_COUNTS_KEY)
+        except Exception as e:
+            logger.error(f"Failed to reset miss counts in Redis: {e}")
+    with _local_counts_lock:
+        _local_counts.clear()
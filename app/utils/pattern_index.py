@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import select
+
+from model import db
+from model.redirect import Redirect
+from . import invalidation
+
+logger = logging.getLogger(__name__)
+
+# Index rebuilt at most this often when invalidations can't be heard (see invalidation.is_live).
+UNGUARDED_MAX_AGE_SECONDS = 30
+
+
+class PatternTrie:
+    """
+    Trie of namespaced patterns ('team/foo') keyed by lowercase path segment. Only patterns containing
+    a '/' are indexed: flat patterns are still looked up by the first segment, so the trie stays small.
+    """
+    __slots__ = ('_root', 'size')
+
+    def __init__(self, patterns=()):
+        self._root = {}
+        self.size = 0
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern):
+        segments = pattern.strip().strip('/').lower().split('/')
+        if len(segments) < 2:
+            return
+        node = self._root
+        for segment in segments:
+            node = node.setdefault(segment, {})
+        if None not in node:
+            self.size += 1
+        node[None] = pattern  # The None key marks a registered pattern, stored as saved
+
+    def longest_match(self, segments):
+        """
+        Returns (pattern, depth) for the longest registered pattern that is a prefix of `segments`
+        (lowercase path segments), or (None, 0). One walk down the trie, no backtracking.
+        """
+        node = self._root
+        match, depth = None, 0
+        for i, segment in enumerate(segments):
+            node = node.get(segment)
+            if node is None:
+                break
+            if None in node:
+                match, depth = node[None], i + 1
+        return match, depth
+
+
+# 'version' counts invalidations, so a build that overlapped one can tell its result is already stale
+_state = {'trie': None, 'built_at': 0.0, 'version': 0}
+_lock = threading.Lock()
+
+
+def invalidate():
+    _state['version'] += 1
+    _state['trie'] = None
+
+
+def _on_shortcut_invalidated(pattern):
+    # Only changes to namespaced patterns (or "everything") affect the trie
+    if pattern is None or '/' in pattern:
+        invalidate()
+
+
+invalidation.subscribe('shortcut', _on_shortcut_invalidated)
+
+
+def _build():
+    rows = db.session.execute(select(Redirect.pattern).where(Redirect.pattern.contains('/'))).scalars()
+    trie = PatternTrie(rows)
+    logger.debug(f"Built namespaced pattern index with {trie.size} patterns.")
+    return trie
+
+
+def current_index():
+    """This worker's PatternTrie if it is built and still trusted, else None. Never touches the DB."""
+    trie = _state['trie']
+    if trie is not None and (invalidation.is_live()
+                             or time.monotonic() - _state['built_at'] < UNGUARDED_MAX_AGE_SECONDS):
+        return trie
+    return None
+
+
+def get_index():
+    """This worker's PatternTrie, rebuilt from the DB after a namespaced pattern changes. Needs an app context."""
+    trie = current_index()
+    if trie is not None:
+        return trie
+    with _lock:
+        trie = current_index()  # Built by another greenlet while this one waited
+        if trie is not None:
+            return trie
+        version, built_at = _state['version'], time.monotonic()
+        trie = _build()  # Yields to other greenlets on the DB query
+        # An invalidation that arrived while building leaves the index to be rebuilt next time
+        if _state['version'] == version:
+            _state['trie'], _state['built_at'] = trie, built_at
+        return trie
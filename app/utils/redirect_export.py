@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+import logging
+import zlib
+
+from sqlalchemy import select
+
+from model import db
+from model.redirect import Redirect
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ('id', 'pattern', 'type', 'target', 'access_count', 'created_at', 'updated_at',
+                 'created_ip', 'updated_ip')
+DEFAULT_BATCH_SIZE = 1000
+# Output is handed to the response in chunks of roughly this many characters.
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_redirect_rows(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yields every redirect as a dict of EXPORT_FIELDS, reading the table in keyset-paginated
+    pages (`WHERE id > last_id ORDER BY id LIMIT n`) of plain rows, so memory stays flat
+    and no ORM objects pile up in the session.
+    """
+    columns = [getattr(Redirect, f) for f in EXPORT_FIELDS]
+    last_id = None
+    while True:
+        stmt = select(*columns).order_by(Redirect.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(Redirect.id > last_id)
+        rows = db.session.execute(stmt).all()
+        if not rows:
+            return
+        for row in rows:
+            yield dict(zip(EXPORT_FIELDS, row))
+        last_id = rows[-1][0]
+        if len(rows) < batch_size:
+            return
+
+
+def _chunked(pieces):
+    buf = []
+    size = 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield ''.join(buf)
+
+
+def iter_json_array(rows):
+    """A JSON array, one object per line; the same document the import page accepts."""
+    def pieces():
+        yield '['
+        first = True
+        for row in rows:
+            yield ('\n' if first else ',\n') + json.dumps(row)
+            first = False
+        yield '\n]\n'
+    return _chunked(pieces())
+
+
+def iter_ndjson(rows):
+    return _chunked(json.dumps(row) + '\n' for row in rows)
+
+
+def iter_csv(rows):
+    def pieces():
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            if out.tell() >= CHUNK_SIZE:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue()
+    return _chunked(pieces())
+
+
+def gzip_chunks(chunks):
+    """Gzip-compresses a stream of text chunks incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# format -> (mimetype, file extension, serializer)
+FORMATS = {
+    'json': ('application/json', 'json', iter_json_array),
+    'ndjson': ('application/x-ndjson', 'ndjson', iter_ndjson),
+    'csv': ('text/csv', 'csv', iter_csv),
+}
+
+
+def export_redirects(fmt='json', compress=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Returns (mimetype, extension, chunks) for a streamed export of the redirects table.
+    Must be iterated inside an app context. Raises ValueError for an unknown format.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    mimetype, extension, serializer = FORMATS[fmt]
+    chunks = serializer(iter_redirect_rows(batch_size))
+    if compress:
+        return 'application/gzip', f"{extension}.gz", gzip_chunks(chunks)
+    return mimetype, extension, (chunk.encode('utf-8') for chunk in chunks)
@@ -0,0 +1,78 @@
+import logging
+
+from ..config import config
+from . import invalidation, request_timing
+from .local_cache import LocalCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+SHORTCUT = 'shortcut'
+UPSTREAM_CACHE = 'upstream_cache'
+KEYSPACES = (SHORTCUT, UPSTREAM_CACHE)
+
+# Counter per keyspace; every cache key embeds it, so INCR retires the whole keyspace at once.
+GENERATION_KEY = "keyspace_gen:{keyspace}"
+# How long a worker trusts its copy of a generation when it can't hear invalidations.
+GENERATION_CACHE_SECONDS = 5
+
+_generations = LocalCache('redis_generation', max_entries=len(KEYSPACES), ttl_seconds=GENERATION_CACHE_SECONDS,
+                          guard=invalidation.is_live)
+invalidation.subscribe('redis_generation', _generations.invalidate)
+
+
+def _redis_client():
+    if config.redis_enabled and config.redis_client:
+        return config.redis_client
+    return None
+
+
+def get_ttl():
+    """TTL of every versioned key; keys of retired generations simply expire."""
+    return int(config.get_configuration().get('redis_keys', {}).get('ttl_seconds', 86400))
+
+
+def generation(keyspace):
+    """Current generation of `keyspace` (0 until it is first bumped)."""
+    cached = _generations.get(keyspace)
+    if cached is not MISSING:
+        return cached
+    client = _redis_client()
+    if client is None:
+        return 0
+    epoch = _generations.generation
+    try:
+        with request_timing.phase('redis'):
+            gen = int(client.get(GENERATION_KEY.format(keyspace=keyspace)) or 0)
+    except Exception as e:
+        logger.error(f"Redis GET failed for generation of '{keyspace}': {e}")
+        return 0
+    _generations.set(keyspace, gen, generation=epoch)
+    return gen
+
+
+def key(keyspace, *parts):
+    """Versioned key, e.g. key('shortcut', 'docs') -> 'v3:shortcut:docs'."""
+    return ':'.join((f"v{generation(keyspace)}", keyspace) + tuple(str(p) for p in parts))
+
+
+def tag_key(keyspace, tag):
+    """Set of the keys (or key parts) of `keyspace` filed under `tag`, in the current generation."""
+    return f"v{generation(keyspace)}:{keyspace}_tag:{tag}"
+
+
+def bump(keyspace):
+    """
+    Invalidates every key of `keyspace` with a single INCR. Entries of the old generation are no longer
+    read and expire on their TTL. Returns the new generation, or None if Redis is unavailable.
+    """
+    client = _redis_client()
+    if client is None:
+        return None
+    try:
+        gen = client.incr(GENERATION_KEY.format(keyspace=keyspace))
+    except Exception as e:
+        logger.error(f"Redis INCR failed for generation of '{keyspace}': {e}")
+        return None
+    invalidation.publish('redis_generation', keyspace)
+    logger.info(f"Redis keyspace '{keyspace}' moved to generation {gen}.")
+    return gen
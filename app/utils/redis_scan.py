@@ -0,0 +1,103 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# SCAN calls made for one browser page before returning what was found, so a sparse match can't stall a request
+MAX_SCANS_PER_PAGE = 20
+MGET_BATCH_SIZE = 100
+UNLINK_BATCH_SIZE = 500
+# Values longer than this are cut for display
+VALUE_PREVIEW_CHARS = 300
+
+_GLOB_SPECIAL = re.compile(r'([\\*?\[\]])')
+
+# Redis type -> command giving its size (strings are measured from the MGET'd value)
+_SIZE_COMMANDS = {'hash': 'hlen', 'list': 'llen', 'set': 'scard', 'zset': 'zcard', 'stream': 'xlen'}
+
+
+def prefix_match(prefix):
+    """SCAN MATCH pattern for keys starting with `prefix` (glob characters in it are escaped)."""
+    return _GLOB_SPECIAL.sub(r'\\\1', prefix or '') + '*'
+
+
+def scan_page(client, match='*', cursor=0, count=DEFAULT_PAGE_SIZE):
+    """
+    Returns (keys, next_cursor) for one page of keys matching `match`, using SCAN only.
+    next_cursor is 0 once the keyspace has been fully iterated. As with SCAN itself, a key may show up
+    on more than one page if the keyspace is resized meanwhile.
+    """
+    count = max(1, min(int(count or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    keys = []
+    for _ in range(MAX_SCANS_PER_PAGE):
+        cursor, batch = client.scan(cursor=cursor, match=match, count=count)
+        keys.extend(batch)
+        if not cursor or len(keys) >= count:
+            break
+    return keys, int(cursor)
+
+
+def _preview(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='replace')
+    return value if len(value) <= VALUE_PREVIEW_CHARS else value[:VALUE_PREVIEW_CHARS] + '…'
+
+
+def describe_keys(client, keys):
+    """
+    Returns a dict per key with 'key', 'type', 'ttl' (seconds; -1 = no expiry, -2 = gone), 'size' and
+    'value' (a preview, strings only). Uses one pipelined round trip for TYPE/TTL and one for the
+    MGET batches and size commands, instead of a command per key.
+    """
+    if not keys:
+        return []
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.type(key)
+        pipe.ttl(key)
+    replies = pipe.execute()
+    rows = [{'key': key, 'type': replies[2 * i], 'ttl': replies[2 * i + 1], 'size': None, 'value': None}
+            for i, key in enumerate(keys)]
+    for row in rows:
+        if isinstance(row['type'], bytes):
+            row['type'] = row['type'].decode()
+
+    strings = [row for row in rows if row['type'] == 'string']
+    others = [row for row in rows if row['type'] in _SIZE_COMMANDS]
+    pipe = client.pipeline(transaction=False)
+    for start in range(0, len(strings), MGET_BATCH_SIZE):
+        pipe.mget([row['key'] for row in strings[start:start + MGET_BATCH_SIZE]])
+    for row in others:
+        getattr(pipe, _SIZE_COMMANDS[row['type']])(row['key'])
+    replies = pipe.execute()
+
+    mget_replies = len(range(0, len(strings), MGET_BATCH_SIZE))
+    values = [value for batch in replies[:mget_replies] for value in batch]
+    for row, value in zip(strings, values):
+        row['value'] = _preview(value)
+        row['size'] = len(value) if value is not None else None
+    for row, size in zip(others, replies[mget_replies:]):
+        row['size'] = size
+    return rows
+
+
+def unlink_matching(client, match='*', batch_size=UNLINK_BATCH_SIZE):
+    """
+    Deletes every key matching `match` without KEYS: SCAN in batches and UNLINK each batch, so Redis frees
+    the memory in the background and never blocks on the whole keyspace. Returns the number of keys removed.
+    """
+    removed = 0
+    batch = []
+    for key in client.scan_iter(match=match, count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            removed += client.unlink(*batch)
+            batch = []
+    if batch:
+        removed += client.unlink(*batch)
+    logger.debug(f"Unlinked {removed} Redis keys matching '{match}'.")
+    return removed
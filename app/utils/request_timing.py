@@ -0,0 +1,228 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, g, has_request_context, request, session, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# Admins add ?_profile=1 or this header to run one request under cProfile
+PROFILE_ARG = '_profile'
+PROFILE_HEADER = 'X-Profile'
+# Set instead of X-Profile-Id when the request could not be profiled
+PROFILE_SKIPPED_HEADER = 'X-Profile-Skipped'
+# Profiles kept in data/profiles; the oldest are removed past this
+MAX_PROFILES = 50
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+\.prof$')
+
+_state = {'hooked': False}
+# One profile per worker at a time: cProfile hooks the OS thread, which all greenlets share under gevent
+# (a second enable() raises ValueError since Python 3.12, and would mix both requests' calls before that)
+_profile_lock = threading.Lock()
+
+
+class Timings:
+    """Time spent per phase during one request, in seconds. Phases may nest (an upstream lookup includes DB time)."""
+    __slots__ = ('started', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    def add(self, name, seconds):
+        total, count = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (total + seconds, count + 1)
+
+    def header(self):
+        """Server-Timing value, e.g. 'db;dur=1.204;desc="2 calls", total;dur=3.110'."""
+        parts = [f'{name};dur={total * 1000:.3f};desc="{count} call{"s" if count != 1 else ""}"'
+                 for name, (total, count) in self.phases.items()]
+        parts.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.3f}')
+        return ', '.join(parts)
+
+
+def get_settings():
+    return config.get_configuration().get('request_timing', {})
+
+
+def is_server_timing_enabled():
+    return bool(get_settings().get('server_timing', False))
+
+
+def current():
+    """Timings of the current request, or None when it isn't being timed (or outside a request)."""
+    if not has_request_context():
+        return None
+    return g.get('_timings')
+
+
+@contextmanager
+def phase(name):
+    """Adds the time spent in the block to phase `name` of the current request, if it is being timed."""
+    timings = current()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def _profile_requested():
+    return bool(request.args.get(PROFILE_ARG) or request.headers.get(PROFILE_HEADER)) and \
+        bool(session.get('admin_logged_in'))
+
+
+def _before_request():
+    profile = _profile_requested()
+    if profile or is_server_timing_enabled():
+        g._timings = Timings()
+    if profile:
+        g._profiler = _start_profiler()
+        if g._profiler is None:
+            g._profile_skipped = True
+
+
+def _start_profiler():
+    """A running profiler, or None if another request of this worker is being profiled."""
+    if not _profile_lock.acquire(blocking=False):
+        logger.info(f"Not profiling {request.method} {request.path}: another request is being profiled.")
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:  # Another profiler (e.g. a debugger's) is active on this thread
+        _profile_lock.release()
+        logger.info(f"Not profiling {request.method} {request.path}: {e}")
+        return None
+    return profiler
+
+
+def _stop_profiler():
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+    return profiler
+
+
+def _after_request(response):
+    profiler = _stop_profiler()
+    if profiler is not None:
+        name = save_profile(profiler)
+        if name:
+            response.headers['X-Profile-Id'] = name
+    elif g.pop('_profile_skipped', False):
+        response.headers[PROFILE_SKIPPED_HEADER] = 'another request is being profiled'
+    timings = g.get('_timings')
+    if timings is not None:
+        response.headers['Server-Timing'] = timings.header()
+    return response
+
+
+def _teardown_request(exc):
+    # after_request is skipped when the request failed outside an error handler
+    _stop_profiler()
+
+
+def _before_render(sender, template, context, **extra):
+    if current() is not None:
+        g._render_started = time.perf_counter()
+
+
+def _rendered(sender, template, context, **extra):
+    timings = current()
+    started = g.pop('_render_started', None)
+    if timings is not None and started is not None:
+        timings.add('render', time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current() is not None:
+        conn.info.setdefault('_timing_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('_timing_started')
+    timings = current()
+    if started and timings is not None:
+        timings.add('db', time.perf_counter() - started.pop())
+
+
+def get_profile_dir():
+    return os.path.join(config.DATA_DIR, 'profiles')
+
+
+def save_profile(profiler):
+    """
+    Writes `profiler`'s stats to data/profiles (pstats format, e.g. for snakeviz) and returns the file name.
+    Under gevent the profile also covers greenlets that ran while the request waited on I/O; requests
+    arriving meanwhile are not profiled themselves (X-Profile-Skipped).
+    """
+    directory = get_profile_dir()
+    slug = re.sub(r'[^\w-]+', '_', request.path.strip('/'))[:60] or 'root'
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{int(time.perf_counter_ns() % 10**6)}-{slug}.prof"
+    try:
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(directory, name))
+        for old in list_profiles()[MAX_PROFILES:]:
+            os.remove(os.path.join(directory, old['name']))
+    except OSError as e:
+        logger.error(f"Failed to save request profile '{name}': {e}")
+        return None
+    logger.info(f"Saved profile of {request.method} {request.path} as '{name}'.")
+    return name
+
+
+def list_profiles():
+    """Stored profiles, newest first: dicts with 'name', 'size' and 'created' (epoch seconds)."""
+    directory = get_profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if PROFILE_NAME_RE.match(name):
+            stat = os.stat(os.path.join(directory, name))
+            profiles.append({'name': name, 'size': stat.st_size, 'created': stat.st_mtime})
+    return sorted(profiles, key=lambda p: p['created'], reverse=True)
+
+
+def profile_path(name):
+    """Path of stored profile `name`, or None if the name is invalid or unknown."""
+    if not PROFILE_NAME_RE.match(name or ''):
+        return None
+    path = os.path.join(get_profile_dir(), name)
+    return path if os.path.isfile(path) else None
+
+
+def format_profile(path, sort='cumulative', limit=60):
+    """Text summary of a stored profile: the top `limit` functions by `sort`."""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def init_app(app):
+    """Times requests of `app` (Server-Timing) and profiles them on an admin's request. Register before other hooks."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    if not _state['hooked']:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _state['hooked'] = True
@@ -0,0 +1,253 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import gevent
+from gevent.pool import Pool
+
+from ..config import config
+from . import upstream_probe, utils
+
+logger = logging.getLogger(__name__)
+
+# Results of one batch are written to the DB in a single transaction.
+DEFAULT_BATCH_SIZE = 100
+# Finished jobs kept on disk; older result files are pruned.
+MAX_KEPT_JOBS = 20
+JOB_ID_RE = re.compile(r'^[0-9a-f-]+$')
+
+# job_id -> ResyncJob, for jobs started by this worker.
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def _jobs_dir():
+    return os.path.join(config.DATA_DIR, 'resync_jobs')
+
+
+def _now():
+    return datetime.utcnow().isoformat(sep=' ', timespec='seconds')
+
+
+def resync_pattern(up, pattern):
+    """Re-checks one cached `pattern` against upstream `up`. Never raises."""
+    fail_url = up.get('fail_url', '')
+    fail_status_code = str(up.get('fail_status_code')) if up.get('fail_status_code') else None
+    try:
+        resp = upstream_probe.fetch(up, pattern)
+        actual_url = resp.url
+        status_code = str(resp.status_code)
+        fail_url_match = actual_url.startswith(fail_url) if fail_url else False
+        fail_status_match = (fail_status_code is not None and status_code == fail_status_code)
+        if not fail_url_match and (fail_status_code is None or not fail_status_match):
+            return {'pattern': pattern, 'success': True, 'resolved_url': actual_url, 'checked_at': _now()}
+        return {'pattern': pattern, 'success': False, 'error': 'Fail criteria matched', 'checked_at': _now()}
+    except Exception as e:
+        logger.error(f"Resync-all: check failed for '{pattern}' in '{up.get('name')}': {e}")
+        return {'pattern': pattern, 'success': False, 'error': f"Upstream check failed: {str(e)}",
+                'checked_at': _now()}
+
+
+class ResyncJob:
+    """A resync of every cached pattern of one upstream, running in its own greenlet."""
+
+    def __init__(self, upstream, patterns, concurrency, batch_size):
+        self.id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        self.upstream = upstream
+        self.patterns = list(patterns)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.status = 'running'
+        self.error = None
+        self.results = []
+        self.succeeded = 0
+        self.failed = 0
+        self.batch_errors = 0
+        self.started_at = _now()
+        self.finished_at = None
+        self.greenlet = None
+
+    @property
+    def done(self):
+        return self.status != 'running'
+
+    def record(self, result):
+        self.results.append(result)
+        if result['success']:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def to_dict(self, include_results=True):
+        data = {
+            'job_id': self.id,
+            'upstream': self.upstream,
+            'status': self.status,
+            'error': self.error,
+            'total': len(self.patterns),
+            'processed': len(self.results),
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'batch_errors': self.batch_errors,
+            'concurrency': self.concurrency,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if include_results:
+            data['results'] = list(self.results)
+        return data
+
+    def join(self, timeout=None):
+        if self.greenlet is not None:
+            self.greenlet.join(timeout)
+
+    def _commit_batch(self, batch):
+        resolved = [(r['pattern'], r['resolved_url'], r['checked_at']) for r in batch if r['success']]
+        unresolved = [r['pattern'] for r in batch if not r['success']]
+        try:
+            utils.apply_upstream_cache_batch(self.upstream, resolved, unresolved)
+        except Exception as e:
+            self.batch_errors += 1
+            for r in batch:
+                r['saved'] = False
+            logger.error(f"Resync-all job {self.id}: failed to save a batch of {len(batch)} results: {e}")
+        _append_results(self, batch)
+        _save(self)
+
+    def run(self, app, up):
+        logger.info(f"Resync-all job {self.id} started for '{self.upstream}': {len(self.patterns)} patterns, "
+                    f"concurrency {self.concurrency}.")
+        pool = Pool(self.concurrency)
+        batch = []
+        with app.app_context():
+            try:
+                for result in pool.imap_unordered(lambda p: resync_pattern(up, p), self.patterns):
+                    self.record(result)
+                    batch.append(result)
+                    if len(batch) >= self.batch_size:
+                        self._commit_batch(batch)
+                        batch = []
+                if batch:
+                    self._commit_batch(batch)
+                self.status = 'finished'
+            except Exception as e:
+                logger.exception(f"Resync-all job {self.id} for '{self.upstream}' failed.")
+                self.status = 'failed'
+                self.error = str(e)
+            finally:
+                pool.kill()
+                self.finished_at = _now()
+                _save(self)
+                with _jobs_lock:
+                    _jobs.pop(self.id, None)
+        logger.info(f"Resync-all job {self.id} {self.status} for '{self.upstream}': {self.succeeded} resolved, "
+                    f"{self.failed} not found.")
+
+
+def _summary_path(job_id):
+    return os.path.join(_jobs_dir(), f"{job_id}.json")
+
+
+def _results_path(job_id):
+    return os.path.join(_jobs_dir(), f"{job_id}.results.ndjson")
+
+
+def _append_results(job, batch):
+    """Appends one batch of results; the file only ever grows by the new batch."""
+    try:
+        os.makedirs(_jobs_dir(), exist_ok=True)
+        with open(_results_path(job.id), 'a') as f:
+            f.writelines(json.dumps(r) + '\n' for r in batch)
+    except Exception as e:
+        logger.error(f"Failed to persist results of resync job {job.id}: {e}")
+
+
+def _save(job):
+    """
+    Persists the job summary as JSON so its progress outlives the request (and is visible to every
+    worker). Results are not part of it: they are appended per batch by _append_results.
+    """
+    try:
+        os.makedirs(_jobs_dir(), exist_ok=True)
+        path = _summary_path(job.id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(job.to_dict(include_results=False), f)
+        os.replace(tmp_path, path)
+        if job.done:
+            _prune()
+    except Exception as e:
+        logger.error(f"Failed to persist resync job {job.id}: {e}")
+
+
+def _read_results(job_id):
+    try:
+        with open(_results_path(job_id)) as f:
+            # A line still being appended by the running job is skipped until it is complete
+            return [json.loads(line) for line in f if line.endswith('\n')]
+    except FileNotFoundError:
+        return []
+
+
+def _prune():
+    files = sorted(f for f in os.listdir(_jobs_dir()) if f.endswith('.json'))
+    for name in files[:-MAX_KEPT_JOBS]:
+        job_id = name[:-len('.json')]
+        for path in (_summary_path(job_id), _results_path(job_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def start_job(app, up, patterns, concurrency=None, batch_size=None):
+    """
+    Starts resyncing `patterns` against upstream `up` in a background greenlet and returns the job.
+    Concurrency defaults to the upstream's HTTP `pool_size`, so every check gets a pooled connection.
+    """
+    concurrency = int(concurrency or up.get('pool_size') or upstream_probe.DEFAULT_POOL_SIZE)
+    job = ResyncJob(up.get('name'), patterns, max(1, concurrency), int(batch_size or DEFAULT_BATCH_SIZE))
+    with _jobs_lock:
+        _jobs[job.id] = job
+    _save(job)
+    job.greenlet = gevent.spawn(job.run, app, up)
+    return job
+
+
+def get_job(job_id, include_results=True):
+    """Returns the job as a dict, from this worker's running jobs or from its persisted summary and results."""
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job.to_dict(include_results)
+    if not JOB_ID_RE.match(job_id or ''):
+        return None
+    try:
+        with open(_summary_path(job_id)) as f:
+            data = json.load(f)
+        if include_results:
+            data['results'] = _read_results(job_id)
+        return data
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Failed to read resync job {job_id}: {e}")
+        return None
+
+
+def list_jobs(upstream=None):
+    """Returns summaries of the persisted jobs, newest first, optionally for one upstream."""
+    try:
+        files = sorted((f for f in os.listdir(_jobs_dir()) if f.endswith('.json')), reverse=True)
+    except FileNotFoundError:
+        return []
+    jobs = []
+    for name in files:
+        job = get_job(name[:-len('.json')], include_results=False)
+        if job and (upstream is None or job.get('upstream') == upstream):
+            jobs.append(job)
+    return jobs
@@ -0,0 +1,72 @@
+import json
+import logging
+import struct
+
+from app import CONSTANTS
+from .target_template import compile_template
+
+logger = logging.getLogger(__name__)
+
+# Binary cache record for a shortcut, holding only what the redirect path needs:
+#   version (1 byte) | type code (1 byte) | target (UTF-8, rest of the value)
+# A legacy JSON record starts with '{', which can never be a version byte.
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('>BB')
+
+_TYPE_CODES = {CONSTANTS.DATA_TYPE_STATIC: 0, CONSTANTS.DATA_TYPE_DYNAMIC: 1}
+_TYPES = {code: type_ for type_, code in _TYPE_CODES.items()}
+
+
+class RecordFormatError(ValueError):
+    """A cached value that is neither a known binary record nor legacy JSON."""
+
+
+def encode(type_, target):
+    """Packs a shortcut for Redis. Returns None for a type the format has no code for (left uncached)."""
+    code = _TYPE_CODES.get(type_)
+    if code is None:
+        return None
+    return _HEADER.pack(FORMAT_VERSION, code) + target.encode('utf-8')
+
+
+def decode(pattern, raw):
+    """
+    Unpacks a cached value into the shortcut dict get_shortcut returns ('pattern', 'type', 'target',
+    'data_type'). Returns (shortcut, needs_upgrade); needs_upgrade is True for a legacy JSON record,
+    which the caller should rewrite in the current format.
+
+    Raises:
+        RecordFormatError: For an unknown version, type code or undecodable value.
+    """
+    if not raw:
+        raise RecordFormatError('Empty record.')
+    if raw[:1] == b'{':
+        try:
+            legacy = json.loads(raw)
+            type_, target = legacy['type'], legacy['target']
+        except (ValueError, KeyError, TypeError) as e:
+            raise RecordFormatError(f'Invalid legacy JSON record: {e}')
+        return shortcut_dict(pattern, type_, target), True
+    if len(raw) < _HEADER.size:
+        raise RecordFormatError('Truncated record.')
+    version, code = _HEADER.unpack_from(raw)
+    if version != FORMAT_VERSION:
+        raise RecordFormatError(f'Unknown record version {version}.')
+    if code not in _TYPES:
+        raise RecordFormatError(f'Unknown type code {code}.')
+    try:
+        target = raw[_HEADER.size:].decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise RecordFormatError(f'Invalid target encoding: {e}')
+    return shortcut_dict(pattern, _TYPES[code], target), False
+
+
+def shortcut_dict(pattern, type_, target):
+    """
+    The shortcut shape served by get_shortcut, whether it came from Redis or the DB. Dynamic shortcuts
+    carry their parsed 'template', which is cached with the shortcut in the worker's local cache.
+    """
+    shortcut = {'pattern': pattern, 'type': type_, 'target': target, 'data_type': type_}
+    if type_ == CONSTANTS.DATA_TYPE_DYNAMIC:
+        shortcut['template'] = compile_template(target)
+    return shortcut
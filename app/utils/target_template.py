@@ -0,0 +1,75 @@
+import functools
+import re
+
+# {name} placeholders in a dynamic target; {0}, {1}... address path segments by position
+PLACEHOLDER_RE = re.compile(r'\{([^}]+)\}')
+
+
+class TargetTemplate:
+    """
+    A dynamic target parsed once into literal text and placeholder slots, so expanding it per request
+    is a join. Named placeholders take the path segments after the pattern in order of first appearance
+    (`{project}/{id}` with `PROJ/123`); numeric ones pick a segment by index. A repeated name reuses
+    its value.
+    """
+    __slots__ = ('source', 'placeholders', 'names', '_literals', '_slots', '_positions', '_arity')
+
+    def __init__(self, source):
+        self.source = source
+        literals, placeholders, slots, names = [], [], [], []
+        last = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            literals.append(source[last:match.start()])
+            name = match.group(1)
+            if name not in names:
+                names.append(name)
+            placeholders.append(name)
+            slots.append(names.index(name))
+            last = match.end()
+        literals.append(source[last:])
+        self.placeholders = tuple(placeholders)  # Every occurrence, in order
+        self.names = tuple(names)  # Distinct, in order of first appearance
+        self._literals = tuple(literals)
+        self._slots = tuple(slots)
+
+        # Path segment each distinct name reads
+        positions, named = [], 0
+        for name in names:
+            if name.isdigit():
+                positions.append(int(name))
+            else:
+                positions.append(named)
+                named += 1
+        self._positions = tuple(positions)
+        self._arity = max(positions) + 1 if positions else 0
+
+    def _join(self, values):
+        parts = [self._literals[0]]
+        for slot, literal in zip(self._slots, self._literals[1:]):
+            parts.append(values[slot])
+            parts.append(literal)
+        return ''.join(parts)
+
+    def fill(self, value):
+        """Replaces every placeholder with `value`."""
+        value = str(value)
+        return self._join([value] * len(self.names))
+
+    def expand(self, variable):
+        """
+        Expands the template for the path after the pattern. A template needing one segment gets the whole
+        path; otherwise the path is split on '/' (the last placeholder keeps the rest). A path with fewer
+        segments than the template needs fills every placeholder with the whole path, as before.
+        """
+        if self._arity <= 1:
+            return self.fill(variable)
+        segments = variable.split('/', self._arity - 1)
+        if len(segments) < self._arity:
+            return self.fill(variable)
+        return self._join([segments[position] for position in self._positions])
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_template(target):
+    """Parsed TargetTemplate for `target`, memoized per worker."""
+    return TargetTemplate(target)
@@ -0,0 +1,99 @@
+import base64
+import json
+import logging
+import re
+
+from sqlalchemy import and_, or_, select
+
+from model import db
+from model.upstream_check_log import UpstreamCheckLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Values upstream_probe writes to `result`, offered as filter choices
+RESULTS = ('success', 'fail', 'timeout', 'connection_error', 'request_exception', 'exception', 'skipped')
+
+_STATUS_CODE_RE = re.compile(r'status_code=(\d+)')
+_ACTUAL_URL_RE = re.compile(r'actual_url=([^,]+)')
+
+
+def encode_cursor(tried_at, log_id):
+    return base64.urlsafe_b64encode(json.dumps([tried_at, log_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Returns (tried_at, id) from a cursor made by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        tried_at, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor.')
+    if not isinstance(tried_at, str) or not isinstance(log_id, int):
+        raise ValueError('Invalid cursor.')
+    return tried_at, log_id
+
+
+def log_to_dict(row):
+    """Shapes a log row for the page/API, pulling status_code and actual_url out of `detail`."""
+    details = row.detail or ''
+    is_exception = (row.result or '').lower() == 'exception'
+    status_match = _STATUS_CODE_RE.search(details)
+    url_match = _ACTUAL_URL_RE.search(details)
+    return {
+        'id': row.id,
+        'time': row.tried_at,
+        'shortcut': row.pattern,
+        'upstream': row.upstream_name,
+        'check_url': row.check_url,
+        'result': row.result,
+        'details': details,
+        'count': row.count,
+        'cache_info': bool(row.cached),
+        'status_code': status_match.group(1) if status_match else '-',
+        'actual_url': url_match.group(1).strip() if url_match else '-',
+        'exception_msg': details if is_exception else '',
+    }
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with `prefix`, so a prefix match is an index range."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def get_logs_page(limit=DEFAULT_PAGE_SIZE, cursor=None, pattern=None, upstream=None, result=None):
+    """
+    Returns one page of upstream check logs, most recently tried first.
+
+    Keyset-paginated on (tried_at, id): each page is `WHERE (tried_at, id) < cursor ORDER BY tried_at DESC,
+    id DESC LIMIT n`, served from the (tried_at, id) indexes, so the cost of a page does not grow with the
+    table. `pattern` is a prefix match; `upstream` and `result` are exact matches.
+
+    Returns:
+        dict: 'logs' (list of dicts, see log_to_dict) and 'next_cursor' (None on the last page).
+
+    Raises:
+        ValueError: For a malformed cursor.
+    """
+    limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    stmt = select(UpstreamCheckLog)
+    if pattern:
+        stmt = stmt.where(UpstreamCheckLog.pattern >= pattern,
+                          UpstreamCheckLog.pattern < _prefix_upper_bound(pattern))
+    if upstream:
+        stmt = stmt.where(UpstreamCheckLog.upstream_name == upstream)
+    if result:
+        stmt = stmt.where(UpstreamCheckLog.result == result.lower())
+    if cursor:
+        tried_at, log_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(UpstreamCheckLog.tried_at < tried_at,
+                              and_(UpstreamCheckLog.tried_at == tried_at, UpstreamCheckLog.id < log_id)))
+    stmt = stmt.order_by(UpstreamCheckLog.tried_at.desc(), UpstreamCheckLog.id.desc()).limit(limit + 1)
+
+    rows = db.session.execute(stmt).scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].tried_at, rows[-1].id)
+    logger.debug(f"Loaded {len(rows)} upstream check logs (more: {next_cursor is not None}).")
+    return {'logs': [log_to_dict(row) for row in rows], 'next_cursor': next_cursor}
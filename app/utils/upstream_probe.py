@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics, request_timing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 5
+
+# Defaults for the optional per-upstream connection settings in the `upstreams` config.
+DEFAULT_CONNECT_TIMEOUT = 3
+DEFAULT_READ_TIMEOUT = DEFAULT_TIMEOUT
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 1
+DEFAULT_BACKOFF = 0.2
+
+# (name, base_url) -> requests.Session with a keep-alive connection pool for that upstream.
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_timeout(up):
+    """Returns the (connect, read) timeout tuple for upstream `up`."""
+    return (float(up.get('connect_timeout') or DEFAULT_CONNECT_TIMEOUT),
+            float(up.get('read_timeout') or DEFAULT_READ_TIMEOUT))
+
+
+def _build_session(up):
+    pool_size = int(up.get('pool_size') or DEFAULT_POOL_SIZE)
+    retries = int(up.get('retries', DEFAULT_RETRIES) or 0)
+    # Only connection failures are retried: a read timeout already cost the full budget.
+    retry = Retry(total=retries, connect=retries, read=0, status=0, redirect=None,
+                  backoff_factor=float(up.get('retry_backoff', DEFAULT_BACKOFF)),
+                  allowed_methods=frozenset({'GET', 'HEAD'}), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry, pool_block=False)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
+
+
+def get_session(up):
+    """Returns the pooled keep-alive session for upstream `up`, creating it on first use."""
+    key = (up.get('name', ''), up.get('base_url', ''))
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _build_session(up)
+            _sessions[key] = session
+            logger.debug(f"Created HTTP session pool for upstream '{key[0]}'.")
+    return session
+
+
+def reset_sessions():
+    """Closes every pooled session; they are rebuilt from the current upstream config on next use."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        try:
+            session.close()
+        except Exception:
+            pass
+    logger.debug(f"Reset {len(sessions)} upstream HTTP session pools.")
+
+
+def fetch(up, pattern):
+    """GETs `pattern` from upstream `up` over its pooled session, following redirects."""
+    base_url = up.get('base_url', '').rstrip('/')
+    return get_session(up).get(f"{base_url}/{pattern}", allow_redirects=True, timeout=get_timeout(up),
+                                verify=up.get('verify_ssl', False))
+
+
+def probe_upstream(up, pattern):
+    """
+    Checks whether `pattern` exists in upstream `up` (an entry of the `upstreams` config).
+    Never raises: every outcome is described by the returned dict, whose 'result' is one of
+    'success', 'fail', 'timeout', 'connection_error', 'request_exception', 'exception'
+    or 'skipped' (no base_url configured).
+    """
+    up_name = up.get('name', '[unnamed]')
+    base_url = up.get('base_url', '').rstrip('/')
+    fail_url = up.get('fail_url', '')
+    fail_status_code = str(up.get('fail_status_code')) if up.get('fail_status_code') else None
+    verify_ssl = up.get('verify_ssl', False)
+    check_url = f"{base_url}/{pattern}"
+    outcome = {
+        'upstream': up_name,
+        'check_url': check_url,
+        'timeout': get_timeout(up)[1],
+        'fail_url': fail_url,
+        'fail_status_code': fail_status_code,
+        'verify_ssl': verify_ssl,
+        'actual_url': None,
+        'status_code': None,
+        'elapsed': 0.0,
+    }
+    if not base_url:
+        outcome.update(result='skipped', detail='No base_url configured')
+        return outcome
+
+    start_time = time.time()
+    try:
+        with request_timing.phase('upstream'):
+            resp = fetch(up, pattern)
+        actual_url = resp.url
+        status_code = str(resp.status_code)
+        fail_url_match = actual_url.startswith(fail_url) if fail_url else False
+        fail_status_match = (fail_status_code is not None and status_code == fail_status_code)
+        outcome.update(actual_url=actual_url, status_code=status_code,
+                       fail_url_match=fail_url_match, fail_status_match=fail_status_match)
+        if not fail_url_match or (fail_status_code and not fail_status_match):
+            outcome.update(result='success', detail=f"actual_url={actual_url}, status_code={status_code}")
+        else:
+            outcome.update(result='fail',
+                           detail=f"actual_url={actual_url}, status_code={status_code}, "
+                                  f"fail_url_match={fail_url_match}, fail_status_match={fail_status_match}")
+    except requests.exceptions.Timeout:
+        outcome.update(result='timeout', detail='Request timed out')
+    except requests.exceptions.ConnectionError as e:
+        outcome.update(result='connection_error', detail=str(e))
+    except requests.exceptions.RequestException as e:
+        outcome.update(result='request_exception', detail=str(e))
+    except Exception as e:
+        logger.exception(f"Unexpected error during upstream check for '{up_name}' and pattern '{pattern}'.")
+        outcome.update(result='exception', detail=str(e))
+    outcome['elapsed'] = round(time.time() - start_time, 6)
+    metrics.observe_probe(up_name, outcome['result'], outcome['elapsed'])
+    return outcome
+
+
+def pick_winner(outcomes, count):
+    """
+    Returns the index of the upstream that resolves the pattern, honouring priority:
+    a success only wins once every higher-priority upstream has finished without one.
+    Returns None while undecided or when nothing matched.
+
+    Args:
+        outcomes (dict): upstream index -> probe_upstream() result, for finished probes.
+        count (int): number of upstreams probed.
+    """
+    for idx in range(count):
+        outcome = outcomes.get(idx)
+        if outcome is None:
+            return None
+        if outcome['result'] == 'success':
+            return idx
+    return None
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import gevent
+from flask import current_app
+
+from ..config import config
+from . import upstream_probe, utils
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRESHNESS_SECONDS = 86400
+# A pattern whose revalidation could not complete is not retried sooner than this.
+RETRY_INTERVAL_SECONDS = 60
+# Redis key held while one worker revalidates a pattern, so the others don't repeat the check.
+REDIS_LOCK_KEY = "upstream_revalidate:{pattern}"
+
+_inflight = set()
+_last_attempt = {}  # pattern -> time.monotonic() of the last revalidation started by this worker
+_lock = threading.Lock()
+_stats = {'started': 0, 'refreshed': 0, 'removed': 0, 'kept': 0}
+
+
+def get_freshness_seconds(up):
+    """Freshness window of upstream `up`: its own `freshness_seconds`, else `upstream_cache.freshness_seconds`."""
+    value = up.get('freshness_seconds')
+    if value is None:
+        value = config.get_configuration().get('upstream_cache', {}).get('freshness_seconds', DEFAULT_FRESHNESS_SECONDS)
+    return int(value or 0)
+
+
+def get_age_seconds(checked_at, now=None):
+    """Age of an UpstreamCache `checked_at` value; naive timestamps are UTC. None if unparseable."""
+    try:
+        checked = datetime.fromisoformat(str(checked_at))
+    except (TypeError, ValueError):
+        return None
+    if checked.tzinfo is None:
+        checked = checked.replace(tzinfo=timezone.utc)
+    return ((now or datetime.now(timezone.utc)) - checked).total_seconds()
+
+
+def is_stale(entry, up):
+    """True if the cached `entry` is past the freshness window of upstream `up` (0 disables revalidation)."""
+    freshness = get_freshness_seconds(up)
+    if freshness <= 0:
+        return False
+    age = get_age_seconds(entry.get('checked_at'))
+    return age is None or age > freshness
+
+
+def _claim(pattern):
+    now = time.monotonic()
+    with _lock:
+        if pattern in _inflight or now - _last_attempt.get(pattern, -RETRY_INTERVAL_SECONDS) < RETRY_INTERVAL_SECONDS:
+            return False
+        if len(_last_attempt) > 10000:
+            _last_attempt.clear()
+        _inflight.add(pattern)
+        _last_attempt[pattern] = now
+    if config.redis_enabled and config.redis_client:
+        try:
+            if not config.redis_client.set(REDIS_LOCK_KEY.format(pattern=pattern), 1, nx=True,
+                                           ex=RETRY_INTERVAL_SECONDS):
+                _release(pattern)
+                return False
+        except Exception as e:
+            logger.error(f"Redis SET NX failed for revalidation lock of '{pattern}': {e}")
+    return True
+
+
+def _release(pattern):
+    with _lock:
+        _inflight.discard(pattern)
+
+
+def revalidate_if_stale(pattern, entry):
+    """
+    Serves-while-revalidating: if the UpstreamCache `entry` for `pattern` is stale, starts a
+    background greenlet that re-checks it against its upstream. Returns True if one was started.
+    """
+    up = next((u for u in utils.get_upstreams() if u.get('name') == entry.get('upstream_name')), None)
+    if not up or not is_stale(entry, up) or not _claim(pattern):
+        return False
+    _stats['started'] += 1
+    logger.info(f"Upstream cache for '{pattern}' in '{up.get('name')}' is stale (checked_at={entry.get('checked_at')}); revalidating.")
+    gevent.spawn(_revalidate, current_app._get_current_object(), pattern, up)
+    return True
+
+
+def _revalidate(app, pattern, up):
+    try:
+        outcome = upstream_probe.probe_upstream(up, pattern)
+        if outcome['result'] not in ('success', 'fail'):
+            # Timeouts and connection errors may be transient: keep serving the stale entry.
+            _stats['kept'] += 1
+            logger.warning(f"Revalidation of '{pattern}' in '{up.get('name')}' inconclusive ({outcome['result']}); keeping cached entry.")
+            return
+        # Same criteria as an admin resync of the entry
+        resolved = not outcome['fail_url_match'] and (outcome['fail_status_code'] is None or not outcome['fail_status_match'])
+        with app.app_context():
+            if resolved:
+                utils.cache_upstream_result(pattern, up.get('name'), outcome['actual_url'])
+                _stats['refreshed'] += 1
+            else:
+                utils.clear_upstream_cache(pattern, upstream_name=up.get('name'))
+                _stats['removed'] += 1
+                logger.info(f"Revalidation: '{pattern}' is no longer in '{up.get('name')}'; cache entry removed.")
+    except Exception:
+        logger.exception(f"Revalidation of '{pattern}' in '{up.get('name')}' failed.")
+    finally:
+        _release(pattern)
+
+
+def stats():
+    return dict(_stats, inflight=len(_inflight))
@@ -1,6 +1,5 @@
 import json
 import os
-import re
 import time
 from datetime import datetime, timezone
 import logging # Import logging
@@ -9,6 +8,9 @@ from model.upstream_check_log import UpstreamCheckLog
 from model.upstream_cache import UpstreamCache
 from model.redirect import Redirect
 from app import CONSTANTS  # Import CONSTANTS for data source strings
+from . import access_counter, bulk_import, import_stream, invalidation, metrics, negative_cache, pattern_index, \
+    redis_keys, request_timing, shortcut_record, target_template, upstream_probe
+from .local_cache import MISSING, shortcut_cache
 
 
 # Get a logger instance for this module
@@ -24,37 +26,19 @@ def get_db_uri():
     logger.warning(f"Database URI not found in config, defaulting to {default_db_uri}")
     return default_db_uri
 
-def _save_config():
-    try:
-        with open(config.CONFIG_FILE, 'w') as f:
-            # Save config sorted by keys
-            json.dump(config.get_configuration(), f, indent=2, sort_keys=True)
-        config.logger.debug(f"✅ Configuration saved (sorted) to {config.CONFIG_FILE}")
-    except IOError as e:
-        config.logger.error(f"❌ Failed to save configuration file {config.CONFIG_FILE}: {e}")
-
-
-
 def get_config(key, default=None):
+    """Reads `key` from the current config snapshot. Never writes: missing keys just return `default`."""
     cfg = config.get_configuration()
     if key in cfg:
         return cfg[key]
-    # Set and return default if not present
-    cfg[key] = default
-    _save_config()
-    logger.info(f"Config key '{key}' not found, set to default: {default}")
+    logger.debug(f"Config key '{key}' not found, using default: {default}")
     return default
 
 def set_config(key, value):
-    cfg = config.get_configuration()
-    cfg[key] = value
-    _save_config()
+    config.save_values({key: value})
     logger.info(f"Config key '{key}' set to '{value}'")
 
 
-
-
-
 def get_admin_password():
     pwd = get_config('admin_password')
     if pwd:
@@ -67,31 +51,20 @@ def get_admin_password():
     return pwd
 
 def get_port():
-    port = get_config('port')
-    if port:
-        return port
-    set_config('port', 80)
-    logger.info("Port not set in config, defaulting to 80.")
-    return 80
+    return config.snapshot.port
 
 def get_auto_redirect_delay():
-    delay = get_config('auto_redirect_delay')
-    if delay is not None:
-        return delay
-    set_config('auto_redirect_delay', 0)
-    logger.info("Auto redirect delay not set, defaulting to 0.")
-    return 0
+    return config.snapshot.auto_redirect_delay
 
 def get_delete_requires_password():
-    val = get_config('delete_requires_password')
-    if val is not None:
-        return val
-    set_config('delete_requires_password', True)
-    logger.info("Delete requires password not set, defaulting to True.")
-    return True
+    return config.snapshot.delete_requires_password
 
 # --- Access count helpers ---
 def increment_access_count(pattern):
+    if access_counter.is_write_behind_enabled():
+        # Buffered per worker and written in batches, so the redirect never waits on a commit.
+        access_counter.record_hit(pattern)
+        return
     redirect_obj = Redirect.query.filter_by(pattern=pattern).first()
     if redirect_obj:
         redirect_obj.access_count = (redirect_obj.access_count or 0) + 1
@@ -104,9 +77,23 @@ def increment_access_count(pattern):
 def get_access_count(pattern):
     redirect_obj = Redirect.query.filter_by(pattern=pattern).first()
     count = redirect_obj.access_count if redirect_obj else 0
+    if redirect_obj:
+        count += access_counter.get_pending_counts([pattern])[pattern]
     logger.debug(f"Retrieved access count for '{pattern}': {count}")
     return count
 
+def shortcuts_with_live_counts(redirect_objs):
+    """Serializes Redirect rows for the dashboard, adding hits not yet reconciled into the DB."""
+    pending = access_counter.get_pending_counts(r.pattern for r in redirect_objs)
+    return [{
+        'pattern': r.pattern,
+        'type': r.type,
+        'target': r.target,
+        'access_count': (r.access_count or 0) + pending.get(r.pattern, 0),
+        'created_at': r.created_at,
+        'updated_at': r.updated_at
+    } for r in redirect_objs]
+
 # Helper to get created/updated times for UI
 def get_created_updated(pattern):
     redirect_obj = Redirect.query.filter_by(pattern=pattern).first()
@@ -153,158 +140,161 @@ def log_upstream_check(pattern: str, upstream_name: str, check_url: str,
         logger.exception(f"Failed to log/update upstream check for '{pattern}' in '{upstream_name}'. Rolled back transaction. Error: {e}")
         raise # Re-raise the exception to propagate it up the call stack for proper error handling
 
-def get_upstream_logs():
-    """
-    Retrieves upstream check logs, orders them, and converts them
-    to a list of dictionaries for easier template rendering.
-    Parses 'detail' string to extract status_code and actual_url.
-    """
-
-    logs = UpstreamCheckLog.query.order_by(UpstreamCheckLog.id.desc()).all()
-    logger.debug(f"Retrieved {len(logs)} upstream check logs.")
-
-    # Convert SQLAlchemy objects to dictionaries, processing 'detail' field
-    processed_logs = []
-    for log_entry in logs:
-        # Prepare common fields
-        log_dict = {
-            'time': log_entry.tried_at,  # Using tried_at directly
-            'shortcut': log_entry.pattern,
-            'upstream': log_entry.upstream_name,
-            'result': log_entry.result,
-            'details': log_entry.detail,  # Keep raw detail for full display
-            'cache_info': log_entry.cached  # This will be True/False
-        }
-
-        # --- Parse status_code and actual_url from 'detail' string ---
-        # This parsing logic now happens in Python, making the template simpler
-        status_code = '-'
-        actual_url = '-'
-        exception_msg = ''
-
-        details_str = log_entry.detail or ''
-        is_exception = (log_entry.result or '').lower() == 'exception'
-
-        if 'status_code=' in details_str:
-            match = re.search(r'status_code=(\d+)', details_str)
-            if match:
-                status_code = match.group(1)
-
-        if 'actual_url=' in details_str:
-            # Matches actual_url= then captures everything until the next comma or end of string
-            match = re.search(r'actual_url=([^,]+)', details_str)
-            if match:
-                actual_url = match.group(1).strip()
-
-        if is_exception:
-            exception_msg = details_str  # If it's an exception, the detail IS the message
-
-        log_dict['status_code'] = status_code
-        log_dict['actual_url'] = actual_url
-        log_dict['exception_msg'] = exception_msg  # Add for direct use in template
-
-        processed_logs.append(log_dict)
-
-    return processed_logs
-
-
-
-
-
 def redis_get(key):
     if config.redis_enabled and config.redis_client:
         try:
-            value = config.redis_client.get(key)
-            logger.debug(f"Redis GET '{key}': {'HIT' if value else 'MISS'}")
+            with request_timing.phase('redis'):
+                value = config.redis_client.get(key)
+            logger.debug("Redis GET '%s': %s", key, 'HIT' if value else 'MISS')
             return value
         except Exception as e:
             logger.error(f"Redis GET failed for key '{key}': {e}")
             return None
-    logger.debug(f"Redis GET '{key}': Skipped (Redis disabled/not connected).")
+    logger.debug("Redis GET '%s': Skipped (Redis disabled/not connected).", key)
     return None
 
 def redis_set(key, value, ex=None): # Added optional expiry 'ex'
     if config.redis_enabled and config.redis_client:
         try:
-            config.redis_client.set(key, value, ex=ex)
-            logger.debug(f"Redis SET '{key}' successfully.")
+            with request_timing.phase('redis'):
+                config.redis_client.set(key, value, ex=ex)
+            logger.debug("Redis SET '%s' successfully.", key)
         except Exception as e:
             logger.error(f"Redis SET failed for key '{key}': {e}")
             pass
     else:
-        logger.debug(f"Redis SET '{key}': Skipped (Redis disabled/not connected).")
+        logger.debug("Redis SET '%s': Skipped (Redis disabled/not connected).", key)
 
 def redis_delete(key):
     if config.redis_enabled and config.redis_client:
         try:
-            config.redis_client.delete(key)
-            logger.debug(f"Redis DELETE '{key}' successfully.")
+            with request_timing.phase('redis'):
+                config.redis_client.delete(key)
+            logger.debug("Redis DELETE '%s' successfully.", key)
         except Exception as e:
             logger.error(f"Redis DELETE failed for key '{key}': {e}")
             pass
     else:
-        logger.debug(f"Redis DELETE '{key}': Skipped (Redis disabled/not connected).")
+        logger.debug("Redis DELETE '%s': Skipped (Redis disabled/not connected).", key)
+
+
+def shortcut_redis_key(pattern):
+    return redis_keys.key(redis_keys.SHORTCUT, pattern)
+
+
+def upstream_cache_redis_key(pattern, upstream_name=None):
+    """Key of the cached upstream result for `pattern`, or of its entry for one upstream."""
+    if upstream_name:
+        return redis_keys.key(redis_keys.UPSTREAM_CACHE, pattern, upstream_name)
+    return redis_keys.key(redis_keys.UPSTREAM_CACHE, pattern)
+
+
+def _redis_get_shortcut(pattern):
+    """Reads the cached record of `pattern`, upgrading a legacy JSON record in place. None on a miss."""
+    client = config.redis_binary_client
+    if client is None:
+        return None
+    key = shortcut_redis_key(pattern)
+    try:
+        with request_timing.phase('redis'):
+            raw = client.get(key)
+    except Exception as e:
+        logger.error(f"Redis GET failed for key '{key}': {e}")
+        return None
+    if raw is None:
+        return None
+    try:
+        shortcut, needs_upgrade = shortcut_record.decode(pattern, raw)
+    except shortcut_record.RecordFormatError as e:
+        logger.error(f"Unreadable Redis record for shortcut:{pattern}: {e}. Deleting entry.")
+        redis_delete(key)
+        return None
+    if needs_upgrade:
+        _redis_set_shortcut(pattern, shortcut['type'], shortcut['target'])
+    return shortcut
+
+
+def _redis_set_shortcut(pattern, type_, target):
+    client = config.redis_binary_client
+    if client is None:
+        return
+    key = shortcut_redis_key(pattern)
+    record = shortcut_record.encode(type_, target)
+    try:
+        with request_timing.phase('redis'):
+            if record is None:
+                client.delete(key)  # A type the record format can't carry is served from the DB
+            else:
+                client.set(key, record, ex=redis_keys.get_ttl())
+    except Exception as e:
+        logger.error(f"Redis SET failed for key '{key}': {e}")
+
+
+def invalidate_local_shortcut(pattern=None):
+    """Drops `pattern` (or every shortcut when None) from the in-process cache of all workers."""
+    invalidation.publish('shortcut', pattern)
+
+
+def get_local_cache_stats():
+    return shortcut_cache.stats()
 
 
 def get_shortcut(pattern):
     start_time = time.time()
+    cached = shortcut_cache.get(pattern)
+    if cached is not MISSING:
+        shortcut, source = cached
+        logger.debug("Shortcut '%s' HIT from local cache. Source: %s", pattern, source)
+        resp_time = round(time.time() - start_time, 6)
+        metrics.observe_lookup(source, resp_time, local=True)
+        return shortcut, source, resp_time
+
+    generation = shortcut_cache.generation
+    shortcut, source = _get_shortcut_uncached(pattern)
+    if shortcut:
+        shortcut_cache.set(pattern, (shortcut, source), generation=generation)
+    resp_time = round(time.time() - start_time, 6)
+    metrics.observe_lookup(source, resp_time)
+    return shortcut, source, resp_time
+
+
+def _get_shortcut_uncached(pattern):
     source = CONSTANTS.data_source_redis # Default source assumption
 
     if config.redis_enabled:
-        val = redis_get(f"shortcut:{pattern}")
-        if val:
-            try:
-                shortcut = json.loads(val)
-                # Ensure data_type is present for consistency, if not already
-                if 'data_type' not in shortcut:
-                    shortcut['data_type'] = shortcut.get('type', CONSTANTS.DATA_TYPE_STATIC)
-                logger.debug(f"Shortcut '{pattern}' HIT from Redis. Source: {source}")
-                return shortcut, source, round(time.time() - start_time, 6)
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error from Redis for shortcut:{pattern}: {e}. Deleting corrupt entry.")
-                redis_delete(f"shortcut:{pattern}") # If cached data is corrupt, delete it
-            except Exception as e:
-                logger.exception(f"Unexpected error processing Redis shortcut:{pattern}. Deleting entry.")
-                redis_delete(f"shortcut:{pattern}") # Delete if other unexpected error
+        shortcut = _redis_get_shortcut(pattern)
+        if shortcut:
+            logger.debug("Shortcut '%s' HIT from Redis. Source: %s", pattern, source)
+            return shortcut, source
 
     # Fallback to DB (and hydrate Redis if enabled)
     source = CONSTANTS.data_source_redirect
     redirect_obj = Redirect.query.filter_by(pattern=pattern).first()
     if redirect_obj:
-        shortcut = {
-            'pattern': redirect_obj.pattern,
-            'type': redirect_obj.type,
-            'target': redirect_obj.target,
-            'access_count': redirect_obj.access_count if redirect_obj.access_count is not None else 0,
-            'created_at': redirect_obj.created_at,
-            'updated_at': redirect_obj.updated_at,
-            'data_type': redirect_obj.type # Assuming 'type' maps to CONSTANTS.DATA_TYPE_STATIC/DYNAMIC
-        }
+        shortcut = shortcut_record.shortcut_dict(redirect_obj.pattern, redirect_obj.type, redirect_obj.target)
         # Hydrate Redis
         if config.redis_enabled:
-            try:
-                redis_set(f"shortcut:{pattern}", json.dumps(shortcut))
-                logger.debug(f"Shortcut '{pattern}' MISS from Redis, HIT from DB. Hydrated Redis.")
-            except Exception as e:
-                logger.error(f"Failed to hydrate Redis with shortcut:{pattern}: {e}")
+            _redis_set_shortcut(pattern, redirect_obj.type, redirect_obj.target)
+            logger.debug("Shortcut '%s' MISS from Redis, HIT from DB. Hydrated Redis.", pattern)
         else:
-            logger.debug(f"Shortcut '{pattern}' HIT from DB (Redis disabled).")
-        return shortcut, source, round(time.time() - start_time, 6)
+            logger.debug("Shortcut '%s' HIT from DB (Redis disabled).", pattern)
+        return shortcut, source
 
     # Check upstream DB cache (and hydrate Redis if enabled)
     source = CONSTANTS.data_source_upstream
     if is_upstream_cache_enabled():
-        cached_upstream_result = get_cached_upstream_result_from_db(pattern=pattern)
+        with request_timing.phase('upstream'):
+            cached_upstream_result = get_cached_upstream_result_from_db(pattern=pattern)
         if cached_upstream_result:
             # Add data_type to cached result for consistency with local shortcuts
             cached_upstream_result['data_type'] = CONSTANTS.DATA_TYPE_STATIC
             # Hydrate Redis with the upstream cache result (already handled by get_cached_upstream_result_from_db)
-            logger.debug(f"Upstream shortcut '{pattern}' HIT from cache (Redis/DB).")
-            return cached_upstream_result, source, round(time.time() - start_time, 6)
-        logger.debug(f"Upstream shortcut '{pattern}' not found in cache.")
+            logger.debug("Upstream shortcut '%s' HIT from cache (Redis/DB).", pattern)
+            return cached_upstream_result, source
+        logger.debug("Upstream shortcut '%s' not found in cache.", pattern)
 
-    logger.info(f"Shortcut '{pattern}' not found in local DB or upstream cache.")
-    return None, None, round(time.time() - start_time, 6)
+    logger.info("Shortcut '%s' not found in local DB or upstream cache.", pattern)
+    return None, None
 
 def set_shortcut(pattern, type_, target, created_at=None, updated_at=None, created_ip=None, updated_ip=None):
     redirect_obj = Redirect.query.filter_by(pattern=pattern).first()
@@ -333,24 +323,18 @@ def set_shortcut(pattern, type_, target, created_at=None, updated_at=None, creat
     try:
         db.session.commit()
         logger.debug(f"DB commit successful for shortcut '{pattern}'.")
+        negative_cache.clear(pattern)
         # Invalidate (or re-set) Redis cache for this shortcut after update/set
         if config.redis_enabled:
             # Fetch the updated shortcut from DB to ensure consistency before caching
             updated_shortcut = Redirect.query.filter_by(pattern=pattern).first()
             if updated_shortcut:
-                shortcut_data = {
-                    'pattern': updated_shortcut.pattern,
-                    'type': updated_shortcut.type,
-                    'target': updated_shortcut.target,
-                    'access_count': updated_shortcut.access_count if updated_shortcut.access_count is not None else 0,
-                    'created_at': updated_shortcut.created_at,
-                    'updated_at': updated_shortcut.updated_at,
-                    'data_type': updated_shortcut.type
-                }
-                redis_set(f"shortcut:{pattern}", json.dumps(shortcut_data))
+                _redis_set_shortcut(pattern, updated_shortcut.type, updated_shortcut.target)
                 logger.debug(f"Redis cache updated for shortcut '{pattern}'.")
         else:
             logger.debug(f"Redis cache not updated for '{pattern}' (Redis disabled).")
+        # Only once Redis holds the new record: a worker refilling its local cache must not read the old one
+        invalidate_local_shortcut(pattern)
     except Exception as e:
         db.session.rollback()
         logger.exception(f"Failed to set/update shortcut '{pattern}' in DB. Rolled back transaction.")
@@ -366,10 +350,10 @@ def init_upstream_cache_table(db_session):
 def is_upstream_cache_enabled():
     cfg = config.get_configuration()
     enabled = cfg.get('upstream_cache', {}).get('enabled', True)
-    logger.debug(f"Upstream cache enabled status: {enabled}")
+    logger.debug("Upstream cache enabled status: %s", enabled)
     return enabled
 
-def cache_upstream_result(pattern: str, upstream_name: str, resolved_url: str):
+def cache_upstream_result(pattern: str, upstream_name: str, resolved_url: str, checked_at: str = None):
     """
     Caches the resolved URL for an upstream check result in the database and optionally in Redis.
 
@@ -377,8 +361,9 @@ def cache_upstream_result(pattern: str, upstream_name: str, resolved_url: str):
         pattern (str): The shortcut pattern.
         upstream_name (str): The name of the upstream service.
         resolved_url (str): The URL resolved from the upstream check.
+        checked_at (str): When the upstream was checked; defaults to now (UTC, ISO format).
     """
-    current_time_iso = datetime.now(timezone.utc).isoformat()
+    current_time_iso = checked_at or datetime.now(timezone.utc).isoformat()
 
     cache_entry = UpstreamCache.query.filter_by(
         pattern=pattern,
@@ -402,6 +387,7 @@ def cache_upstream_result(pattern: str, upstream_name: str, resolved_url: str):
     try:
         db.session.commit()
         logger.debug(f"DB commit successful for upstream cache '{pattern}'.")
+        negative_cache.clear(pattern)
 
         # update redis is enabled
         if  config.redis_enabled:
@@ -412,10 +398,11 @@ def cache_upstream_result(pattern: str, upstream_name: str, resolved_url: str):
                 'resolved_url': resolved_url,
                 'checked_at': current_time_iso # Ensure Redis gets the same timestamp
             }
-            # Store in Redis under both keys for compatibility
-            redis_set(f"upstream_cache:{pattern}", json.dumps(redis_data))
-            redis_set(f"upstream_cache:{pattern}:{upstream_name}", json.dumps(redis_data))
+            # Store in Redis under both keys for compatibility, and file the pattern under its upstream's tag
+            _redis_set_upstream_entries(upstream_name, [(pattern, json.dumps(redis_data))])
             logger.debug(f"Redis cache updated for upstream_cache:'{pattern}' and upstream_cache:'{pattern}:{upstream_name}'.")
+        # Only once Redis holds the new entry: a worker refilling its local cache must not read the old one
+        invalidate_local_shortcut(pattern)
 
     except Exception as e:
         db.session.rollback()
@@ -428,20 +415,20 @@ def get_cached_upstream_result(pattern):
     # then calls the DB specific one if not found in Redis,
     # which in turn hydrates Redis.
     if config.redis_enabled:
-        val = redis_get(f"upstream_cache:{pattern}")
+        val = redis_get(upstream_cache_redis_key(pattern))
         if val:
             try:
                 result = json.loads(val)
-                logger.debug(f"Upstream cache HIT from Redis for '{pattern}'.")
+                logger.debug("Upstream cache HIT from Redis for '%s'.", pattern)
                 return result
             except json.JSONDecodeError as e:
                 logger.error(f"JSON decode error from Redis for upstream_cache:{pattern}: {e}. Deleting corrupt entry.")
-                redis_delete(f"upstream_cache:{pattern}") # Delete corrupt entry
+                redis_delete(upstream_cache_redis_key(pattern)) # Delete corrupt entry
             except Exception as e:
                 logger.exception(f"Unexpected error processing Redis upstream_cache:{pattern}. Deleting entry.")
-                redis_delete(f"upstream_cache:{pattern}")
+                redis_delete(upstream_cache_redis_key(pattern))
     # If not in Redis or error, get from DB, which will then hydrate Redis
-    logger.debug(f"Upstream cache MISS from Redis for '{pattern}', checking DB.")
+    logger.debug("Upstream cache MISS from Redis for '%s', checking DB.", pattern)
     return get_cached_upstream_result_from_db(pattern)
 
 def get_cached_upstream_result_from_db(pattern):
@@ -457,14 +444,14 @@ def get_cached_upstream_result_from_db(pattern):
         # Hydrate Redis
         if config.redis_enabled:
             try:
-                redis_set(f"upstream_cache:{pattern}", json.dumps(result))
-                logger.debug(f"Upstream cache HIT from DB for '{pattern}'. Hydrated Redis.")
+                redis_set(upstream_cache_redis_key(pattern), json.dumps(result), ex=redis_keys.get_ttl())
+                logger.debug("Upstream cache HIT from DB for '%s'. Hydrated Redis.", pattern)
             except Exception as e:
                 logger.error(f"Failed to hydrate Redis with upstream_cache:{pattern}: {e}")
         else:
-            logger.debug(f"Upstream cache HIT from DB for '{pattern}' (Redis disabled).")
+            logger.debug("Upstream cache HIT from DB for '%s' (Redis disabled).", pattern)
         return result
-    logger.debug(f"Upstream cache not found in DB for '{pattern}'.")
+    logger.debug("Upstream cache not found in DB for '%s'.", pattern)
     return None
 
 def list_upstream_cache(upstream_name):
@@ -479,26 +466,147 @@ def list_upstream_cache(upstream_name):
 def clear_upstream_cache(pattern, upstream_name=None):
     # Delete from DB
     if upstream_name:
+        upstream_names = {upstream_name}
         num_deleted = UpstreamCache.query.filter_by(pattern=pattern, upstream_name=upstream_name).delete()
     else:
+        # Every upstream that may hold a Redis entry for the pattern: configured ones plus any left in the DB
+        upstream_names = {u.get('name') for u in get_upstreams() if u.get('name')}
+        upstream_names.update(name for (name,) in db.session.query(UpstreamCache.upstream_name).filter_by(pattern=pattern))
         num_deleted = UpstreamCache.query.filter_by(pattern=pattern).delete()
     db.session.commit()
+    invalidate_local_shortcut(pattern)
     logger.info(f"Cleared {num_deleted} upstream cache entries from DB for '{pattern}'{f' in {upstream_name}' if upstream_name else ''}.")
     # Delete from Redis
-    if config.redis_enabled:
+    if config.redis_enabled and config.redis_client:
         try:
-            redis_delete(f"upstream_cache:{pattern}")
-            if upstream_name:
-                redis_delete(f"upstream_cache:{pattern}:{upstream_name}")
-            else:
-                # Remove all possible upstream-specific keys for this pattern
-                # (Optional: if you want to be thorough, scan for all matching keys)
-                pass
-            logger.debug(f"Cleared upstream cache entry from Redis for '{pattern}' and '{pattern}:{upstream_name}'.")
+            pipe = config.redis_client.pipeline(transaction=False)
+            pipe.delete(upstream_cache_redis_key(pattern),
+                        *(upstream_cache_redis_key(pattern, name) for name in upstream_names))
+            for name in upstream_names:
+                pipe.srem(redis_keys.tag_key(redis_keys.UPSTREAM_CACHE, name), pattern)
+            pipe.execute()
+            logger.debug(f"Cleared upstream cache entries from Redis for '{pattern}' in {sorted(upstream_names)}.")
         except Exception as e:
             logger.error(f"Redis DELETE failed for upstream_cache:{pattern}: {e}")
 
 
+def purge_upstream_cache(upstream_name):
+    """
+    Removes every cached result of one upstream, from the DB in one statement and from Redis through
+    the upstream's tag set (no scanning). Returns the number of DB entries removed.
+    """
+    try:
+        num_deleted = UpstreamCache.query.filter_by(upstream_name=upstream_name).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception(f"Failed to purge upstream cache for '{upstream_name}'. Rolled back transaction.")
+        raise
+    invalidate_local_shortcut()
+    logger.info(f"Purged {num_deleted} upstream cache entries from DB for '{upstream_name}'.")
+
+    if config.redis_enabled and config.redis_client:
+        try:
+            tag = redis_keys.tag_key(redis_keys.UPSTREAM_CACHE, upstream_name)
+            patterns = list(config.redis_client.smembers(tag))
+            keys = [tag]
+            for pattern in patterns:
+                keys.append(upstream_cache_redis_key(pattern))
+                keys.append(upstream_cache_redis_key(pattern, upstream_name))
+            pipe = config.redis_client.pipeline(transaction=False)
+            for start in range(0, len(keys), 500):
+                pipe.unlink(*keys[start:start + 500])
+            pipe.execute()
+            logger.debug(f"Purged {len(patterns)} tagged upstream cache entries from Redis for '{upstream_name}'.")
+        except Exception as e:
+            logger.error(f"Redis purge failed for upstream cache of '{upstream_name}': {e}")
+    return num_deleted
+
+
+def _redis_set_upstream_entries(upstream_name, entries, pipe=None):
+    """Writes (pattern, json) upstream cache entries with the keyspace TTL and tags them with `upstream_name`."""
+    if not (config.redis_enabled and config.redis_client):
+        return
+    try:
+        own_pipe = pipe is None
+        pipe = pipe if pipe is not None else config.redis_client.pipeline(transaction=False)
+        ttl = redis_keys.get_ttl()
+        tag = redis_keys.tag_key(redis_keys.UPSTREAM_CACHE, upstream_name)
+        for pattern, redis_data in entries:
+            pipe.set(upstream_cache_redis_key(pattern), redis_data, ex=ttl)
+            pipe.set(upstream_cache_redis_key(pattern, upstream_name), redis_data, ex=ttl)
+        if entries:
+            pipe.sadd(tag, *(pattern for pattern, _ in entries))
+            pipe.expire(tag, ttl)
+        if own_pipe:
+            pipe.execute()
+    except Exception as e:
+        logger.error(f"Redis SET failed for upstream cache entries of '{upstream_name}': {e}")
+
+
+def apply_upstream_cache_batch(upstream_name, resolved, unresolved):
+    """
+    Applies many upstream check results for one upstream in a single transaction.
+
+    Args:
+        upstream_name (str): The name of the upstream service.
+        resolved (list): (pattern, resolved_url, checked_at) tuples to upsert.
+        unresolved (list): Patterns no longer found in the upstream; their entries are removed.
+    """
+    resolved_patterns = [pattern for pattern, _, _ in resolved]
+    try:
+        existing = {}
+        if resolved_patterns:
+            existing = {
+                entry.pattern: entry for entry in UpstreamCache.query.filter(
+                    UpstreamCache.upstream_name == upstream_name,
+                    UpstreamCache.pattern.in_(resolved_patterns)
+                )
+            }
+        for pattern, resolved_url, checked_at in resolved:
+            entry = existing.get(pattern)
+            if entry:
+                entry.resolved_url = resolved_url
+                entry.checked_at = checked_at
+            else:
+                db.session.add(UpstreamCache(pattern=pattern, upstream_name=upstream_name,
+                                             resolved_url=resolved_url, checked_at=checked_at))
+        num_deleted = 0
+        if unresolved:
+            num_deleted = UpstreamCache.query.filter(
+                UpstreamCache.upstream_name == upstream_name,
+                UpstreamCache.pattern.in_(list(unresolved))
+            ).delete(synchronize_session=False)
+        db.session.commit()
+        logger.info(f"Upstream cache batch for '{upstream_name}': {len(resolved)} upserted, {num_deleted} removed.")
+    except Exception:
+        db.session.rollback()
+        logger.exception(f"Failed to apply upstream cache batch for '{upstream_name}'. Rolled back transaction.")
+        raise
+
+    for pattern in resolved_patterns:
+        negative_cache.clear(pattern)
+
+    if config.redis_enabled and config.redis_client:
+        try:
+            pipe = config.redis_client.pipeline(transaction=False)
+            _redis_set_upstream_entries(upstream_name, [
+                (pattern, json.dumps({'pattern': pattern, 'upstream_name': upstream_name,
+                                      'resolved_url': resolved_url, 'checked_at': checked_at}))
+                for pattern, resolved_url, checked_at in resolved
+            ], pipe=pipe)
+            for pattern in unresolved:
+                pipe.delete(upstream_cache_redis_key(pattern), upstream_cache_redis_key(pattern, upstream_name))
+            if unresolved:
+                pipe.srem(redis_keys.tag_key(redis_keys.UPSTREAM_CACHE, upstream_name), *unresolved)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis update failed for upstream cache batch of '{upstream_name}': {e}")
+
+    # Only once Redis holds the new entries: a worker refilling its local cache must not read the old ones
+    for pattern in resolved_patterns + list(unresolved):
+        invalidate_local_shortcut(pattern)
+
 
 def get_db():
     logger.debug("Returning SQLAlchemy DB instance.")
@@ -512,9 +620,10 @@ def deleteShortCut(pattern):
         try:
             db.session.commit()
             logger.info(f"Deleted shortcut: '{pattern}'")
-            # Invalidate Redis cache for this shortcut
+            # Invalidate Redis cache for this shortcut, then the local caches that may refill from it
             if config.redis_enabled:
-                redis_delete(f"shortcut:{pattern}")
+                redis_delete(shortcut_redis_key(pattern))
+            invalidate_local_shortcut(pattern)
         except Exception as e:
             db.session.rollback()
             logger.exception(f"Failed to delete shortcut '{pattern}'. Rolled back transaction.")
@@ -530,99 +639,77 @@ def isPatternExists(subpath):
     return exists
 
 
+def _clear_shortcut_caches_after_import():
+    # Redis first: workers dropping their local caches must refill from the new generation, not the old one
+    if config.redis_enabled:
+        if config.redis_client:
+            try:
+                # One INCR retires every cached shortcut; the old generation expires on its TTL
+                redis_keys.bump(redis_keys.SHORTCUT)
+            except Exception as e:
+                logger.error(f"Failed to clear Redis shortcut cache after import: {e}")
+        else:
+            logger.warning("Redis client not available, skipped clearing shortcut cache after import.")
+    else:
+        logger.debug("Redis is disabled, skipped clearing shortcut cache after import.")
+    invalidate_local_shortcut()
+
+
 def import_redirects_from_json(json_data):
     """
     Imports redirect data from a JSON list.
     Upserts (inserts or updates) each redirect by pattern. If a redirect exists, only update if the imported 'updated_at' is newer.
-    Does NOT delete existing redirects.
+    Does NOT delete existing redirects. Rows are written in chunks (see bulk_import.import_redirects).
     Clears Redis cache after import.
 
     Args:
         json_data (list): A list of dictionaries, each representing a redirect.
 
     Returns:
-        dict: A dictionary with 'success' (bool), 'message' (str), and 'imported_count' (int, optional).
+        dict: A dictionary with 'success' (bool), 'message' (str), and 'imported_count' (int, optional)
+        and 'report' (the per-chunk import report, optional).
     """
-    try:
-        if not isinstance(json_data, list):
-            logger.error("Import failed: JSON data is not a list.")
-            return {'success': False, 'message': 'Invalid JSON data format: expected a list of redirects.'}
-
-        imported_count = 0
-        for entry in json_data:
-            if not entry.get('pattern') or not entry.get('target'):
-                logger.warning(f"Skipping malformed entry during import: {entry}")
-                continue
-            pattern = entry.get('pattern')
-            imported_updated_at = entry.get('updated_at')
-            existing = Redirect.query.filter_by(pattern=pattern).first()
-            if existing:
-                # Only update if imported updated_at is newer
-                try:
-                    existing_dt = datetime.strptime(existing.updated_at, '%Y-%m-%d %H:%M:%S')
-                except Exception:
-                    existing_dt = None
-                try:
-                    imported_dt = datetime.strptime(imported_updated_at, '%Y-%m-%d %H:%M:%S') if imported_updated_at else None
-                except Exception:
-                    imported_dt = None
-                if imported_dt and (not existing_dt or imported_dt > existing_dt):
-                    existing.type = entry.get('type', CONSTANTS.DATA_TYPE_STATIC)
-                    existing.target = entry.get('target')
-                    existing.access_count = entry.get('access_count', existing.access_count)
-                    existing.created_at = entry.get('created_at', existing.created_at)
-                    existing.updated_at = imported_updated_at
-                    existing.created_ip = entry.get('created_ip', existing.created_ip)
-                    existing.updated_ip = entry.get('updated_ip', existing.updated_ip)
-                    imported_count += 1
-            else:
-                new_redirect = Redirect(
-                    pattern=pattern,
-                    type=entry.get('type', CONSTANTS.DATA_TYPE_STATIC),
-                    target=entry.get('target'),
-                    access_count=entry.get('access_count', 0),
-                    created_at=entry.get('created_at', datetime.utcnow().isoformat(sep=' ', timespec='seconds')),
-                    updated_at=entry.get('updated_at', datetime.utcnow().isoformat(sep=' ', timespec='seconds')),
-                    created_ip=entry.get('created_ip', 'import'),
-                    updated_ip=entry.get('updated_ip', 'import')
-                )
-                db.session.add(new_redirect)
-                imported_count += 1
-        db.session.commit()
-        logger.info(f"Imported or updated {imported_count} redirects successfully into DB.")
+    if not isinstance(json_data, list):
+        logger.error("Import failed: JSON data is not a list.")
+        return {'success': False, 'message': 'Invalid JSON data format: expected a list of redirects.'}
+    return _import_entries(json_data)
 
-        # Clear Redis cache if enabled
-        if config.redis_enabled:
-            if config.redis_client:
-                try:
-                    keys_to_delete = config.redis_client.keys('shortcut:*')
-                    if keys_to_delete:
-                        config.redis_client.delete(*keys_to_delete)
-                        logger.info(f"Cleared {len(keys_to_delete)} shortcut caches from Redis after import.")
-                    else:
-                        logger.debug("No shortcut keys found in Redis to clear after import.")
-                except Exception as e:
-                    logger.error(f"Failed to clear Redis shortcut cache after import: {e}")
-            else:
-                logger.warning("Redis client not available, skipped clearing shortcut cache after import.")
-        else:
-            logger.debug("Redis is disabled, skipped clearing shortcut cache after import.")
 
-        return {'success': True, 'message': f'Redirect data imported successfully. {imported_count} records imported or updated.',
-                'imported_count': imported_count}
+def import_redirects_from_stream(stream):
+    """
+    Imports redirect data straight from an uploaded file object (JSON array or NDJSON, optionally gzipped),
+    parsing it incrementally so rows are written while the file is still being read.
+    Same upsert rules and return value as import_redirects_from_json.
+    """
+    return _import_entries(import_stream.iter_entries(stream))
+
+
+def _import_entries(entries):
+    try:
+        report = bulk_import.import_redirects(entries)
+        imported_count = report['inserted'] + report['updated']
+        _clear_shortcut_caches_after_import()
+
+        return {'success': True,
+                'message': f"Redirect data imported successfully. {imported_count} records imported or updated "
+                           f"({'about ' if report['approximate'] else ''}{report['inserted']} new, {report['updated']} updated, {report['skipped']} unchanged, "
+                           f"{report['invalid']} invalid) in {report['seconds']:.2f}s.",
+                'imported_count': imported_count, 'report': report}
 
     except (json.JSONDecodeError, ValueError) as e:
         db.session.rollback()
         logger.error(f"Import failed due to JSON/ValueError: {e}")
-        return {'success': False, 'message': f'Import failed: Invalid JSON file or data format: {e}'}
+        _clear_shortcut_caches_after_import()  # A streamed file may fail after earlier chunks were committed
+        return {'success': False, 'message': f"Import failed: Invalid JSON file or data format: {str(e).rstrip('.')}. "
+                                             f"Rows before the error may already have been imported."}
     except Exception as e:
         db.session.rollback()
         logger.exception(f"Unexpected error during redirect import.")
+        _clear_shortcut_caches_after_import()  # Chunks before the failing one are committed
         return {'success': False, 'message': f'Import failed: An unexpected error occurred: {e}'}
 
 
-
-def destructureSubPath(subPath: str) -> tuple[str, list[str]]:
+def destructureSubPath(subPath: str, index: "pattern_index.PatternTrie | None" = None) -> tuple[str, list[str]]:
     """
     Destructures a URL subpath into a base pattern and a list of dynamic properties.
 
@@ -634,13 +721,16 @@ def destructureSubPath(subPath: str) -> tuple[str, list[str]]:
 
     Args:
         subPath: The raw subpath string from the URL (e.g., from Flask's <path:subpath>).
+        index: Optional PatternTrie of namespaced patterns. When given, the longest registered pattern
+            prefixing the path is the base pattern ("team/foo/1" -> ("team/foo", ["1"])); otherwise,
+            or when none matches, the first segment is.
 
     Returns:
         A tuple containing:
         - The base pattern string (e.g., "json", "raj").
         - A list of strings representing the dynamic properties (e.g., ["1"], ["1", "2"]).
     """
-    logger.debug(f"Destructuring subpath: '{subPath}'")
+    logger.debug("Destructuring subpath: '%s'", subPath)
 
     # 1. Sanitize the subpath:
     #    - Strip leading/trailing whitespace.
@@ -657,13 +747,15 @@ def destructureSubPath(subPath: str) -> tuple[str, list[str]]:
     # 2. Split the sanitized subpath into segments
     segments = sanitized_subpath.split('/')
 
-    # 3. The first segment is the base pattern for lookup
-    pattern = segments[0]
+    # 3. The longest namespaced pattern prefixing the path is the base pattern, else the first segment
+    pattern, depth = index.longest_match(segments) if index is not None else (None, 0)
+    if pattern is None:
+        pattern, depth = segments[0], 1
 
     # 4. The remaining segments are the dynamic properties
-    dynamic_properties = segments[1:]
+    dynamic_properties = segments[depth:]
 
-    logger.debug(f"Destructured: pattern='{pattern}', dynamic_properties={dynamic_properties}")
+    logger.debug("Destructured: pattern='%s', dynamic_properties=%s", pattern, dynamic_properties)
     return pattern, dynamic_properties
 
 
@@ -678,7 +770,7 @@ def replacePlaceHolders(target_string, replacement_value):
     Returns:
         str: The string with all placeholders replaced.
     """
-    return re.sub(r'\{[^}]+\}', str(replacement_value), target_string)
+    return target_template.compile_template(target_string).fill(replacement_value)
 
 
 def get_placeholder_vars(target_string: str) -> list[str]:
@@ -693,22 +785,24 @@ def get_placeholder_vars(target_string: str) -> list[str]:
         list[str]: A list of extracted variable names (e.g., ["id", "user_name"]).
                    Returns an empty list if no placeholders are found.
     """
-    # The regex r'\{([^}]+)\}' does the following:
-    # \{       - Matches a literal opening curly brace '{'
-    # (        - Starts a capturing group
-    # [^}]+    - Matches one or more characters that are NOT a closing curly brace '}'
-    # )        - Ends the capturing group
-    # \}       - Matches a literal closing curly brace '}'
-    # re.findall returns a list of all strings matched by the capturing group.
-    return re.findall(r'\{([^}]+)\}', target_string)
+    return list(target_template.compile_template(target_string).placeholders)
 
 
-def get_upstreams():
+UPSTREAM_CHECK_MODES = ('parallel', 'sequential')
+
+
+def get_upstream_check_mode():
+    """Returns 'parallel' (probe every upstream at once) or 'sequential'."""
     cfg = config.get_configuration()
-    return cfg.get('upstreams', [])
+    mode = cfg.get('upstream_check', {}).get('mode', 'parallel')
+    return mode if mode in UPSTREAM_CHECK_MODES else 'parallel'
+
+
+def get_upstreams():
+    return config.snapshot.upstreams
 
 
 def set_upstreams(upstreams):
-    cfg = config.get_configuration()
-    cfg['upstreams'] = upstreams
-    _save_config()
\ No newline at end of file
+    config.save_values({'upstreams': list(upstreams)})
+    # Connection pools are keyed by upstream and carry its timeouts/retries; rebuild them lazily.
+    upstream_probe.reset_sessions()
\ No newline at end of file
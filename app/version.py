@@ -0,0 +1,148 @@
+"""
+Version information for the app, resolved once instead of on every request.
+
+The Docker build bakes it into app/_version.json (`python app/version.py --write`);
+without that file it is read from git once, at first use. This module only uses the
+standard library so it can run as a build step before the app is importable.
+"""
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+VERSION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '_version.json')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNKNOWN = 'unknown'
+
+_info = None
+_lock = threading.Lock()
+# Background refresh: when > 0, a read older than this many seconds triggers a re-read from git.
+_refresh_interval = 0
+_loaded_at = 0.0
+_refreshing = False
+
+
+def _git(*args):
+    return subprocess.check_output(['git', *args], cwd=REPO_ROOT, encoding='utf-8',
+                                   stderr=subprocess.DEVNULL).strip()
+
+
+def compute_version_info(fetch_tags=False):
+    """Runs git to describe the checkout. Never raises; unknown fields are 'unknown'."""
+    if fetch_tags:
+        try:
+            _git('fetch', '--tags')
+        except Exception as e:
+            logger.debug(f"Could not fetch tags: {e}")
+
+    info = {'semver': None, 'build': UNKNOWN, 'commit_count': UNKNOWN, 'commit_hash': UNKNOWN,
+            'commit_date': UNKNOWN}
+    try:
+        # Example: v2.1.0-5-gabcdef
+        desc = _git('describe', '--tags', '--long', '--match', 'v*')
+        m = re.match(r'v?(\d+\.\d+\.\d+)-(\d+)-g([0-9a-f]+)', desc)
+        if m:
+            base, commits, githash = m.groups()
+            info['semver'] = base if int(commits) == 0 else f"{base}+{commits}.g{githash}"
+            info['build'] = f"{base}+{commits}.g{githash}"
+        else:
+            info['semver'] = _git('describe', '--tags', '--abbrev=0', '--match', 'v*').lstrip('v')
+            info['build'] = desc
+    except Exception as e:
+        logger.debug(f"Could not determine version from git tags: {e}")
+    try:
+        info['commit_count'] = _git('rev-list', '--count', 'HEAD')
+        info['commit_hash'] = _git('rev-parse', '--short', 'HEAD')
+        info['commit_date'] = _git('log', '-1', '--format=%cd', '--date=short')
+    except Exception as e:
+        logger.debug(f"Could not read commit info from git: {e}")
+    if info['semver'] is None:
+        # Fallback: just use commit count
+        info['semver'] = f"2.0.0+{info['commit_count']}" if info['commit_count'] != UNKNOWN else "2.0.0"
+    return info
+
+
+def load_version_file(path=None):
+    path = path or VERSION_FILE
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable version file {path}: {e}")
+        return None
+
+
+def write_version_file(path=None, fetch_tags=False):
+    path = path or VERSION_FILE
+    info = compute_version_info(fetch_tags=fetch_tags)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def get_version_info():
+    """Returns the cached version info dict: semver, build, commit_count, commit_hash, commit_date."""
+    global _info, _loaded_at
+    if _info is None:
+        with _lock:
+            if _info is None:
+                _info = load_version_file() or compute_version_info()
+                _loaded_at = time.monotonic()
+    if _refresh_interval > 0 and time.monotonic() - _loaded_at > _refresh_interval:
+        _start_refresh()
+    return _info
+
+
+def get_semver():
+    return get_version_info()['semver']
+
+
+def refresh(fetch_tags=True):
+    """Re-reads the version from git (fetching tags first) and swaps it in."""
+    global _info, _loaded_at
+    info = compute_version_info(fetch_tags=fetch_tags)
+    if info['commit_hash'] != UNKNOWN:
+        _info = info
+    _loaded_at = time.monotonic()
+    return _info
+
+
+def _start_refresh():
+    global _refreshing
+    with _lock:
+        if _refreshing:
+            return
+        _refreshing = True
+
+    def run():
+        global _refreshing
+        try:
+            refresh()
+        except Exception as e:
+            logger.debug(f"Version refresh failed: {e}")
+        finally:
+            _refreshing = False
+
+    # The stale value keeps being served until the refresh completes.
+    threading.Thread(target=run, name='version-refresh', daemon=True).start()
+
+
+def set_refresh_interval(seconds):
+    """Enables the optional background refresh from git (0 disables it, the default)."""
+    global _refresh_interval
+    _refresh_interval = max(0, int(seconds or 0))
+
+
+if __name__ == '__main__':
+    if '--write' in sys.argv:
+        print(json.dumps(write_version_file(fetch_tags='--fetch-tags' in sys.argv)))
+    else:
+        print(json.dumps(get_version_info()))
@@ -0,0 +1,31 @@
+"""get_shortcut by the tier that answers, at each dataset size."""
+from app import CONSTANTS
+from app.utils import utils
+
+
+def bench_get_shortcut_local_cache_hit(benchmark, dataset):
+    utils.get_shortcut('p1')
+    shortcut, source, _ = benchmark(utils.get_shortcut, 'p1')
+    assert shortcut['target'] == 'https://example.org/1'
+
+
+def bench_get_shortcut_redis_hit(benchmark, redis, dataset, no_local_cache):
+    utils.get_shortcut('p1')  # The DB hit hydrates Redis
+    shortcut, source, _ = benchmark(utils.get_shortcut, 'p1')
+    assert source == CONSTANTS.data_source_redis
+
+
+def bench_get_shortcut_db_hit(benchmark, dataset, no_local_cache):
+    shortcut, source, _ = benchmark(utils.get_shortcut, 'p1')
+    assert source == CONSTANTS.data_source_redirect
+
+
+def bench_get_shortcut_upstream_cache_hit(benchmark, dataset, upstream_cached, no_local_cache):
+    shortcut, source, _ = benchmark(utils.get_shortcut, 'up')
+    assert shortcut['resolved_url'] == 'https://corp.example/up'
+
+
+def bench_get_shortcut_miss(benchmark, redis, dataset, no_local_cache):
+    # Every tier is consulted: Redis, the redirects table, then the upstream cache
+    shortcut, source, _ = benchmark(utils.get_shortcut, 'nothing')
+    assert shortcut is None
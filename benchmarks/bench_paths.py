@@ -0,0 +1,31 @@
+"""Path parsing and dynamic target expansion, which run on every redirect."""
+from app.utils.pattern_index import PatternTrie
+from app.utils.target_template import TargetTemplate, compile_template
+from app.utils.utils import destructureSubPath
+
+# Namespaced patterns known to the index in the indexed benchmarks
+NAMESPACED = [f'team{i}/tool{j}' for i in range(100) for j in range(10)]
+
+
+def bench_destructure_flat(benchmark):
+    assert benchmark(destructureSubPath, '/Docs/Getting-Started ') == ('docs', ['getting-started'])
+
+
+def bench_destructure_with_index(benchmark):
+    index = PatternTrie(NAMESPACED)
+    assert benchmark(destructureSubPath, 'team42/tool7/PROJ/123', index) == ('team42/tool7', ['proj', '123'])
+
+
+def bench_template_parse(benchmark):
+    template = benchmark(TargetTemplate, 'https://jira.example/{project}/browse/{project}-{id}?ref={0}')
+    assert template.names == ('project', 'id', '0')
+
+
+def bench_template_expand(benchmark):
+    template = compile_template('https://jira.example/{project}/browse/{id}')
+    assert benchmark(template.expand, 'PROJ/123') == 'https://jira.example/PROJ/browse/123'
+
+
+def bench_template_fill(benchmark):
+    template = compile_template('https://www.google.com/search?q={q}')
+    assert benchmark(template.fill, 'hello/world') == 'https://www.google.com/search?q=hello/world'
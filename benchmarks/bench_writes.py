@@ -0,0 +1,64 @@
+"""Shortcut writes: set_shortcut, access counting and bulk JSON imports."""
+import itertools
+from unittest.mock import patch
+
+import pytest
+
+from app.config import config, ConfigSnapshot
+from app.utils import utils
+from conftest import SETTINGS, SIZES, clear_redirects, seed_redirects
+
+
+def bench_set_shortcut_create(benchmark, dataset):
+    names = (f'new{i}' for i in itertools.count())
+    benchmark(lambda: utils.set_shortcut(next(names), 'static', 'https://example.org/new'))
+
+
+def bench_set_shortcut_update(benchmark, dataset):
+    targets = (f'https://example.org/v{i}' for i in itertools.count())
+    benchmark(lambda: utils.set_shortcut('p1', 'static', next(targets)))
+
+
+def bench_set_shortcut_update_with_redis(benchmark, redis, dataset):
+    targets = (f'https://example.org/v{i}' for i in itertools.count())
+    benchmark(lambda: utils.set_shortcut('p1', 'static', next(targets)))
+
+
+def bench_increment_access_count_buffered(benchmark, dataset):
+    benchmark(utils.increment_access_count, 'p1')
+
+
+def bench_increment_access_count_redis(benchmark, redis, dataset):
+    benchmark(utils.increment_access_count, 'p1')
+
+
+def bench_increment_access_count_direct(benchmark, dataset):
+    settings = {**SETTINGS, 'access_count': {'write_behind': False}}
+    with patch.object(config, 'snapshot', ConfigSnapshot.from_dict(settings)):
+        benchmark(utils.increment_access_count, 'p1')
+
+
+def _entries(n, updated_at='2030-01-01 00:00:00'):
+    return [{'pattern': f'p{i}', 'type': 'static', 'target': f'https://example.org/imported/{i}',
+             'updated_at': updated_at} for i in range(n)]
+
+
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'{n}_entries')
+def bench_import_into_empty_table(benchmark, app, size):
+    entries = _entries(size)
+    result = benchmark.pedantic(utils.import_redirects_from_json, args=(entries,), setup=clear_redirects,
+                                rounds=5)
+    assert result['success'] and result['imported_count'] == size
+
+
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'{n}_entries')
+def bench_import_over_existing_rows(benchmark, app, size):
+    # Every entry is newer than its existing row, so all of them are updated
+    entries = _entries(size)
+
+    def reseed():
+        clear_redirects()
+        seed_redirects(size)
+
+    result = benchmark.pedantic(utils.import_redirects_from_json, args=(entries,), setup=reseed, rounds=5)
+    assert result['success']
@@ -0,0 +1,117 @@
+import logging
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+from sqlalchemy import delete, insert
+
+from model import db
+from model.redirect import Redirect
+from model.upstream_cache import UpstreamCache
+from app.config import config, ConfigSnapshot
+from app.utils import access_counter, invalidation, pattern_index, redis_keys
+from app.utils.local_cache import shortcut_cache
+
+logging.disable(logging.CRITICAL)
+
+# Shortcuts in the DB for the size-dependent benchmarks
+SIZES = (100, 1_000, 10_000)
+
+# Pinned so results don't depend on the local redirect.config.json
+SETTINGS = {
+    'access_count': {'write_behind': True, 'flush_interval_seconds': 3600, 'flush_threshold': 10 ** 9},
+    'access_log': {'enabled': False},
+    'auto_redirect_delay': 0,
+    'local_cache': {'enabled': True},
+    'metrics': {'enabled': False},
+    'redis_keys': {'ttl_seconds': 86400},
+    'upstream_cache': {'enabled': True, 'freshness_seconds': 0},
+    'upstream_negative_cache': {'enabled': True, 'ttl_seconds': 300},
+}
+
+
+def seed_redirects(n):
+    """n static shortcuts p0..p{n-1}, plus the dynamic 'jira', written in one executemany."""
+    rows = [{'pattern': f'p{i}', 'type': 'static', 'target': f'https://example.org/{i}', 'access_count': 0}
+            for i in range(n)]
+    rows.append({'pattern': 'jira', 'type': 'dynamic', 'target': 'https://jira.example/{project}/browse/{id}',
+                 'access_count': 0})
+    db.session.execute(insert(Redirect), rows)
+    db.session.commit()
+
+
+def clear_redirects():
+    db.session.execute(delete(Redirect))
+    db.session.commit()
+
+
+@pytest.fixture(autouse=True)
+def settings():
+    """Pinned config, Redis off, and invalidations dispatched in-process only (no pub/sub listener)."""
+    patchers = [
+        patch.object(config, 'snapshot', ConfigSnapshot.from_dict(SETTINGS)),
+        patch.object(config, 'redis_enabled', False),
+        patch.object(config, 'redis_client', None),
+        patch.object(config, 'redis_binary_client', None),
+        patch.object(invalidation, 'publish', side_effect=invalidation._dispatch),
+        patch.object(invalidation, 'is_live', return_value=True),
+    ]
+    for patcher in patchers:
+        patcher.start()
+    shortcut_cache.invalidate()
+    pattern_index.invalidate()
+    redis_keys._generations.invalidate()
+    yield
+    for patcher in reversed(patchers):
+        patcher.stop()
+    shortcut_cache.invalidate()
+
+
+@pytest.fixture
+def app():
+    """Flask app on an in-memory SQLite DB, with an app context pushed for the benchmark."""
+    flask_app = Flask(__name__)
+    flask_app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    flask_app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(flask_app)
+    access_counter.init_app(flask_app)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        access_counter.access_buffer.flush()  # Buffered hits are written before the DB goes away
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def redis():
+    """Enables Redis for the benchmark, backed by one in-process fakeredis server."""
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    with patch.object(config, 'redis_enabled', True), \
+            patch.object(config, 'redis_client', client), \
+            patch.object(config, 'redis_binary_client', fakeredis.FakeRedis(server=server)):
+        yield client
+
+
+@pytest.fixture(params=SIZES, ids=lambda n: f'{n}_rows')
+def dataset(app, request):
+    """Number of seeded shortcuts (see seed_redirects)."""
+    seed_redirects(request.param)
+    return request.param
+
+
+@pytest.fixture
+def upstream_cached(app):
+    """An UpstreamCache entry for 'up' (no local shortcut of that name)."""
+    db.session.add(UpstreamCache(pattern='up', upstream_name='corp', resolved_url='https://corp.example/up',
+                                 checked_at='2099-01-01T00:00:00+00:00'))
+    db.session.commit()
+
+
+@pytest.fixture
+def no_local_cache():
+    """Bypasses the worker's local cache, so lookups reach the tier under test."""
+    with patch.object(shortcut_cache, 'enabled', False):
+        yield
@@ -1,4 +1,13 @@
 # gunicorn.conf.py
+import glob
+import os
+import tempfile
+
+# Workers write their Prometheus samples here and /metrics sums them (prometheus_client multiprocess mode).
+# Must be set before the app, and so prometheus_client, is imported.
+prometheus_multiproc_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                                                 os.path.join(tempfile.gettempdir(), 'redirector-prometheus'))
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
 
 # Number of worker processes (adjust based on CPU cores)
 # For gevent, workers usually correspond to CPU cores.
@@ -36,4 +45,23 @@ errorlog = "-"
 
 # Enable auto-restart on code changes (use only in dev)
 # Make sure to disable this in production for stability
-reload = False
\ No newline at end of file
+reload = False
+
+
+def worker_exit(server, worker):
+    # Write buffered access counts and queued access log records before the worker goes away
+    from app.utils import access_counter, access_log
+    access_counter.drain()
+    access_log.stop()
+
+
+def on_starting(server):
+    # Samples of a previous run would otherwise be summed in
+    for path in glob.glob(os.path.join(prometheus_multiproc_dir, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    # Stop counting the exited worker's in-flight requests
+    from app.utils import metrics
+    metrics.mark_process_dead(worker.pid)
@@ -1,30 +1,108 @@
-from locust import HttpUser, TaskSet, task, between
-import uuid
-
-class RedirectUpstreamTasks(TaskSet):
-    @task
-    def create_random_redirect(self):
-        shortcut = f"shortcut-{uuid.uuid4().hex[:8]}"
-        target = "https://example.com"
-        self.client.post(f"/edit/{shortcut}", data={"type": "redirect", "target": target}, name="/edit/<shortcut>")
-        self.client.get(f"/{shortcut}", name="/<shortcut>")
-
-    @task
-    def create_and_test_google_redirect(self):
-        shortcut = "google"
-        target = "https://google.com"
-        self.client.post(f"/edit/{shortcut}", data={"type": "redirect", "target": target}, name="/edit/google")
-        self.client.get(f"/{shortcut}", name="/google")
-
-    @task
-    def check_upstreams_ui(self):
-        self.client.get(f"/check-upstreams-ui/test-pattern", name="/check-upstreams-ui/<pattern>")
-
-    @task
-    def access_random_unknown_shortcut(self):
-        unknown_shortcut = f"unknown-{uuid.uuid4().hex[:6]}"
-        self.client.get(f"/{unknown_shortcut}", name="/<unknown-shortcut>")
-
-class WebsiteUser(HttpUser):
-    wait_time = between(1, 3)
-    tasks = [RedirectUpstreamTasks]
\ No newline at end of file
+"""
+Locust entry point: the scenarios in scenarios.py, preparing the target, and the pass/fail thresholds.
+
+    locust -f load_testing/locustfile.py --headless -u 200 -r 50 -t 3m \
+        --host http://localhost:80 --admin-password <password>
+
+Before the run the target is seeded with the 'lt-' shortcut set through the admin import, and the stub
+upstream is started and registered as the target's only upstream. Point it at a disposable instance.
+When the run ends the thresholds are checked, the report is printed (and written with --report), and
+the process exits with 1 if any threshold was exceeded. See load_testing.md.
+"""
+import json
+import logging
+import os
+
+import requests
+from locust import events
+from locust.runners import WorkerRunner
+
+import stub_upstream
+import thresholds
+from scenarios import AdminUser, DynamicUser, ReadHeavyUser, UpstreamUser, seed_entries  # noqa: F401 (collected by locust)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thresholds.json')
+
+_stub_server = None
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    group = parser.add_argument_group('redirector')
+    group.add_argument('--admin-password', env_var='LOCUST_ADMIN_PASSWORD', default='',
+                       help='Admin password of the target, for seeding and the admin scenario')
+    group.add_argument('--shortcuts', type=int, default=1000, help='Static shortcuts to seed and read')
+    group.add_argument('--zipf-exponent', type=float, default=1.1,
+                       help='Skew of shortcut popularity; higher puts more traffic on the top shortcuts')
+    group.add_argument('--stub-upstream-host', default='127.0.0.1',
+                       help='Address the stub upstream listens on, as the target reaches it')
+    group.add_argument('--stub-upstream-port', type=int, default=8765, help='0 disables the stub upstream')
+    group.add_argument('--stub-upstream-latency', type=float, default=0.05,
+                       help='Seconds the stub upstream takes to answer a lookup')
+    group.add_argument('--skip-setup', action='store_true',
+                       help="Don't seed or reconfigure the target; it was prepared by an earlier run")
+    group.add_argument('--thresholds', default=DEFAULT_THRESHOLDS,
+                       help="Thresholds file; '' reports without failing the run")
+    group.add_argument('--report', default='', help='Also write the report as JSON to this path')
+
+
+def _admin_session(host, password):
+    session = requests.Session()
+    response = session.post(f"{host}/admin-login", data={'password': password}, allow_redirects=False, timeout=30)
+    if response.status_code != 302:
+        raise RuntimeError(f"Admin login to {host} failed (status {response.status_code}); check --admin-password")
+    return session
+
+
+def _seed(session, host, count):
+    body = '\n'.join(json.dumps(entry) for entry in seed_entries(count))
+    response = session.post(f"{host}/admin/import-redirects", timeout=300,
+                            files={'file': ('load-test-shortcuts.ndjson', body.encode('utf-8'))})
+    response.raise_for_status()
+    logger.info(f"Seeded {count} static and the dynamic 'lt-' shortcuts into {host}")
+
+
+def _register_upstream(session, host, url):
+    upstream = stub_upstream.upstream_config(url)
+    form = {f"{key}_0": value for key, value in upstream.items() if key != 'verify_ssl'}
+    response = session.post(f"{host}/admin/upstreams", data=form, timeout=30)
+    response.raise_for_status()
+    logger.info(f"Registered the stub upstream at {url} as the only upstream of {host}")
+
+
+@events.test_start.add_listener
+def _prepare_target(environment, **kwargs):
+    global _stub_server
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    options = environment.parsed_options
+    if options.stub_upstream_port and _stub_server is None:
+        _stub_server = stub_upstream.start(options.stub_upstream_host, options.stub_upstream_port,
+                                           options.stub_upstream_latency)
+    if options.skip_setup:
+        return
+    session = _admin_session(environment.host, options.admin_password)
+    _seed(session, environment.host, options.shortcuts)
+    if _stub_server is not None:
+        _register_upstream(session, environment.host,
+                           f"http://{options.stub_upstream_host}:{_stub_server.server_port}")
+
+
+@events.quitting.add_listener
+def _check_thresholds(environment, **kwargs):
+    global _stub_server
+    if _stub_server is not None:
+        _stub_server.shutdown()
+        _stub_server = None
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    options = environment.parsed_options
+    limits = thresholds.load(options.thresholds) if options.thresholds else {}
+    results = thresholds.evaluate(environment.stats, limits)
+    print(thresholds.format_report(environment.stats, results))
+    if options.report:
+        thresholds.write_report(options.report, environment.stats, results)
+    if limits:
+        environment.process_exit_code = 0 if thresholds.passed(results) else 1
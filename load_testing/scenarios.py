@@ -0,0 +1,217 @@
+"""
+Load test scenarios. Each User class is one traffic pattern; the weights give the default mix,
+which is read-heavy the way a production redirector is:
+
+    ReadHeavyUser   80   static redirects over the seeded shortcuts, by Zipf-distributed popularity
+    DynamicUser     10   dynamic shortcuts with a fresh variable every time ('lt-jira/PROJ-123')
+    UpstreamUser     5   unknown names that fan out to the upstreams, plus names an upstream does know
+    AdminUser      (2)   two logged-in admins browsing the dashboard and admin pages, however many users
+
+Run one scenario on its own by naming its class: `locust -f load_testing/locustfile.py ReadHeavyUser`.
+Every shortcut the scenarios touch starts with 'lt-', so they never collide with real shortcuts.
+"""
+import bisect
+import functools
+import html
+import itertools
+import random
+import uuid
+from urllib.parse import unquote
+
+from locust import HttpUser, between, task
+
+PREFIX = 'lt-'
+UPSTREAM_PATTERNS = 100  # Distinct names the stub upstream knows (see stub_upstream.FOUND_PREFIX)
+KNOWN_MISSES = 50  # Unknown names that are asked for again and again; the negative cache answers these
+
+DYNAMIC_SHORTCUTS = {
+    'lt-jira': 'https://jira.example/browse/{id}',
+    'lt-search': 'https://www.google.com/search?q={q}',
+    'lt-team/wiki': 'https://wiki.example/team/{page}',
+}
+
+
+def static_pattern(rank):
+    return f"{PREFIX}{rank}"
+
+
+def static_target(rank):
+    return f"https://example.org/lt/{rank}"
+
+
+def seed_entries(count):
+    """Import entries for the seeded shortcut set: `count` static shortcuts plus the dynamic ones."""
+    entries = [{'pattern': static_pattern(rank), 'type': 'static', 'target': static_target(rank)}
+               for rank in range(1, count + 1)]
+    entries.extend({'pattern': pattern, 'type': 'dynamic', 'target': target}
+                   for pattern, target in DYNAMIC_SHORTCUTS.items())
+    return entries
+
+
+class ZipfSampler:
+    """
+    Draws ranks 1..n with P(rank) proportional to 1 / rank**s, so a few shortcuts get most of the
+    traffic and the long tail is still visited. s = 1.0-1.2 matches typical link-popularity curves.
+    """
+
+    def __init__(self, n, s=1.1):
+        self.n = n
+        self.cumulative = list(itertools.accumulate(1.0 / rank ** s for rank in range(1, n + 1)))
+
+    def sample(self):
+        return bisect.bisect_left(self.cumulative, random.random() * self.cumulative[-1]) + 1
+
+
+@functools.lru_cache(maxsize=None)
+def get_sampler(n, s):
+    return ZipfSampler(n, s)
+
+
+def expect_redirect(response, location_contains=None):
+    """
+    Marks a catch_response response as failed unless it redirects (to `location_contains`, if given).
+    With auto_redirect_delay set the target answers 200 with the countdown page instead of a 302,
+    which counts as a redirect to the URL in that page. Returns the redirect location, or ''.
+    """
+    if response.status_code == 302:
+        location = unquote(response.headers.get('Location', ''))
+    elif response.status_code == 200 and 'http-equiv="refresh"' in response.text:
+        location = unquote(html.unescape(response.text))
+    else:
+        response.failure(f"Expected a redirect, got {response.status_code}")
+        return ''
+    if location_contains and location_contains not in location:
+        response.failure(f"Did not redirect to {location_contains}")
+    else:
+        response.success()
+    return location
+
+
+class RedirectorUser(HttpUser):
+    abstract = True
+    # People follow a link, read the page, and come back for the next one
+    wait_time = between(0.1, 1)
+
+    def redirect(self, path, name, location_contains=None):
+        with self.client.get(path, name=name, allow_redirects=False, catch_response=True) as response:
+            return expect_redirect(response, location_contains)
+
+
+class ReadHeavyUser(RedirectorUser):
+    weight = 80
+
+    def on_start(self):
+        options = self.environment.parsed_options
+        self.sampler = get_sampler(options.shortcuts, options.zipf_exponent)
+
+    @task
+    def follow_shortcut(self):
+        rank = self.sampler.sample()
+        self.redirect(f"/{static_pattern(rank)}", '/<shortcut>', static_target(rank))
+
+
+class DynamicUser(RedirectorUser):
+    weight = 10
+
+    @task(6)
+    def jira_issue(self):
+        issue = f"PROJ-{random.randint(1, 20000)}"
+        self.redirect(f"/lt-jira/{issue}", '/<dynamic>/<value>', f"/browse/{issue}")
+
+    @task(3)
+    def search(self):
+        query = f"query {random.randint(1, 5000)}"
+        self.redirect(f"/lt-search/{query}", '/<dynamic>/<value>', query)
+
+    @task(1)
+    def namespaced_wiki(self):
+        page = f"page-{random.randint(1, 1000)}"
+        self.redirect(f"/lt-team/wiki/{page}", '/<namespace>/<dynamic>/<value>', f"/team/{page}")
+
+
+class UpstreamUser(RedirectorUser):
+    """
+    Names with no local shortcut. The redirect sends the browser to the upstream check page, which
+    streams the fan-out; that stream is requested here the way the page's script would.
+    Needs an upstream configured, normally the stub the locustfile starts (see stub_upstream.py).
+    """
+    weight = 5
+    wait_time = between(0.5, 2)
+
+    def check_upstreams(self, segment, name):
+        with self.client.get(f"/stream/check-upstreams/{segment}", name=name, catch_response=True) as response:
+            if response.status_code != 200:
+                response.failure(f"Upstream check returned {response.status_code}")
+            elif '"done": true' not in response.text:
+                response.failure('Upstream check stream ended without finishing')
+            else:
+                response.success()
+
+    @task(6)
+    def new_miss(self):
+        # Never seen before: every upstream is probed
+        pattern = f"{PREFIX}miss-{uuid.uuid4().hex[:10]}"
+        location = self.redirect(f"/{pattern}", '/<upstream-miss>', '/check-upstreams-ui/')
+        if '/check-upstreams-ui/' in location:
+            self.check_upstreams(pattern, '/stream/check-upstreams/<miss>')
+
+    @task(3)
+    def repeated_miss(self):
+        # Asked for again within the negative cache TTL, it goes straight to the create page
+        pattern = f"{PREFIX}gone-{random.randint(1, KNOWN_MISSES)}"
+        location = self.redirect(f"/{pattern}", '/<repeated-miss>')
+        if '/check-upstreams-ui/' in location:
+            self.check_upstreams(pattern, '/stream/check-upstreams/<miss>')
+
+    @task(1)
+    def upstream_shortcut(self):
+        # Found in the stub upstream on the first request, then served from the upstream cache
+        pattern = f"{PREFIX}up-{random.randint(1, UPSTREAM_PATTERNS)}"
+        location = self.redirect(f"/{pattern}", '/<upstream-shortcut>')
+        if '/check-upstreams-ui/' in location:
+            self.check_upstreams(pattern, '/stream/check-upstreams/<found>')
+
+
+class AdminUser(RedirectorUser):
+    fixed_count = 2
+    wait_time = between(2, 5)
+
+    def on_start(self):
+        with self.client.post('/admin-login', data={'password': self.environment.parsed_options.admin_password},
+                              name='/admin-login', allow_redirects=False, catch_response=True) as response:
+            if response.status_code != 302:
+                response.failure('Admin login failed; check --admin-password')
+
+    def page(self, path, name=None):
+        with self.client.get(path, name=name or path, allow_redirects=False, catch_response=True) as response:
+            if response.status_code != 200:
+                response.failure(f"Expected a 200, got {response.status_code}")
+
+    @task(5)
+    def dashboard(self):
+        self.page('/')
+
+    @task(3)
+    def dashboard_shortcuts(self):
+        self.page('/dashboard-shortcuts')
+
+    @task(2)
+    def edit_page(self):
+        sampler = get_sampler(self.environment.parsed_options.shortcuts, self.environment.parsed_options.zipf_exponent)
+        self.page(f"/edit/{static_pattern(sampler.sample())}", '/edit/<shortcut>')
+
+    @task(2)
+    def upstream_logs(self):
+        self.page('/admin/upstream-logs')
+
+    @task(1)
+    def upstream_misses(self):
+        self.page('/admin/upstream-misses')
+
+    @task(1)
+    def local_cache_stats(self):
+        self.page('/admin/local-cache-stats')
+
+    @task(1)
+    def export(self):
+        self.page('/admin/export-redirects')
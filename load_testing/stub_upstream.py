@@ -0,0 +1,84 @@
+"""
+A stand-in for a real upstream redirector, so upstream fan-out can be load tested without
+hitting anyone else's service.
+
+    GET /<pattern>   -> 302 to /found/<pattern>, which answers 200   if the pattern starts with FOUND_PREFIX
+                     -> 302 to /not-found, which answers 404         otherwise
+
+Register it as an upstream with fail_url '<stub url>/not-found' and fail_status_code 404.
+The lookup is delayed by `latency` seconds to look like a remote service.
+
+Run standalone:   python load_testing/stub_upstream.py --port 8765 --latency 0.05
+"""
+import argparse
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+FOUND_PREFIX = 'lt-up-'
+FOUND_PATH = '/found/'
+NOT_FOUND_PATH = '/not-found'
+
+
+def make_handler(latency):
+    class StubUpstreamHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path.startswith(NOT_FOUND_PATH):
+                self._respond(404)
+            elif self.path.startswith(FOUND_PATH):
+                self._respond(200)
+            else:
+                if latency:
+                    time.sleep(latency)
+                pattern = self.path.lstrip('/')
+                self._respond(302, f"{FOUND_PATH}{quote(pattern)}" if pattern.startswith(FOUND_PREFIX)
+                              else NOT_FOUND_PATH)
+
+        def _respond(self, status, location=None):
+            self.send_response(status)
+            if location:
+                self.send_header('Location', location)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    return StubUpstreamHandler
+
+
+def upstream_config(url, name='load-test-stub'):
+    """The entry to register in the redirector's upstreams for a stub listening at `url`."""
+    url = url.rstrip('/')
+    return {'name': name, 'base_url': url, 'fail_url': f"{url}{NOT_FOUND_PATH}", 'fail_status_code': 404,
+            'verify_ssl': False}
+
+
+def start(host='127.0.0.1', port=8765, latency=0.05):
+    """Serves the stub from a daemon thread and returns the server; call shutdown() to stop it."""
+    server = ThreadingHTTPServer((host, port), make_handler(latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='stub-upstream', daemon=True).start()
+    logger.info(f"Stub upstream listening on http://{host}:{server.server_port} (latency {latency * 1000:.0f} ms)")
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds to wait before every response')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.latency))
+    logger.info(f"Stub upstream listening on http://{args.host}:{args.port} (latency {args.latency * 1000:.0f} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
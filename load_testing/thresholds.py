@@ -0,0 +1,90 @@
+"""
+Pass/fail thresholds for a load test run, checked against Locust's aggregated stats when the run ends.
+
+A thresholds file (see thresholds.json) looks like:
+
+    {
+      "total":    {"min_rps": 150, "max_fail_ratio": 0.01, "p95": 250},
+      "requests": {"GET /<shortcut>": {"p50": 10, "p95": 40, "p99": 80}}
+    }
+
+Latencies are milliseconds, `min_rps` is requests per second over the whole run, and
+`max_fail_ratio` is failures / requests. Request keys are '<method> <name>' as Locust reports them.
+A request with no samples is reported as skipped rather than failed, so a single scenario can be run
+against the full thresholds file.
+"""
+import json
+
+PERCENTILES = {'p50': 0.50, 'p95': 0.95, 'p99': 0.99}
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _check(name, entry, limits):
+    if entry is None or not entry.num_requests:
+        return [{'name': name, 'metric': '-', 'limit': None, 'actual': None, 'status': 'skipped'}]
+    results = []
+    for metric, limit in limits.items():
+        if metric in PERCENTILES:
+            actual = entry.get_response_time_percentile(PERCENTILES[metric])
+            ok = actual <= limit
+        elif metric == 'min_rps':
+            actual = entry.total_rps
+            ok = actual >= limit
+        elif metric == 'max_fail_ratio':
+            actual = entry.fail_ratio
+            ok = actual <= limit
+        else:
+            raise ValueError(f"Unknown threshold '{metric}' for '{name}'")
+        results.append({'name': name, 'metric': metric, 'limit': limit, 'actual': round(actual, 3),
+                        'status': 'pass' if ok else 'fail'})
+    return results
+
+
+def evaluate(stats, thresholds):
+    """Checks a locust RequestStats against `thresholds`; returns one result dict per checked limit."""
+    results = []
+    if thresholds.get('total'):
+        results.extend(_check('Aggregated', stats.total, thresholds['total']))
+    for key, limits in thresholds.get('requests', {}).items():
+        method, _, name = key.partition(' ')
+        results.extend(_check(key, stats.entries.get((name, method)), limits))
+    return results
+
+
+def passed(results):
+    return all(r['status'] != 'fail' for r in results)
+
+
+def format_report(stats, results):
+    """Plain-text report: p50/p95/p99 and throughput per request, then every threshold check."""
+    lines = [f"{'Request':<48} {'reqs':>8} {'fails':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'req/s':>8}"]
+    entries = sorted(stats.entries.values(), key=lambda e: (e.name, e.method)) + [stats.total]
+    for e in entries:
+        label = 'Aggregated' if e is stats.total else f"{e.method} {e.name}"
+        lines.append(f"{label[:48]:<48} {e.num_requests:>8} {e.num_failures:>7} "
+                     f"{e.get_response_time_percentile(0.50):>7.0f} {e.get_response_time_percentile(0.95):>7.0f} "
+                     f"{e.get_response_time_percentile(0.99):>7.0f} {e.total_rps:>8.1f}")
+    lines.append('')
+    lines.append(f"{'Threshold':<60} {'limit':>10} {'actual':>10}  result")
+    for r in results:
+        label = r['name'] if r['status'] == 'skipped' else f"{r['name']} {r['metric']}"
+        limit = '' if r['limit'] is None else r['limit']
+        actual = 'no requests' if r['actual'] is None else r['actual']
+        lines.append(f"{label[:60]:<60} {limit:>10} {actual:>10}  {r['status'].upper()}")
+    lines.append('')
+    lines.append('PASSED' if passed(results) else 'FAILED: thresholds exceeded')
+    return '\n'.join(lines)
+
+
+def write_report(path, stats, results):
+    """JSON report for CI: the per-request percentiles and throughput, and every threshold result."""
+    requests = [{'name': e.name, 'method': e.method, 'requests': e.num_requests, 'failures': e.num_failures,
+                 'p50': e.get_response_time_percentile(0.50), 'p95': e.get_response_time_percentile(0.95),
+                 'p99': e.get_response_time_percentile(0.99), 'rps': round(e.total_rps, 2)}
+                for e in list(stats.entries.values()) + [stats.total]]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'passed': passed(results), 'requests': requests, 'thresholds': results}, f, indent=2)
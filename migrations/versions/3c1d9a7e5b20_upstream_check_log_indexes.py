@@ -0,0 +1,30 @@
+"""upstream check log indexes
+
+Revision ID: 3c1d9a7e5b20
+Revises: f200f245867a
+Create Date: 2026-10-18 10:12:41.512907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d9a7e5b20'
+down_revision = 'f200f245867a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('upstream_check_log', schema=None) as batch_op:
+        batch_op.create_index('ix_upstream_check_log_tried_at_id', ['tried_at', 'id'], unique=False)
+        batch_op.create_index('ix_upstream_check_log_upstream_tried_at_id', ['upstream_name', 'tried_at', 'id'], unique=False)
+        batch_op.create_index('ix_upstream_check_log_result_tried_at_id', ['result', 'tried_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('upstream_check_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_upstream_check_log_result_tried_at_id')
+        batch_op.drop_index('ix_upstream_check_log_upstream_tried_at_id')
+        batch_op.drop_index('ix_upstream_check_log_tried_at_id')
@@ -0,0 +1,33 @@
+"""access count batches
+
+Revision ID: 8e4b2f61c7a9
+Revises: 3c1d9a7e5b20
+Create Date: 2026-10-18 12:04:17.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b2f61c7a9'
+down_revision = '3c1d9a7e5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('access_count_batches',
+    sa.Column('batch_id', sa.String(), nullable=False),
+    sa.Column('applied_at', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('batch_id')
+    )
+    with op.batch_alter_table('access_count_batches', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_access_count_batches_applied_at'), ['applied_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('access_count_batches', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_access_count_batches_applied_at'))
+
+    op.drop_table('access_count_batches')
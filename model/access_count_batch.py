@@ -0,0 +1,12 @@
+from . import db
+
+
+class AccessCountBatch(db.Model):
+    """A reconciled batch of Redis access counts, recorded with its counts so a batch is applied once."""
+    __tablename__ = 'access_count_batches'
+
+    batch_id = db.Column(db.String, primary_key=True)
+    applied_at = db.Column(db.String, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<AccessCountBatch(batch_id='{self.batch_id}', applied_at='{self.applied_at}')>"
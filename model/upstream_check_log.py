@@ -19,6 +19,10 @@ class UpstreamCheckLog(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('pattern', 'upstream_name', name='uq_pattern_upstream'),
+        # Keyset pagination of the logs page (newest first), unfiltered and per upstream/result filter
+        db.Index('ix_upstream_check_log_tried_at_id', 'tried_at', 'id'),
+        db.Index('ix_upstream_check_log_upstream_tried_at_id', 'upstream_name', 'tried_at', 'id'),
+        db.Index('ix_upstream_check_log_result_tried_at_id', 'result', 'tried_at', 'id'),
     )
 
     @classmethod
@@ -0,0 +1,133 @@
+import unittest
+from unittest.mock import patch
+import logging
+
+from flask import Flask
+
+from model import db
+from model.redirect import Redirect
+from app.utils import access_counter
+from app.utils.access_counter import AccessCountBuffer, apply_access_counts
+
+try:
+    import fakeredis
+    import lupa  # fakeredis runs Lua scripts with it
+except ImportError:  # Optional test dependencies
+    fakeredis = None
+
+logging.disable(logging.CRITICAL)
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Redirect(pattern='a', type='static', target='https://a.example', access_count=1),
+            Redirect(pattern='b', type='static', target='https://b.example', access_count=0),
+        ])
+        db.session.commit()
+    return app
+
+
+def counts(app):
+    with app.app_context():
+        return {r.pattern: r.access_count for r in Redirect.query.all()}
+
+
+class TestAccessCounter(unittest.TestCase):
+
+    def setUp(self):
+        self.app = make_app()
+
+    def test_apply_access_counts_is_additive(self):
+        with self.app.app_context():
+            apply_access_counts({'a': 3, 'b': 2, 'missing': 5})
+        self.assertEqual(counts(self.app), {'a': 4, 'b': 2})
+
+    def test_buffer_aggregates_until_flush(self):
+        buffer = AccessCountBuffer(flush_interval=3600, flush_threshold=1000)
+        buffer.init_app(self.app)
+        for _ in range(5):
+            buffer.add('a')
+        buffer.add('b', 2)
+        self.assertEqual(buffer.pending(), {'a': 5, 'b': 2})
+        self.assertEqual(counts(self.app), {'a': 1, 'b': 0})
+
+        self.assertEqual(buffer.flush(), 7)
+        self.assertEqual(counts(self.app), {'a': 6, 'b': 2})
+        self.assertEqual(buffer.pending(), {})
+
+    def test_failed_flush_keeps_counts(self):
+        buffer = AccessCountBuffer(flush_interval=3600, flush_threshold=1000)
+        buffer.add('a', 2)  # Not bound to an app yet
+        self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending('a'), 2)
+        buffer.init_app(self.app)
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(counts(self.app)['a'], 3)
+
+
+@unittest.skipUnless(fakeredis, "fakeredis (with lupa) not installed")
+class TestRedisAccessCounts(unittest.TestCase):
+
+    def setUp(self):
+        self.app = make_app()
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = patch.object(access_counter, '_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hits_are_counted_in_redis_and_reconciled(self):
+        for _ in range(3):
+            access_counter.record_hit('a')
+        access_counter.record_hit('b')
+        self.assertEqual(self.redis.hgetall(access_counter.REDIS_COUNTS_KEY), {'a': '3', 'b': '1'})
+        self.assertEqual(access_counter.get_pending_counts(['a', 'b']), {'a': 3, 'b': 1})
+
+        self.assertEqual(access_counter.reconcile_redis_counts(self.app), 4)
+        self.assertEqual(counts(self.app), {'a': 4, 'b': 1})
+        self.assertFalse(self.redis.exists(access_counter.REDIS_COUNTS_KEY))
+        self.assertFalse(self.redis.exists(access_counter.REDIS_RECONCILING_KEY))
+
+    def test_leftover_staging_hash_is_reconciled(self):
+        self.redis.hset(access_counter.REDIS_RECONCILING_KEY, 'b', 5)
+        self.redis.hset(access_counter.REDIS_COUNTS_KEY, 'a', 1)
+        self.assertEqual(access_counter.reconcile_redis_counts(self.app), 5)
+        self.assertEqual(counts(self.app), {'a': 1, 'b': 5})
+        # Hits counted meanwhile stay in the live hash for the next run
+        self.assertEqual(self.redis.hgetall(access_counter.REDIS_COUNTS_KEY), {'a': '1'})
+
+    def test_batch_applied_before_a_crash_is_not_applied_again(self):
+        self.redis.hset(access_counter.REDIS_COUNTS_KEY, 'a', 2)
+        # The DB commit succeeds, then the worker dies before the staging hash is deleted
+        with patch.object(access_counter, '_finish_batch', side_effect=RuntimeError('worker died')):
+            with self.assertRaises(RuntimeError):
+                access_counter.reconcile_redis_counts(self.app)
+        self.assertTrue(self.redis.exists(access_counter.REDIS_RECONCILING_KEY))
+        self.assertEqual(access_counter.reconcile_redis_counts(self.app), 0)
+        self.assertEqual(counts(self.app), {'a': 3, 'b': 0})
+        self.assertFalse(self.redis.exists(access_counter.REDIS_RECONCILING_KEY))
+
+    def test_lock_taken_over_mid_run_is_not_released_or_double_applied(self):
+        self.redis.hset(access_counter.REDIS_COUNTS_KEY, 'b', 4)
+        apply = access_counter.apply_access_counts
+
+        def lock_expires_during_apply(counts, batch_id=None):
+            # Another worker takes the expired lock and applies the same staging hash first
+            self.redis.set(access_counter.REDIS_RECONCILE_LOCK_KEY, 'other-worker')
+            with self.app.app_context():
+                apply(counts, batch_id=batch_id)
+            return apply(counts, batch_id=batch_id)
+
+        with patch.object(access_counter, 'apply_access_counts', side_effect=lock_expires_during_apply):
+            self.assertEqual(access_counter.reconcile_redis_counts(self.app), 0)
+        self.assertEqual(counts(self.app), {'a': 1, 'b': 4})
+        self.assertEqual(self.redis.get(access_counter.REDIS_RECONCILE_LOCK_KEY), 'other-worker')
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,96 @@
+import io
+import json
+import queue
+import time
+import unittest
+import logging
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from app.config import config, ConfigSnapshot
+from app.utils import access_log
+
+logging.disable(logging.CRITICAL)
+
+
+class TestAccessLog(unittest.TestCase):
+
+    def setUp(self):
+        # The access logger doesn't propagate, but logging.disable applies to it too
+        logging.disable(logging.NOTSET)
+        self.addCleanup(logging.disable, logging.CRITICAL)
+        self.configure(sample_rate=1.0)
+        self.out = io.StringIO()
+        access_log.stop()
+        with redirect_stdout(self.out):
+            access_log.ensure_started()
+        self.addCleanup(access_log.stop)
+
+    def configure(self, **settings):
+        patcher = patch.object(config, 'snapshot', ConfigSnapshot.from_dict({'access_log': settings}))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def records(self):
+        access_log.stop()
+        return [json.loads(line) for line in self.out.getvalue().splitlines()]
+
+    def test_redirect_record(self):
+        access_log.log_redirect('jira/PROJ/1', 'jira', 'redis', 'https://jira.example/PROJ/browse/1', fast_path=True)
+        [record] = self.records()
+        self.assertEqual(record['event'], 'redirect')
+        self.assertEqual(record['path'], 'jira/PROJ/1')
+        self.assertEqual(record['target'], 'https://jira.example/PROJ/browse/1')
+        self.assertTrue(record['fast_path'])
+        self.assertIn('ts', record)
+
+    def test_redirects_are_sampled(self):
+        self.configure(sample_rate=0.25)
+        with patch.object(access_log.random, 'random', side_effect=[0.1, 0.3, 0.9, 0.2]):
+            for i in range(4):
+                access_log.log_redirect(f'p{i}', f'p{i}', 'redis', 'https://x')
+        self.assertEqual([record['path'] for record in self.records()], ['p0', 'p3'])
+
+    def test_misses_and_errors_ignore_sampling(self):
+        self.configure(sample_rate=0)
+        access_log.log_redirect('docs', 'docs', 'redis', 'https://x')
+        access_log.log_miss('nope', 'create')
+        access_log.log_error('docs', ValueError('boom'))
+        records = self.records()
+        self.assertEqual([record['event'] for record in records], ['miss', 'error'])
+        self.assertEqual(records[1]['error'], 'boom')
+
+    def test_disabled(self):
+        self.configure(enabled=False)
+        access_log.log_redirect('docs', 'docs', 'redis', 'https://x')
+        access_log.log_miss('nope', 'create')
+        self.assertEqual(self.records(), [])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = access_log._DroppingQueueHandler(queue.Queue(1))
+        dropped = access_log.stats()['dropped']
+        record = logging.makeLogRecord({'msg': 'redirect'})
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(access_log.stats()['dropped'], dropped + 1)
+
+    def test_slow_handler_does_not_delay_logging(self):
+        handler = access_log._state['writer'].handler
+        emit = handler.emit
+
+        def slow_emit(record):
+            time.sleep(0.05)
+            emit(record)
+
+        with patch.object(handler, 'emit', side_effect=slow_emit):
+            started = time.monotonic()
+            for i in range(10):
+                access_log.log_miss(f'nope{i}', 'create')
+            elapsed = time.monotonic() - started
+            records = self.records()
+        self.assertLess(elapsed, 0.25)
+        self.assertEqual([record['path'] for record in records], [f'nope{i}' for i in range(10)])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,107 @@
+import unittest
+import logging
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from model import db
+from model.redirect import Redirect
+from app.utils import bulk_import
+
+logging.disable(logging.CRITICAL)
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Redirect(pattern='old', type='static', target='https://old.example', access_count=4,
+                     updated_at='2024-01-01 00:00:00', created_ip='1.1.1.1'),
+            Redirect(pattern='fresh', type='static', target='https://fresh.example',
+                     updated_at='2025-06-01 00:00:00+00:00'),
+        ])
+        db.session.commit()
+    return app
+
+
+def targets(app):
+    with app.app_context():
+        return {r.pattern: r.target for r in Redirect.query.all()}
+
+
+class TestBulkImport(unittest.TestCase):
+
+    def setUp(self):
+        self.app = make_app()
+
+    def test_newer_wins_and_report(self):
+        entries = [
+            {'pattern': 'old', 'target': 'https://new.example', 'updated_at': '2025-01-01 00:00:00'},
+            {'pattern': 'fresh', 'target': 'https://stale.example', 'updated_at': '2025-05-31 23:00:00'},
+            {'pattern': 'n0', 'target': 'https://n0.example'},
+            {'pattern': 'n1', 'target': 'https://n1.example', 'updated_at': '2025-01-01 00:00:00'},
+            {'pattern': 'n1', 'target': 'https://n1-newer.example', 'updated_at': '2025-02-01 00:00:00'},
+            {'pattern': 'no-target'},
+            'garbage',
+        ]
+        with self.app.app_context():
+            report = bulk_import.import_redirects(entries, chunk_size=3)
+        self.assertEqual((report['inserted'], report['updated'], report['skipped'], report['invalid']), (2, 1, 2, 2))
+        self.assertEqual(report['rows'], 7)
+        self.assertEqual(len(report['chunks']), 3)
+        self.assertTrue(all('seconds' in c for c in report['chunks']))
+        self.assertEqual(targets(self.app), {
+            'old': 'https://new.example', 'fresh': 'https://fresh.example',
+            'n0': 'https://n0.example', 'n1': 'https://n1-newer.example',
+        })
+        with self.app.app_context():
+            old = Redirect.query.filter_by(pattern='old').one()
+            # Fields missing from the import keep their current values
+            self.assertEqual((old.access_count, old.created_ip), (4, '1.1.1.1'))
+            self.assertEqual(Redirect.query.filter_by(pattern='n0').one().created_ip, 'import')
+
+    def test_reimport_is_idempotent(self):
+        entries = [{'pattern': f'p{i}', 'target': f'https://e/{i}', 'updated_at': '2025-01-01 00:00:00'}
+                   for i in range(1200)]
+        with self.app.app_context():
+            first = bulk_import.import_redirects(entries)
+            second = bulk_import.import_redirects(iter(entries))
+            self.assertEqual(Redirect.query.count(), 1202)
+        self.assertEqual(first['inserted'], 1200)
+        self.assertEqual(len(first['chunks']), 3)
+        self.assertEqual((second['inserted'], second['updated'], second['skipped']), (0, 0, 1200))
+        self.assertFalse(first['approximate'])
+
+    def test_rows_created_concurrently_are_not_counted_as_inserted(self):
+        rows = [{'pattern': p, 'type': 'static', 'target': f'https://{p}.example'} for p in ('old', 'n0', 'n1')]
+        with self.app.app_context():
+            # 'old' exists already, as if created after the chunk's prefetch
+            self.assertEqual(bulk_import._insert_ignoring_conflicts(rows), (2, True))
+            self.assertEqual(Redirect.query.count(), 4)
+
+    def test_unknown_rowcount_is_reported_as_approximate(self):
+        connection = MagicMock()
+        connection.execute.return_value.rowcount = -1
+        entries = [{'pattern': 'n0', 'target': 'https://n0.example'}, {'pattern': 'n1', 'target': 'https://n1.example'}]
+        with self.app.app_context():
+            dialect = db.session.get_bind().dialect
+            with patch.object(dialect, 'insert_executemany_returning', False), \
+                    patch.object(db.session, 'connection', return_value=connection):
+                report = bulk_import.import_redirects(entries)
+        self.assertEqual(report['inserted'], 2)
+        self.assertTrue(report['approximate'])
+        self.assertTrue(report['chunks'][0]['approximate'])
+
+    def test_parse_timestamp(self):
+        self.assertEqual(bulk_import.parse_timestamp('2025-01-01 02:00:00+02:00'),
+                         bulk_import.parse_timestamp('2025-01-01 00:00:00'))
+        self.assertIsNone(bulk_import.parse_timestamp('yesterday'))
+        self.assertIsNone(bulk_import.parse_timestamp(None))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
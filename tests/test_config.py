@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import logging
+
+from app.config import ConfigSnapshot, config, freeze, thaw
+
+logging.disable(logging.CRITICAL)
+
+
+class TestConfigSnapshot(unittest.TestCase):
+
+    def test_snapshot_is_immutable(self):
+        snapshot = ConfigSnapshot.from_dict({'port': '8080', 'upstreams': [{'name': 'corp'}], 'redis': {'port': 1}})
+        self.assertEqual(snapshot.port, 8080)
+        self.assertEqual(snapshot.upstreams[0]['name'], 'corp')
+        with self.assertRaises(TypeError):
+            snapshot.data['port'] = 1
+        with self.assertRaises(TypeError):
+            snapshot.data['redis']['port'] = 2
+        with self.assertRaises(AttributeError):
+            snapshot.port = 1
+
+    def test_thaw_round_trips_to_json(self):
+        cfg = {'a': [1, {'b': True}], 'c': {'d': None}}
+        self.assertEqual(json.loads(json.dumps(thaw(freeze(cfg)))), cfg)
+
+
+class TestConfigReload(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'redirect.config.json')
+        with open(self.path, 'w') as f:
+            json.dump(thaw(config.snapshot.data), f)
+        self.reloads = []
+        for patcher in (patch.object(config, 'CONFIG_FILE', self.path),
+                        patch.object(config, 'snapshot', config.snapshot),
+                        patch.object(config, '_reload_listeners', [lambda: self.reloads.append(1)]),
+                        patch.object(config, '_save_listeners', [])):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_save_writes_file_and_swaps_snapshot(self):
+        before = config.snapshot
+        config.save_values({'auto_redirect_delay': 77})
+        self.assertIsNot(config.snapshot, before)
+        self.assertEqual(config.snapshot.auto_redirect_delay, 77)
+        self.assertNotEqual(before.get('auto_redirect_delay'), 77)  # Readers holding the old snapshot are unaffected
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)['auto_redirect_delay'], 77)
+        self.assertFalse(config.reload_if_changed())
+
+    def test_external_edit_is_picked_up_on_mtime_change(self):
+        config.reload()
+        self.reloads.clear()
+        with open(self.path) as f:
+            data = json.load(f)
+        data['port'] = 9123
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+        os.utime(self.path, ns=(config.snapshot.mtime_ns + 10**9, config.snapshot.mtime_ns + 10**9))
+        self.assertTrue(config.reload_if_changed())
+        self.assertEqual(config.snapshot.port, 9123)
+        self.assertEqual(self.reloads, [1])
+
+    def test_reload_never_generates_secrets(self):
+        self.assertNotIn('admin_password', config.get_default_config())
+        with open(self.path) as f:
+            data = json.load(f)
+        password = data.pop('admin_password')
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+        config.reload()
+        config.reload()
+        self.assertEqual(config.snapshot.get('admin_password'), password)
+
+    def test_save_writes_back_a_missing_secret(self):
+        config.reload()
+        with open(self.path) as f:
+            data = json.load(f)
+        password = data.pop('admin_password')
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+        config.save_values({'port': 8080})
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)['admin_password'], password)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,104 @@
+import unittest
+import logging
+from unittest.mock import patch
+
+from flask import Flask
+
+from model import db
+from model.redirect import Redirect
+from app.config import config, ConfigSnapshot
+from app.routes.redirection_routes import bp as redirection_bp
+from app.utils import access_counter, fast_path, pattern_index
+from app.utils.local_cache import shortcut_cache
+
+logging.disable(logging.CRITICAL)
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.secret_key = 'test'
+    db.init_app(app)
+    app.register_blueprint(redirection_bp)
+    app.add_url_rule('/admin/ping', 'ping', lambda: 'pong')
+    fast_path.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Redirect(pattern='docs', type='static', target='https://docs.example/ä'),
+            Redirect(pattern='jira', type='dynamic', target='https://jira.example/{project}/browse/{id}'),
+            Redirect(pattern='admin', type='static', target='https://admin.example'),
+        ])
+        db.session.commit()
+    return app
+
+
+class TestFastPath(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = {'auto_redirect_delay': 0, 'fast_path': {'enabled': True},
+                         'access_count': {'write_behind': True}}
+        for patcher in (patch.object(config, 'snapshot', ConfigSnapshot.from_dict(self.settings)),
+                        patch.object(config, 'redis_enabled', False),
+                        patch.object(access_counter, 'record_hit', self.record_hit)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.hits = []
+        shortcut_cache.invalidate()
+        pattern_index.invalidate()
+        self.app = make_app()
+        self.middleware = self.app.wsgi_app
+        self.client = self.app.test_client()
+
+    def record_hit(self, pattern):
+        self.hits.append(pattern)
+
+    def configure(self, **settings):
+        config.snapshot = ConfigSnapshot.from_dict({**self.settings, **settings})
+
+    def test_cached_redirects_skip_flask(self):
+        first = self.client.get('/docs')
+        self.assertEqual(self.middleware.served, 0)  # Resolved by Flask, which caches it
+        second = self.client.get('/docs')
+        self.assertEqual(self.middleware.served, 1)
+        self.assertEqual(second.status_code, 302)
+        self.assertEqual(second.headers['Location'], first.headers['Location'])
+        self.assertEqual(second.headers['Location'], 'https://docs.example/%C3%A4')
+        self.assertEqual(self.hits, ['docs', 'docs'])
+
+    def test_dynamic_redirect(self):
+        self.client.get('/jira/A/1')
+        response = self.client.get('/jira/PROJ/123')
+        self.assertEqual(self.middleware.served, 1)
+        self.assertEqual(response.headers['Location'], 'https://jira.example/PROJ/browse/123')
+
+    def test_usage_page_and_misses_go_to_flask(self):
+        self.client.get('/jira/A/1')
+        self.client.get('/jira')
+        self.client.get('/nothing')
+        self.assertEqual(self.middleware.served, 0)
+
+    def test_other_routes_are_never_shadowed(self):
+        with self.app.app_context():
+            shortcut_cache.set('admin', ({'target': 'https://admin.example', 'data_type': 'static'}, 'redirect_table'))
+        self.client.get('/docs')
+        response = self.client.get('/admin/ping')
+        self.assertEqual(response.data, b'pong')
+        self.assertEqual(self.middleware.served, 0)
+
+    def test_off_when_disabled_or_delayed(self):
+        self.client.get('/docs')
+        for settings in ({'fast_path': {'enabled': False}}, {'auto_redirect_delay': 3},
+                         {'access_count': {'write_behind': False}}):
+            with self.subTest(settings=settings):
+                self.configure(**settings)
+                self.assertIsNone(self.middleware.resolve({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/docs'}))
+        self.configure()
+        self.assertIsNone(self.middleware.resolve({'REQUEST_METHOD': 'POST', 'PATH_INFO': '/docs'}))
+        self.assertEqual(self.middleware.resolve({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/docs'}),
+                         'https://docs.example/ä')
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
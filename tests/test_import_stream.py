@@ -0,0 +1,93 @@
+import gzip
+import io
+import json
+import unittest
+from unittest.mock import patch
+import logging
+
+from app.utils import import_stream
+
+logging.disable(logging.CRITICAL)
+
+ENTRIES = [{'pattern': f'p{i}', 'target': f'https://example.org/{i}', 'access_count': i * 1000}
+           for i in range(50)]
+
+
+def parse(data, read_size=7):
+    # A tiny read size forces entries, numbers and multi-byte characters to straddle block boundaries
+    with patch.object(import_stream, 'READ_SIZE', read_size):
+        return list(import_stream.iter_entries(io.BytesIO(data)))
+
+
+class TestImportStream(unittest.TestCase):
+
+    def test_json_array(self):
+        data = json.dumps(ENTRIES, indent=2).encode('utf-8')
+        self.assertEqual(parse(data), ENTRIES)
+        self.assertEqual(parse(b'\xef\xbb\xbf  [ ]'), [])
+        self.assertEqual(parse(b''), [])
+        self.assertEqual(parse('[{"pattern": "café", "n": 12345}]'.encode('utf-8')),
+                         [{'pattern': 'café', 'n': 12345}])
+
+    def test_ndjson_and_gzip(self):
+        data = ''.join(json.dumps(e) + '\n' for e in ENTRIES).encode('utf-8')
+        self.assertEqual(parse(data), ENTRIES)
+        self.assertEqual(parse(gzip.compress(data)), ENTRIES)
+        self.assertEqual(parse(gzip.compress(json.dumps(ENTRIES).encode('utf-8'))), ENTRIES)
+        # Concatenated gzip members
+        half = len(data) // 2
+        split = data.index(b'\n', half) + 1
+        self.assertEqual(parse(gzip.compress(data[:split]) + gzip.compress(data[split:])), ENTRIES)
+
+    def test_bad_ndjson_lines_are_passed_through_as_invalid(self):
+        data = b'{"pattern": "a", "target": "x"}\n\nnot json\n{"pattern": "b", "target": "y"}'
+        self.assertEqual(parse(data), [{'pattern': 'a', 'target': 'x'}, 'not json', {'pattern': 'b', 'target': 'y'}])
+
+    def test_malformed_input_raises_value_error(self):
+        for data in (b'[{"pattern": "a"} {"pattern": "b"}]', b'[{"pattern": "a"},', b'[1,]', b'"text"',
+                     gzip.compress(json.dumps(ENTRIES).encode('utf-8'))[:100]):
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                parse(data)
+
+    def test_entries_are_yielded_before_the_upload_is_read(self):
+        stream = io.BytesIO(json.dumps(ENTRIES).encode('utf-8'))
+        with patch.object(import_stream, 'READ_SIZE', 256):
+            entries = import_stream.iter_entries(stream)
+            self.assertEqual(next(entries), ENTRIES[0])
+        self.assertLess(stream.tell(), len(stream.getvalue()))
+
+
+def multipart(data, filename='redirects.ndjson', boundary='b0undary'):
+    return (f'--{boundary}\r\nContent-Disposition: form-data; name="note"\r\n\r\nbefore\r\n'
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode() + data + \
+           f'\r\n--{boundary}\r\nContent-Disposition: form-data; name="after"\r\n\r\nx\r\n--{boundary}--\r\n'.encode()
+
+
+class TestMultipartUpload(unittest.TestCase):
+
+    def test_file_part_is_read_from_the_request_stream(self):
+        data = gzip.compress(''.join(json.dumps(e) + '\n' for e in ENTRIES).encode('utf-8'))
+        with patch.object(import_stream, 'READ_SIZE', 7):
+            upload = import_stream.open_multipart_file(io.BytesIO(multipart(data, 'r.ndjson.gz')), 'b0undary')
+            self.assertEqual(upload.filename, 'r.ndjson.gz')
+            self.assertEqual(list(import_stream.iter_entries(upload)), ENTRIES)
+
+    def test_entries_are_yielded_before_the_request_body_is_read(self):
+        body = io.BytesIO(multipart(json.dumps(ENTRIES).encode('utf-8')))
+        with patch.object(import_stream, 'READ_SIZE', 256):
+            entries = import_stream.iter_entries(import_stream.open_multipart_file(body, 'b0undary'))
+            self.assertEqual(next(entries), ENTRIES[0])
+        self.assertLess(body.tell(), len(body.getvalue()))
+
+    def test_missing_or_truncated_file_part(self):
+        self.assertIsNone(import_stream.open_multipart_file(
+            io.BytesIO(b'--b0undary\r\nContent-Disposition: form-data; name="note"\r\n\r\nx\r\n--b0undary--\r\n'),
+            'b0undary'))
+        truncated = multipart(json.dumps(ENTRIES).encode('utf-8'))[:200]
+        with self.assertRaises(ValueError):
+            list(import_stream.iter_entries(import_stream.open_multipart_file(io.BytesIO(truncated), 'b0undary')))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
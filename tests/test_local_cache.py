@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import patch
+import logging
+
+from app.utils.local_cache import LocalCache, MISSING
+
+logging.disable(logging.CRITICAL)
+
+
+class TestLocalCache(unittest.TestCase):
+
+    def test_get_set_counts_hits_and_misses(self):
+        cache = LocalCache('test', max_entries=10, ttl_seconds=60)
+        self.assertIs(cache.get('a'), MISSING)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_lru_eviction(self):
+        cache = LocalCache('test', max_entries=2, ttl_seconds=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')  # 'b' becomes least recently used
+        cache.set('c', 3)
+        self.assertIs(cache.get('b'), MISSING)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    @patch('app.utils.local_cache.time.monotonic')
+    def test_ttl_expiry(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = LocalCache('test', max_entries=10, ttl_seconds=5)
+        cache.set('a', 1)
+        mock_monotonic.return_value = 106.0
+        self.assertIs(cache.get('a'), MISSING)
+
+    def test_invalidate_drops_key_and_stale_writes(self):
+        cache = LocalCache('test', max_entries=10, ttl_seconds=60)
+        cache.set('a', 1)
+        generation = cache.generation
+        cache.invalidate('a')
+        self.assertIs(cache.get('a'), MISSING)
+        # A lookup that started before the invalidation must not repopulate the cache.
+        cache.set('a', 'stale', generation=generation)
+        self.assertIs(cache.get('a'), MISSING)
+
+    def test_guard_bypasses_cache(self):
+        cache = LocalCache('test', max_entries=10, ttl_seconds=60, guard=lambda: False)
+        cache.set('a', 1)
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(cache.stats()['bypassed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
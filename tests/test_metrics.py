@@ -0,0 +1,109 @@
+import unittest
+import logging
+from unittest.mock import patch
+
+from flask import Flask
+from sqlalchemy import text
+
+from model import db
+from app import CONSTANTS
+from app.config import config, ConfigSnapshot
+from app.routes.metrics_routes import bp as metrics_bp
+from app.utils import metrics
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+logging.disable(logging.CRITICAL)
+
+
+def sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    app.register_blueprint(metrics_bp)
+    metrics.init_app(app)
+    return app
+
+
+@unittest.skipUnless(prometheus_client, "prometheus_client not installed")
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.app = make_app()
+        self.client = self.app.test_client()
+
+    def test_lookup_tiers(self):
+        before = {tier: sample('redirector_shortcut_lookup_seconds_count', tier=tier)
+                  for tier in ('local', 'redis', 'db', 'miss')}
+        metrics.observe_lookup(CONSTANTS.data_source_redis, 0.001, local=True)
+        metrics.observe_lookup(CONSTANTS.data_source_redis, 0.002)
+        metrics.observe_lookup(CONSTANTS.data_source_redirect, 0.003)
+        metrics.observe_lookup(None, 0.004)
+        for tier in before:
+            self.assertEqual(sample('redirector_shortcut_lookup_seconds_count', tier=tier), before[tier] + 1)
+
+    def test_redirects_and_probes(self):
+        redirects = sample('redirector_redirects_total', type='static')
+        probes = sample('redirector_upstream_probe_seconds_count', upstream='corp', result='timeout')
+        metrics.count_redirect('static')
+        metrics.observe_probe('corp', 'timeout', 5.0)
+        self.assertEqual(sample('redirector_redirects_total', type='static'), redirects + 1)
+        self.assertEqual(sample('redirector_upstream_probe_seconds_count', upstream='corp', result='timeout'),
+                         probes + 1)
+
+    def test_db_queries_are_counted(self):
+        before = sample('redirector_db_queries_total')
+        with self.app.app_context():
+            db.session.execute(text('SELECT 1'))
+            db.session.execute(text('SELECT 2'))
+        self.assertEqual(sample('redirector_db_queries_total'), before + 2)
+
+    def test_redis_connection_class_counts_round_trips(self):
+        class Connection:
+            def send_packed_command(self, command, check_health=True):
+                return command
+
+        counting = metrics._counting_connection_class(Connection)
+        self.assertIs(metrics._counting_connection_class(counting), counting)
+        before = sample('redirector_redis_round_trips_total')
+        self.assertEqual(counting().send_packed_command(b'PING'), b'PING')
+        self.assertEqual(sample('redirector_redis_round_trips_total'), before + 1)
+
+    def test_streamed_response_is_in_flight_until_closed(self):
+        seen = []
+
+        @self.app.route('/stream')
+        def stream():
+            def generate():
+                yield 'a'
+                seen.append(sample('redirector_requests_in_progress'))
+                yield 'b'
+            return self.app.response_class(generate())
+
+        before = sample('redirector_requests_in_progress')
+        response = self.client.get('/stream', buffered=False)
+        self.assertEqual(sample('redirector_requests_in_progress'), before + 1)
+        self.assertEqual(b''.join(response.response), b'ab')
+        response.close()
+        self.assertEqual(seen, [before + 1])
+        self.assertEqual(sample('redirector_requests_in_progress'), before)
+
+    def test_endpoint(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'redirector_requests_in_progress 1.0', response.data)
+
+        with patch.object(config, 'snapshot', ConfigSnapshot.from_dict({'metrics': {'enabled': False}})):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import patch
+import logging
+
+from app.utils import negative_cache
+
+try:
+    import fakeredis
+except ImportError:  # Optional test dependency
+    fakeredis = None
+
+logging.disable(logging.CRITICAL)
+
+
+@patch('app.utils.negative_cache._redis_client', return_value=None)
+class TestNegativeCache(unittest.TestCase):
+
+    def setUp(self):
+        negative_cache.clear()
+        negative_cache.reset_counts()
+
+    def test_record_and_clear_miss(self, _):
+        self.assertFalse(negative_cache.is_known_miss('typo'))
+        negative_cache.record_miss('typo')
+        self.assertTrue(negative_cache.is_known_miss('typo'))
+        negative_cache.clear('typo')
+        self.assertFalse(negative_cache.is_known_miss('typo'))
+
+    def test_top_misses_are_ordered_by_count(self, _):
+        negative_cache.record_miss('rare')
+        for _ in range(3):
+            negative_cache.count_miss('often')
+        self.assertEqual(negative_cache.get_top_misses(), [('often', 3, False), ('rare', 1, True)])
+
+    def test_disabled_cache_never_short_circuits(self, _):
+        with patch.object(negative_cache, 'is_enabled', return_value=False):
+            negative_cache.record_miss('typo')
+            self.assertFalse(negative_cache.is_known_miss('typo'))
+
+    @patch('app.utils.local_cache.time.monotonic', return_value=100.0)
+    def test_local_entry_uses_the_current_ttl(self, monotonic, _):
+        with patch.object(negative_cache, 'get_ttl', return_value=10):
+            negative_cache.record_miss('typo')
+        monotonic.return_value = 111.0
+        self.assertFalse(negative_cache.is_known_miss('typo'))
+
+
+@unittest.skipUnless(fakeredis, "fakeredis not installed")
+class TestNegativeCacheRedis(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = patch.object(negative_cache, '_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        negative_cache.invalidate_local()
+
+    @patch('app.utils.local_cache.time.monotonic', return_value=100.0)
+    def test_local_copy_expires_with_the_redis_key(self, monotonic):
+        self.redis.set(negative_cache.REDIS_MISS_KEY.format(pattern='typo'), 1, px=2000)
+        self.assertTrue(negative_cache.is_known_miss('typo'))
+        self.redis.delete(negative_cache.REDIS_MISS_KEY.format(pattern='typo'))  # Expired in Redis
+        monotonic.return_value = 101.0
+        self.assertTrue(negative_cache.is_known_miss('typo'))  # Still within what Redis had left
+        monotonic.return_value = 102.5
+        self.assertFalse(negative_cache.is_known_miss('typo'))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
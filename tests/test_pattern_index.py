@@ -0,0 +1,114 @@
+import unittest
+from unittest.mock import patch
+import logging
+
+from flask import Flask
+
+from model import db
+from model.redirect import Redirect
+from app.utils import invalidation, pattern_index
+from app.utils.pattern_index import PatternTrie
+from app.utils.utils import destructureSubPath
+
+logging.disable(logging.CRITICAL)
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Redirect(pattern='team', type='static', target='https://team.example'),
+            Redirect(pattern='team/foo', type='static', target='https://foo.example'),
+            Redirect(pattern='Team/Bar', type='dynamic', target='https://bar.example/{id}'),
+        ])
+        db.session.commit()
+    return app
+
+
+class TestPatternTrie(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = PatternTrie(['team/foo', 'team/foo/bar/baz', 'Ops/Wiki', 'flat'])
+
+    def test_only_namespaced_patterns_are_indexed(self):
+        self.assertEqual(self.trie.size, 3)
+        self.assertEqual(self.trie.longest_match(['flat']), (None, 0))
+
+    def test_longest_match(self):
+        self.assertEqual(self.trie.longest_match(['team', 'foo']), ('team/foo', 2))
+        self.assertEqual(self.trie.longest_match(['team', 'foo', 'bar']), ('team/foo', 2))
+        self.assertEqual(self.trie.longest_match(['team', 'foo', 'bar', 'baz', '1']), ('team/foo/bar/baz', 4))
+        self.assertEqual(self.trie.longest_match(['team']), (None, 0))
+        self.assertEqual(self.trie.longest_match(['team', 'bar']), (None, 0))
+
+    def test_match_returns_the_pattern_as_saved(self):
+        self.assertEqual(self.trie.longest_match(['ops', 'wiki', 'page']), ('Ops/Wiki', 2))
+
+    def test_destructure_with_index(self):
+        cases = [
+            ("team/foo", ("team/foo", [])),
+            ("/Team/Foo/1/2 ", ("team/foo", ["1", "2"])),
+            ("team/bar/1", ("team", ["bar", "1"])),
+            ("flat/1", ("flat", ["1"])),
+            ("/", ("", [])),
+        ]
+        for subpath, expected in cases:
+            with self.subTest(subpath=subpath):
+                self.assertEqual(destructureSubPath(subpath, self.trie), expected)
+
+
+class TestPatternIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.app = make_app()
+        pattern_index.invalidate()
+
+    def tearDown(self):
+        pattern_index.invalidate()
+
+    def test_index_is_built_from_namespaced_patterns(self):
+        with self.app.app_context():
+            index = pattern_index.get_index()
+            self.assertEqual(index.size, 2)
+            self.assertIs(pattern_index.get_index(), index)
+            self.assertEqual(destructureSubPath('team/bar/42', index), ('Team/Bar', ['42']))
+            self.assertEqual(destructureSubPath('team/baz/42', index), ('team', ['baz', '42']))
+
+    def test_namespaced_change_rebuilds_index(self):
+        with self.app.app_context():
+            index = pattern_index.get_index()
+            db.session.add(Redirect(pattern='team/baz', type='static', target='https://baz.example'))
+            db.session.commit()
+
+            invalidation.publish('shortcut', 'flat')
+            self.assertIs(pattern_index.get_index(), index)
+
+            invalidation.publish('shortcut', 'team/baz')
+            rebuilt = pattern_index.get_index()
+            self.assertIsNot(rebuilt, index)
+            self.assertEqual(destructureSubPath('team/baz/42', rebuilt), ('team/baz', ['42']))
+
+    def test_invalidation_during_build_is_not_lost(self):
+        build = pattern_index._build
+
+        def build_then_invalidate():
+            trie = build()
+            # The DB query yields; meanwhile a namespaced pattern changes
+            invalidation.publish('shortcut', 'team/baz')
+            return trie
+
+        with self.app.app_context():
+            with patch.object(pattern_index, '_build', side_effect=build_then_invalidate):
+                pattern_index.get_index()
+            self.assertIsNone(pattern_index.current_index())
+            db.session.add(Redirect(pattern='team/baz', type='static', target='https://baz.example'))
+            db.session.commit()
+            self.assertEqual(pattern_index.get_index().size, 3)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,74 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+import logging
+
+from flask import Flask
+
+from model import db
+from model.redirect import Redirect
+from app.utils import redirect_export
+
+logging.disable(logging.CRITICAL)
+
+
+def make_app(n):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Redirect(pattern=f'p{i}', type='static', target=f'https://example.org/{i}',
+                                     access_count=i) for i in range(n)])
+        db.session.commit()
+    return app
+
+
+class TestRedirectExport(unittest.TestCase):
+
+    def setUp(self):
+        self.app = make_app(25)
+
+    def export(self, fmt, compress=False):
+        with self.app.app_context():
+            mimetype, extension, chunks = redirect_export.export_redirects(fmt, compress=compress, batch_size=7)
+            data = b''.join(chunks)
+        return mimetype, extension, data
+
+    def test_rows_are_paged_by_id(self):
+        with self.app.app_context():
+            rows = list(redirect_export.iter_redirect_rows(batch_size=7))
+        self.assertEqual([r['pattern'] for r in rows], [f'p{i}' for i in range(25)])
+        self.assertEqual(set(rows[0]), set(redirect_export.EXPORT_FIELDS))
+
+    def test_json_export_is_importable_array(self):
+        mimetype, extension, data = self.export('json')
+        self.assertEqual((mimetype, extension), ('application/json', 'json'))
+        rows = json.loads(data)
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[3]['access_count'], 3)
+
+    def test_ndjson_gzip_and_csv(self):
+        mimetype, extension, data = self.export('ndjson', compress=True)
+        self.assertEqual(extension, 'ndjson.gz')
+        lines = gzip.decompress(data).decode('utf-8').splitlines()
+        self.assertEqual(json.loads(lines[-1])['pattern'], 'p24')
+
+        _, _, data = self.export('csv')
+        rows = list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[0]['target'], 'https://example.org/0')
+
+    def test_empty_table_and_unknown_format(self):
+        app = make_app(0)
+        with app.app_context():
+            self.assertEqual(json.loads(b''.join(redirect_export.export_redirects('json')[2])), [])
+        with self.assertRaises(ValueError):
+            redirect_export.export_redirects('xml')
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,89 @@
+import json
+import unittest
+from unittest.mock import patch
+import logging
+
+from flask import Flask
+
+from model import db
+from model.upstream_cache import UpstreamCache
+from app.config import config
+from app.utils import redis_keys, utils
+
+try:
+    import fakeredis
+except ImportError:  # Optional test dependency
+    fakeredis = None
+
+logging.disable(logging.CRITICAL)
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@unittest.skipUnless(fakeredis, "fakeredis not installed")
+class TestRedisKeys(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        for patcher in (patch.object(config, 'redis_client', self.redis),
+                        patch.object(config, 'redis_enabled', True),
+                        patch('app.utils.utils.get_upstreams', return_value=[{'name': 'corp'}, {'name': 'public'}]),
+                        patch('app.utils.invalidation.publish', side_effect=lambda topic, key=None:
+                              redis_keys._generations.invalidate(key) if topic == 'redis_generation' else None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        redis_keys._generations.invalidate()
+        self.addCleanup(redis_keys._generations.invalidate)
+        self.app = make_app()
+
+    def test_bump_retires_the_keyspace(self):
+        self.assertEqual(utils.shortcut_redis_key('docs'), 'v0:shortcut:docs')
+        utils.redis_set(utils.shortcut_redis_key('docs'), '{}', ex=redis_keys.get_ttl())
+        self.assertGreater(self.redis.ttl('v0:shortcut:docs'), 0)
+
+        self.assertEqual(redis_keys.bump(redis_keys.SHORTCUT), 1)
+        self.assertEqual(utils.shortcut_redis_key('docs'), 'v1:shortcut:docs')
+        self.assertIsNone(utils.redis_get(utils.shortcut_redis_key('docs')))
+        # Other keyspaces keep their generation
+        self.assertEqual(utils.upstream_cache_redis_key('docs', 'corp'), 'v0:upstream_cache:docs:corp')
+
+    def test_generation_is_cached_per_worker(self):
+        redis_keys.generation(redis_keys.SHORTCUT)
+        self.redis.incr(redis_keys.GENERATION_KEY.format(keyspace=redis_keys.SHORTCUT))
+        with patch.object(redis_keys._generations, 'guard', lambda: True):
+            self.assertEqual(redis_keys.generation(redis_keys.SHORTCUT), 0)
+            redis_keys._generations.invalidate(redis_keys.SHORTCUT)  # As delivered by the invalidation bus
+            self.assertEqual(redis_keys.generation(redis_keys.SHORTCUT), 1)
+
+    def test_upstream_purge_uses_tag_set(self):
+        with self.app.app_context():
+            utils.cache_upstream_result('a', 'corp', 'https://corp/a')
+            utils.cache_upstream_result('b', 'corp', 'https://corp/b')
+            utils.cache_upstream_result('c', 'public', 'https://public/c')
+            self.assertEqual(self.redis.smembers('v0:upstream_cache_tag:corp'), {'a', 'b'})
+            self.redis.scan_iter = None  # Purging must not scan
+
+            self.assertEqual(utils.purge_upstream_cache('corp'), 2)
+            self.assertEqual(UpstreamCache.query.count(), 1)
+        self.assertEqual(sorted(self.redis.keys('v0:upstream_cache:*')), ['v0:upstream_cache:c', 'v0:upstream_cache:c:public'])
+        self.assertEqual(json.loads(self.redis.get('v0:upstream_cache:c'))['resolved_url'], 'https://public/c')
+
+    def test_clear_without_upstream_removes_every_upstream_key(self):
+        with self.app.app_context():
+            utils.cache_upstream_result('a', 'corp', 'https://corp/a')
+            utils.cache_upstream_result('a', 'public', 'https://public/a')
+            utils.clear_upstream_cache('a')
+        self.assertEqual(self.redis.keys('v0:upstream_cache:*'), [])
+        self.assertEqual(self.redis.smembers('v0:upstream_cache_tag:corp'), set())
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
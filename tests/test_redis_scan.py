@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+import logging
+
+from app.utils import redis_scan
+
+try:
+    import fakeredis
+except ImportError:  # Optional test dependency
+    fakeredis = None
+
+logging.disable(logging.CRITICAL)
+
+
+@unittest.skipUnless(fakeredis, "fakeredis not installed")
+class TestRedisScan(unittest.TestCase):
+
+    def setUp(self):
+        self.client = fakeredis.FakeRedis(decode_responses=True)
+        for i in range(250):
+            self.client.set(f'shortcut:s{i}', f'https://example.org/{i}')
+        self.client.set('shortcut:long', 'x' * 1000, ex=60)
+        self.client.hset('shortcut:[hash]', mapping={'a': 1, 'b': 2})
+        self.client.zadd('upstream_miss_counts', {'p': 3})
+        self.client.set('other:app', 'keep')
+        self.client.keys = None  # Fails loudly if anything falls back to KEYS
+
+    def test_pages_cover_the_prefix(self):
+        seen, cursor = set(), 0
+        while True:
+            keys, cursor = redis_scan.scan_page(self.client, redis_scan.prefix_match('shortcut:'), cursor, count=40)
+            seen.update(keys)
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 252)
+        self.assertNotIn('other:app', seen)
+
+    def test_prefix_match_escapes_glob_characters(self):
+        keys, _ = redis_scan.scan_page(self.client, redis_scan.prefix_match('shortcut:[h'), count=1000)
+        self.assertEqual(keys, ['shortcut:[hash]'])
+
+    def test_describe_keys_is_pipelined(self):
+        keys = ['shortcut:s1', 'shortcut:long', 'shortcut:[hash]', 'upstream_miss_counts', 'gone']
+        with patch.object(redis_scan, 'MGET_BATCH_SIZE', 1):
+            rows = {row['key']: row for row in redis_scan.describe_keys(self.client, keys)}
+        self.assertEqual((rows['shortcut:s1']['type'], rows['shortcut:s1']['value'], rows['shortcut:s1']['ttl']),
+                         ('string', 'https://example.org/1', -1))
+        self.assertEqual(rows['shortcut:long']['size'], 1000)
+        self.assertEqual(len(rows['shortcut:long']['value']), redis_scan.VALUE_PREVIEW_CHARS + 1)
+        self.assertGreater(rows['shortcut:long']['ttl'], 0)
+        self.assertEqual((rows['shortcut:[hash]']['type'], rows['shortcut:[hash]']['size']), ('hash', 2))
+        self.assertEqual(rows['upstream_miss_counts']['size'], 1)
+        self.assertEqual((rows['gone']['type'], rows['gone']['ttl']), ('none', -2))
+        self.assertEqual(redis_scan.describe_keys(self.client, []), [])
+
+    def test_unlink_matching(self):
+        removed = redis_scan.unlink_matching(self.client, redis_scan.prefix_match('shortcut:'), batch_size=100)
+        self.assertEqual(removed, 252)
+        self.assertEqual(self.client.dbsize(), 2)
+        self.assertEqual(self.client.get('other:app'), 'keep')
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import logging
+from unittest.mock import patch
+
+from flask import Flask, render_template_string
+from sqlalchemy import text
+
+from model import db
+from app.config import config, ConfigSnapshot
+from app.utils import request_timing
+
+logging.disable(logging.CRITICAL)
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.secret_key = 'test'
+    db.init_app(app)
+    request_timing.init_app(app)
+
+    @app.route('/work')
+    def work():
+        db.session.execute(text('SELECT 1'))
+        db.session.execute(text('SELECT 2'))
+        with request_timing.phase('redis'):
+            pass
+        return render_template_string('{{ value }}', value='ok')
+
+    return app
+
+
+def phases(header):
+    return {part.split(';')[0]: part for part in header.split(', ')}
+
+
+class TestRequestTiming(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        patcher = patch.object(request_timing, 'get_profile_dir', return_value=self.dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.configure(server_timing=True)
+        self.app = make_app()
+        self.client = self.app.test_client()
+
+    def configure(self, **settings):
+        patcher = patch.object(config, 'snapshot', ConfigSnapshot.from_dict({'request_timing': settings}))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/work')
+        timing = phases(response.headers['Server-Timing'])
+        self.assertEqual(set(timing), {'db', 'redis', 'render', 'total'})
+        self.assertIn('desc="2 calls"', timing['db'])
+        self.assertIn('desc="1 call"', timing['render'])
+
+    def test_no_header_when_disabled(self):
+        self.configure(server_timing=False)
+        self.assertNotIn('Server-Timing', self.client.get('/work').headers)
+
+    def test_phase_is_a_no_op_outside_requests(self):
+        with request_timing.phase('db'):
+            pass
+        self.assertIsNone(request_timing.current())
+
+    def test_admin_profile_is_stored(self):
+        self.configure(server_timing=False)
+        self.assertNotIn('X-Profile-Id', self.client.get('/work?_profile=1').headers)  # Not an admin
+
+        with self.client.session_transaction() as s:
+            s['admin_logged_in'] = True
+        response = self.client.get('/work', headers={'X-Profile': '1'})
+        name = response.headers['X-Profile-Id']
+        self.assertIn('Server-Timing', response.headers)
+        self.assertEqual([p['name'] for p in request_timing.list_profiles()], [name])
+        self.assertIn('work', request_timing.format_profile(request_timing.profile_path(name)))
+
+    def test_old_profiles_are_pruned(self):
+        with self.client.session_transaction() as s:
+            s['admin_logged_in'] = True
+        with patch.object(request_timing, 'MAX_PROFILES', 2):
+            names = [self.client.get('/work?_profile=1').headers['X-Profile-Id'] for _ in range(4)]
+        self.assertEqual(sorted(os.listdir(self.dir)), sorted(names[2:]))
+
+    def test_overlapping_profiles_skip_the_second_request(self):
+        entered, release = threading.Event(), threading.Event()
+
+        @self.app.route('/slow')
+        def slow():
+            entered.set()
+            release.wait(5)
+            return 'ok'
+
+        with self.client.session_transaction() as s:
+            s['admin_logged_in'] = True
+        first = []
+        thread = threading.Thread(target=lambda: first.append(self.client.get('/slow?_profile=1')))
+        thread.start()
+        self.assertTrue(entered.wait(5))
+        try:
+            second = self.client.get('/work?_profile=1')
+        finally:
+            release.set()
+            thread.join(5)
+        self.assertEqual(second.status_code, 200)
+        self.assertNotIn('X-Profile-Id', second.headers)
+        self.assertIn('X-Profile-Skipped', second.headers)
+        self.assertIn('X-Profile-Id', first[0].headers)
+        self.assertIn('X-Profile-Id', self.client.get('/work?_profile=1').headers)  # The lock was released
+
+    def test_profiler_already_active_on_the_thread(self):
+        with self.client.session_transaction() as s:
+            s['admin_logged_in'] = True
+        with patch.object(request_timing.cProfile, 'Profile') as profile:
+            profile.return_value.enable.side_effect = ValueError('Another profiling tool is already active')
+            response = self.client.get('/work?_profile=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Profile-Skipped', response.headers)
+        self.assertIn('X-Profile-Id', self.client.get('/work?_profile=1').headers)
+
+    def test_profile_path_rejects_other_files(self):
+        for name in ('../redirect.config.json', 'x.txt', '', '..'):
+            with self.subTest(name=name):
+                self.assertIsNone(request_timing.profile_path(name))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,109 @@
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import logging
+
+import requests
+from flask import Flask
+
+from model import db
+from model.upstream_cache import UpstreamCache
+from app.config import config
+from app.utils import resync_jobs
+
+logging.disable(logging.CRITICAL)
+
+UPSTREAM = {'name': 'corp', 'base_url': 'https://go.corp/', 'fail_url': 'https://go.corp/notfound',
+            'fail_status_code': 404, 'pool_size': 4}
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            UpstreamCache(pattern=p, upstream_name=name, resolved_url=f'https://old/{p}', checked_at='2020-01-01')
+            for p in ('wiki', 'gone', 'slow', 'jira') for name in ('corp', 'other')
+        ])
+        db.session.commit()
+    return app
+
+
+def fake_fetch(up, pattern):
+    if pattern == 'gone':
+        return MagicMock(url='https://go.corp/notfound?q=gone', status_code=404)
+    if pattern == 'slow':
+        raise requests.exceptions.Timeout()
+    return MagicMock(url=f'https://new/{pattern}', status_code=200)
+
+
+class TestResyncJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.app = make_app()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for patcher in (patch.object(config, 'DATA_DIR', tmp.name),
+                        patch('app.utils.upstream_probe.fetch', side_effect=fake_fetch)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def cached(self, upstream_name):
+        with self.app.app_context():
+            return {e.pattern: e.resolved_url for e in UpstreamCache.query.filter_by(upstream_name=upstream_name)}
+
+    def test_job_updates_cache_in_batches(self):
+        job = resync_jobs.start_job(self.app, UPSTREAM, ['wiki', 'gone', 'slow', 'jira'], batch_size=3)
+        job.join(timeout=10)
+        self.assertEqual(job.status, 'finished')
+        self.assertEqual(job.concurrency, 4)
+        self.assertEqual((job.succeeded, job.failed), (2, 2))
+        self.assertEqual(self.cached('corp'), {'wiki': 'https://new/wiki', 'jira': 'https://new/jira'})
+        # Other upstreams' entries for the same patterns are untouched
+        self.assertEqual(len(self.cached('other')), 4)
+
+    def test_results_outlive_the_job(self):
+        job = resync_jobs.start_job(self.app, UPSTREAM, ['wiki', 'gone'])
+        job.join(timeout=10)
+        stored = resync_jobs.get_job(job.id)
+        self.assertEqual(stored['status'], 'finished')
+        self.assertEqual({r['pattern']: r['success'] for r in stored['results']}, {'wiki': True, 'gone': False})
+        self.assertEqual([j['job_id'] for j in resync_jobs.list_jobs('corp')], [job.id])
+        self.assertEqual(resync_jobs.list_jobs('other'), [])
+        self.assertIsNone(resync_jobs.get_job('../redirect.config'))
+
+    def test_results_are_appended_per_batch(self):
+        job = resync_jobs.start_job(self.app, UPSTREAM, ['wiki', 'gone', 'slow', 'jira'], batch_size=3)
+        with patch.object(resync_jobs, '_append_results', wraps=resync_jobs._append_results) as append:
+            job.join(timeout=10)
+        self.assertEqual([len(c.args[1]) for c in append.call_args_list], [3, 1])
+        with open(resync_jobs._summary_path(job.id)) as f:
+            self.assertNotIn('results', f.read())  # The summary stays small however many patterns there are
+        self.assertEqual(len(resync_jobs.get_job(job.id)['results']), 4)
+
+
+class TestResyncAllRoute(unittest.TestCase):
+
+    def test_post_returns_job_id_without_waiting(self):
+        from app.routes import upstream_routes
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.register_blueprint(upstream_routes.bp)
+        job = MagicMock(id='1-abc', patterns=['wiki', 'jira'])
+        with patch.object(upstream_routes, '_find_upstream', return_value=UPSTREAM), \
+                patch.object(upstream_routes, '_start_resync_job', return_value=job):
+            client = app.test_client()
+            with client.session_transaction() as s:
+                s['admin_logged_in'] = True
+            response = client.post('/admin/upstream-cache/resync-all/corp')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()['job_id'], '1-abc')
+        self.assertEqual(response.get_json()['status_url'], '/admin/upstream-cache/resync-jobs/1-abc')
+        job.join.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,155 @@
+import json
+import unittest
+from unittest.mock import patch
+import logging
+
+from flask import Flask
+
+from model import db
+from model.redirect import Redirect
+from app.config import config
+from app.utils import invalidation, shortcut_record, utils
+
+try:
+    import fakeredis
+except ImportError:  # Optional test dependency
+    fakeredis = None
+
+logging.disable(logging.CRITICAL)
+
+
+class TestShortcutRecord(unittest.TestCase):
+
+    def test_round_trip(self):
+        for type_, target in (('static', 'https://example.org/ü?q=1'), ('dynamic', 'https://x/{id}')):
+            record = shortcut_record.encode(type_, target)
+            self.assertEqual(len(record), 2 + len(target.encode('utf-8')))
+            shortcut, needs_upgrade = shortcut_record.decode('p', record)
+            template = shortcut.pop('template', None)
+            self.assertEqual(shortcut, {'pattern': 'p', 'type': type_, 'target': target, 'data_type': type_})
+            self.assertEqual(template.source if template else None, target if type_ == 'dynamic' else None)
+            self.assertFalse(needs_upgrade)
+        self.assertIsNone(shortcut_record.encode('weird', 'https://x'))
+
+    def test_legacy_json_is_flagged_for_upgrade(self):
+        legacy = json.dumps({'pattern': 'p', 'type': 'static', 'target': 'https://x', 'access_count': 3,
+                             'created_at': '2025-01-01 00:00:00', 'data_type': 'static'}).encode()
+        shortcut, needs_upgrade = shortcut_record.decode('p', legacy)
+        self.assertEqual(shortcut['target'], 'https://x')
+        self.assertTrue(needs_upgrade)
+
+    def test_unreadable_records(self):
+        for raw in (b'', b'\x01', b'\x09\x00https://x', b'\x01\x07https://x', b'\x01\x00\xff', b'{"type": 1'):
+            with self.subTest(raw=raw), self.assertRaises(shortcut_record.RecordFormatError):
+                shortcut_record.decode('p', raw)
+
+
+@unittest.skipUnless(fakeredis, "fakeredis not installed")
+class TestShortcutRecordCache(unittest.TestCase):
+
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+        self.binary = fakeredis.FakeRedis(server=server)
+        for patcher in (patch.object(config, 'redis_client', self.redis),
+                        patch.object(config, 'redis_binary_client', self.binary),
+                        patch.object(config, 'redis_enabled', True),
+                        patch('app.utils.invalidation.publish')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Redirect(pattern='docs', type='static', target='https://docs.example'))
+            db.session.commit()
+        self.key = utils.shortcut_redis_key('docs')
+
+    def test_db_hit_hydrates_binary_record(self):
+        with self.app.app_context():
+            shortcut, source = utils._get_shortcut_uncached('docs')
+        self.assertEqual(shortcut['target'], 'https://docs.example')
+        self.assertEqual(self.binary.get(self.key), b'\x01\x00https://docs.example')
+        self.assertGreater(self.binary.ttl(self.key), 0)
+        with self.app.app_context():
+            self.assertEqual(utils._get_shortcut_uncached('docs'), (shortcut, utils.CONSTANTS.data_source_redis))
+
+    def test_legacy_record_is_upgraded_on_read(self):
+        self.redis.set(self.key, json.dumps({'pattern': 'docs', 'type': 'static', 'target': 'https://old.example'}))
+        with self.app.app_context():
+            shortcut, source = utils._get_shortcut_uncached('docs')
+        self.assertEqual((shortcut['target'], source), ('https://old.example', utils.CONSTANTS.data_source_redis))
+        self.assertEqual(self.binary.get(self.key)[:1], b'\x01')
+
+    def test_corrupt_record_falls_back_to_db(self):
+        self.binary.set(self.key, b'\x7f\x00garbage')
+        with self.app.app_context():
+            shortcut, source = utils._get_shortcut_uncached('docs')
+        self.assertEqual((shortcut['target'], source), ('https://docs.example', utils.CONSTANTS.data_source_redirect))
+
+    def test_local_invalidation_follows_the_redis_write(self):
+        # Another worker re-reads the shortcut as soon as it is told to drop its local copy
+        seen = []
+
+        def remote_read(topic, key):
+            if topic == 'shortcut':
+                seen.append(utils._get_shortcut_uncached(key)[0])
+
+        with self.app.app_context():
+            utils._get_shortcut_uncached('docs')  # Redis now holds the old record
+            with patch('app.utils.invalidation.publish', side_effect=remote_read):
+                utils.set_shortcut('docs', 'static', 'https://new.example')
+                utils.deleteShortCut('docs')
+        self.assertEqual(seen[0]['target'], 'https://new.example')
+        self.assertIsNone(seen[1])
+
+    def test_upstream_cache_invalidation_follows_the_redis_write(self):
+        seen = []
+
+        def remote_read(topic, key):
+            if topic == 'shortcut':
+                seen.append(utils.get_cached_upstream_result(key)['resolved_url'])
+
+        with self.app.app_context():
+            utils.cache_upstream_result('up', 'corp', 'https://old.example')
+            with patch('app.utils.invalidation.publish', side_effect=remote_read):
+                utils.cache_upstream_result('up', 'corp', 'https://new.example')
+        self.assertEqual(seen, ['https://new.example'])
+
+    def test_upstream_batch_invalidation_follows_the_redis_write(self):
+        seen = {}
+
+        def remote_read(topic, key):
+            if topic == 'shortcut':
+                result = utils.get_cached_upstream_result(key)
+                seen[key] = result['resolved_url'] if result else None
+
+        with self.app.app_context():
+            utils.cache_upstream_result('up', 'corp', 'https://old.example')
+            utils.cache_upstream_result('gone', 'corp', 'https://gone.example')
+            with patch('app.utils.invalidation.publish', side_effect=remote_read):
+                utils.apply_upstream_cache_batch('corp', [('up', 'https://new.example', '2025-01-01T00:00:00')],
+                                                 ['gone'])
+        self.assertEqual(seen, {'up': 'https://new.example', 'gone': None})
+
+    def test_import_invalidation_follows_the_generation_bump(self):
+        seen = []
+
+        def remote_read(topic, key):
+            invalidation._dispatch(topic, key)  # Delivered in publish order, generation first
+            if topic == 'shortcut':
+                seen.append(utils._get_shortcut_uncached('docs')[0])
+
+        with self.app.app_context():
+            utils._get_shortcut_uncached('docs')  # Pre-import record cached in the current generation
+            Redirect.query.filter_by(pattern='docs').update({'target': 'https://imported.example'})
+            db.session.commit()
+            with patch('app.utils.invalidation.publish', side_effect=remote_read):
+                utils._clear_shortcut_caches_after_import()
+        self.assertEqual([s['target'] for s in seen], ['https://imported.example'])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
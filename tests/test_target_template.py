@@ -0,0 +1,38 @@
+import unittest
+import logging
+
+from app.utils.target_template import TargetTemplate, compile_template
+
+logging.disable(logging.CRITICAL)
+
+
+class TestTargetTemplate(unittest.TestCase):
+
+    def test_single_placeholder_takes_whole_path(self):
+        template = TargetTemplate('https://issues.example/browse/{id}?src=r')
+        self.assertEqual(template.expand('PROJ-1'), 'https://issues.example/browse/PROJ-1?src=r')
+        self.assertEqual(template.expand('a/b'), 'https://issues.example/browse/a/b?src=r')
+        # Backslashes and group references in the value are copied literally
+        self.assertEqual(template.expand(r'\1'), r'https://issues.example/browse/\1?src=r')
+
+    def test_named_placeholders_take_segments_in_order(self):
+        template = TargetTemplate('https://jira/{project}/issues/{id}?p={project}')
+        self.assertEqual(template.names, ('project', 'id'))
+        self.assertEqual(template.placeholders, ('project', 'id', 'project'))
+        self.assertEqual(template.expand('PROJ/123'), 'https://jira/PROJ/issues/123?p=PROJ')
+        self.assertEqual(template.expand('PROJ/123/comments'), 'https://jira/PROJ/issues/123/comments?p=PROJ')
+        # Too few segments: every placeholder gets the whole path, as before
+        self.assertEqual(template.expand('PROJ'), 'https://jira/PROJ/issues/PROJ?p=PROJ')
+
+    def test_positional_placeholders(self):
+        self.assertEqual(TargetTemplate('https://x/{1}/{0}').expand('a/b'), 'https://x/b/a')
+        self.assertEqual(TargetTemplate('https://x/{0}').expand('a/b'), 'https://x/a/b')
+
+    def test_fill_and_literals(self):
+        self.assertEqual(TargetTemplate('{a}-{b}').fill('v'), 'v-v')
+        self.assertEqual(TargetTemplate('https://static').expand('x'), 'https://static')
+        self.assertIs(compile_template('https://x/{id}'), compile_template('https://x/{id}'))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
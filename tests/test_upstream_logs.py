@@ -0,0 +1,77 @@
+import unittest
+import logging
+
+from flask import Flask
+from sqlalchemy import select, text
+
+from model import db
+from model.upstream_check_log import UpstreamCheckLog
+from app.utils import upstream_logs
+
+logging.disable(logging.CRITICAL)
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            UpstreamCheckLog(pattern=f'go{i:02d}', upstream_name='corp' if i % 2 else 'public',
+                             result='success' if i % 3 else 'fail',
+                             detail=f'actual_url=https://x/{i}, status_code=302' if i % 3 else 'status_code=404',
+                             # Pairs of rows share a timestamp so ties are broken by id
+                             tried_at=f'2025-01-01T00:00:{i // 2:02d}+00:00')
+            for i in range(30)
+        ])
+        db.session.commit()
+    return app
+
+
+class TestUpstreamLogs(unittest.TestCase):
+
+    def setUp(self):
+        self.app = make_app()
+
+    def pages(self, **filters):
+        logs, cursor = [], None
+        with self.app.app_context():
+            while True:
+                page = upstream_logs.get_logs_page(limit=7, cursor=cursor, **filters)
+                logs.extend(page['logs'])
+                cursor = page['next_cursor']
+                if not cursor:
+                    return logs
+
+    def test_pages_cover_every_log_newest_first(self):
+        logs = self.pages()
+        self.assertEqual([log['shortcut'] for log in logs], [f'go{i:02d}' for i in reversed(range(30))])
+        self.assertEqual((logs[0]['status_code'], logs[0]['actual_url']), ('302', 'https://x/29'))
+        self.assertEqual(logs[-1]['status_code'], '404')
+
+    def test_filters(self):
+        self.assertEqual(len(self.pages(upstream='corp')), 15)
+        self.assertTrue(all(log['result'] == 'fail' for log in self.pages(result='FAIL')))
+        self.assertEqual([log['shortcut'] for log in self.pages(pattern='go1')], [f'go{i}' for i in range(19, 9, -1)])
+        self.assertEqual(self.pages(pattern='go1', upstream='corp', result='fail'),
+                         self.pages(pattern='go15'))
+
+    def test_bad_cursor(self):
+        with self.app.app_context():
+            for cursor in ('garbage', upstream_logs.encode_cursor(1, 'x')):
+                with self.assertRaises(ValueError):
+                    upstream_logs.get_logs_page(cursor=cursor)
+
+    def test_unfiltered_page_uses_index(self):
+        stmt = select(UpstreamCheckLog).order_by(UpstreamCheckLog.tried_at.desc(), UpstreamCheckLog.id.desc()).limit(5)
+        with self.app.app_context():
+            sql = str(stmt.compile(db.engine, compile_kwargs={'literal_binds': True}))
+            plan = ' '.join(str(row) for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')))
+        self.assertIn('ix_upstream_check_log_tried_at_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
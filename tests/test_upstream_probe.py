@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import logging
+
+import gevent
+import requests
+from flask import Flask
+
+from app.routes import upstream_routes
+from app.utils import upstream_probe
+
+logging.disable(logging.CRITICAL)
+
+UPSTREAM = {'name': 'corp', 'base_url': 'https://go.corp/', 'fail_url': 'https://go.corp/notfound',
+            'fail_status_code': 404, 'verify_ssl': False}
+
+
+class TestUpstreamProbe(unittest.TestCase):
+
+    @patch('app.utils.upstream_probe.fetch')
+    def test_probe_success(self, mock_fetch):
+        mock_fetch.return_value = MagicMock(url='https://wiki.corp/page', status_code=200)
+        outcome = upstream_probe.probe_upstream(UPSTREAM, 'wiki')
+        self.assertEqual(outcome['result'], 'success')
+        self.assertEqual(outcome['check_url'], 'https://go.corp/wiki')
+        self.assertEqual(outcome['actual_url'], 'https://wiki.corp/page')
+
+    @patch('app.utils.upstream_probe.fetch')
+    def test_probe_fail_criteria(self, mock_fetch):
+        mock_fetch.return_value = MagicMock(url='https://go.corp/notfound?q=wiki', status_code=404)
+        self.assertEqual(upstream_probe.probe_upstream(UPSTREAM, 'wiki')['result'], 'fail')
+
+    @patch('app.utils.upstream_probe.fetch', side_effect=requests.exceptions.Timeout())
+    def test_probe_timeout(self, mock_fetch):
+        self.assertEqual(upstream_probe.probe_upstream(UPSTREAM, 'wiki')['result'], 'timeout')
+
+    def test_probe_skips_upstream_without_base_url(self):
+        self.assertEqual(upstream_probe.probe_upstream({'name': 'empty'}, 'wiki')['result'], 'skipped')
+
+    def test_sessions_are_pooled_per_upstream_and_reset(self):
+        upstream_probe.reset_sessions()
+        session = upstream_probe.get_session(UPSTREAM)
+        self.assertIs(upstream_probe.get_session(dict(UPSTREAM)), session)
+        self.assertIsNot(upstream_probe.get_session(dict(UPSTREAM, name='other')), session)
+        upstream_probe.reset_sessions()
+        self.assertIsNot(upstream_probe.get_session(UPSTREAM), session)
+
+    def test_timeouts_from_upstream_config(self):
+        self.assertEqual(upstream_probe.get_timeout(UPSTREAM),
+                         (upstream_probe.DEFAULT_CONNECT_TIMEOUT, upstream_probe.DEFAULT_READ_TIMEOUT))
+        self.assertEqual(upstream_probe.get_timeout(dict(UPSTREAM, connect_timeout=1, read_timeout=2.5)), (1.0, 2.5))
+
+    def test_pick_winner_respects_priority(self):
+        success, fail = {'result': 'success'}, {'result': 'fail'}
+        # A lower-priority success waits for the higher-priority upstream to finish
+        self.assertIsNone(upstream_probe.pick_winner({1: success}, 3))
+        self.assertEqual(upstream_probe.pick_winner({0: fail, 1: success}, 3), 1)
+        self.assertEqual(upstream_probe.pick_winner({0: success, 1: success}, 3), 0)
+        self.assertIsNone(upstream_probe.pick_winner({0: fail, 1: fail, 2: fail}, 3))
+
+
+
+def outcome(name, result, delay=0):
+    def probe():
+        gevent.sleep(delay)
+        return {'upstream': name, 'result': result, 'check_url': f'https://{name}/wiki', 'detail': result,
+                'actual_url': f'https://{name}/page', 'status_code': 200, 'elapsed': delay}
+    return probe
+
+
+class TestUpstreamCheckStream(unittest.TestCase):
+
+    def send_log(self, message, extra_data=None):
+        self.messages.append(message)
+        yield message
+
+    def setUp(self):
+        self.messages = []
+        for patcher in (patch('app.utils.utils.log_upstream_check'),
+                        patch('app.utils.utils.is_upstream_cache_enabled', return_value=False)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_passed_over_success_is_logged(self):
+        probes = {'first': outcome('first', 'success', delay=0.05), 'second': outcome('second', 'success')}
+        upstreams = [{'name': 'first', 'base_url': 'https://first'}, {'name': 'second', 'base_url': 'https://second'}]
+        with patch.object(upstream_probe, 'probe_upstream', side_effect=lambda up, pattern: probes[up['name']]()):
+            check = upstream_routes._check_upstreams_parallel('wiki', upstreams, self.send_log)
+            with self.assertRaises(StopIteration) as done:
+                while True:
+                    next(check)
+        self.assertEqual(done.exception.value[0], 'https://first/page')
+        logged = [(c.kwargs['upstream_name'], c.kwargs['result'], c.kwargs['cached'])
+                  for c in upstream_routes.utils.log_upstream_check.call_args_list]
+        self.assertEqual(logged, [('first', 'success', False), ('second', 'success', False)])
+
+    def test_unknown_mode_uses_the_configured_one(self):
+        app = Flask(__name__)
+        app.register_blueprint(upstream_routes.bp)
+
+        def check(pattern, upstreams, send_log):
+            return None, []
+            yield
+
+        with patch.object(upstream_routes.negative_cache, 'is_known_miss', return_value=False), \
+                patch('app.utils.utils.get_upstreams', return_value=[]), \
+                patch('app.utils.utils.get_upstream_check_mode', return_value='parallel'), \
+                patch.object(upstream_routes, '_check_upstreams_sequential', side_effect=check) as sequential, \
+                patch.object(upstream_routes, '_check_upstreams_parallel', side_effect=check) as parallel:
+            for mode, expected in (('bogus', parallel), ('sequential', sequential), ('', parallel)):
+                with self.subTest(mode=mode):
+                    sequential.reset_mock()
+                    parallel.reset_mock()
+                    app.test_client().get(f'/stream/check-upstreams/wiki?mode={mode}').get_data()
+                    self.assertEqual(expected.call_count, 1)
+                    self.assertEqual(sequential.call_count + parallel.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
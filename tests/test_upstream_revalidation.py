@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta, timezone
+import logging
+
+from flask import Flask
+
+from model import db
+from model.upstream_cache import UpstreamCache
+from app.utils import upstream_revalidation
+
+logging.disable(logging.CRITICAL)
+
+UPSTREAM = {'name': 'corp', 'base_url': 'https://go.corp/', 'fail_url': 'https://go.corp/notfound',
+            'fail_status_code': 404, 'freshness_seconds': 3600}
+
+
+def make_app(checked_at):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(UpstreamCache(pattern='wiki', upstream_name='corp', resolved_url='https://old/wiki',
+                                     checked_at=checked_at))
+        db.session.commit()
+    return app
+
+
+def ago(**kwargs):
+    return (datetime.now(timezone.utc) - timedelta(**kwargs)).isoformat()
+
+
+class TestUpstreamRevalidation(unittest.TestCase):
+
+    def setUp(self):
+        upstream_revalidation._last_attempt.clear()
+        upstream_revalidation._inflight.clear()
+        patcher = patch('app.utils.utils.get_upstreams', return_value=[UPSTREAM])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_is_stale(self):
+        self.assertFalse(upstream_revalidation.is_stale({'checked_at': ago(minutes=5)}, UPSTREAM))
+        self.assertTrue(upstream_revalidation.is_stale({'checked_at': ago(hours=2)}, UPSTREAM))
+        # Naive timestamps (written by resync) are UTC
+        naive = (datetime.utcnow() - timedelta(hours=2)).isoformat(sep=' ', timespec='seconds')
+        self.assertTrue(upstream_revalidation.is_stale({'checked_at': naive}, UPSTREAM))
+        self.assertTrue(upstream_revalidation.is_stale({'checked_at': 'garbage'}, UPSTREAM))
+        self.assertFalse(upstream_revalidation.is_stale({'checked_at': ago(days=30)}, dict(UPSTREAM, freshness_seconds=0)))
+
+    def _run(self, app, fetch_result):
+        entry = {'pattern': 'wiki', 'upstream_name': 'corp', 'checked_at': ago(hours=2)}
+        with patch('app.utils.upstream_probe.fetch', return_value=fetch_result), \
+                patch('app.utils.upstream_revalidation.gevent.spawn', side_effect=lambda f, *a: f(*a)):
+            with app.app_context():
+                started = upstream_revalidation.revalidate_if_stale('wiki', entry)
+                # A second request within the retry interval does not start another check
+                self.assertFalse(upstream_revalidation.revalidate_if_stale('wiki', entry))
+        return started
+
+    def test_stale_entry_is_refreshed(self):
+        app = make_app(ago(hours=2))
+        self.assertTrue(self._run(app, MagicMock(url='https://new/wiki', status_code=200)))
+        with app.app_context():
+            entry = UpstreamCache.query.filter_by(pattern='wiki').one()
+            self.assertEqual(entry.resolved_url, 'https://new/wiki')
+            self.assertLess(upstream_revalidation.get_age_seconds(entry.checked_at), 60)
+
+    def test_entry_gone_upstream_is_removed(self):
+        app = make_app(ago(hours=2))
+        self.assertTrue(self._run(app, MagicMock(url='https://go.corp/notfound', status_code=404)))
+        with app.app_context():
+            self.assertEqual(UpstreamCache.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
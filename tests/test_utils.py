@@ -27,9 +27,8 @@ class TestUtils(unittest.TestCase):
 
 
 
-    @patch(f'{UTILS_MODULE_PATH}._save_config')
     @patch(f'{UTILS_MODULE_PATH}.config')
-    def test_get_config_key_exists(self, mock_config_module, mock_save_config):
+    def test_get_config_key_exists(self, mock_config_module):
         """Test get_config when key exists."""
         mock_config_module.get_configuration.return_value = {"existing_key": "existing_value"}
 
@@ -37,34 +36,28 @@ class TestUtils(unittest.TestCase):
 
         self.assertEqual(result, "existing_value")
         mock_config_module.get_configuration.assert_called_once()
-        mock_save_config.assert_not_called()
+        mock_config_module.save_values.assert_not_called()
 
-    @patch(f'{UTILS_MODULE_PATH}._save_config')
     @patch(f'{UTILS_MODULE_PATH}.config')
-    def test_get_config_key_not_exists_sets_default(self, mock_config_module, mock_save_config):
-        """Test get_config when key does not exist, sets default and saves."""
+    def test_get_config_key_not_exists_returns_default(self, mock_config_module):
+        """Test get_config when key does not exist returns the default without writing the config."""
         current_config = {}
         mock_config_module.get_configuration.return_value = current_config
 
         result = utils.get_config("new_key", "default_value")
 
         self.assertEqual(result, "default_value")
-        self.assertEqual(current_config["new_key"], "default_value")
+        self.assertNotIn("new_key", current_config)
         mock_config_module.get_configuration.assert_called_once()
-        mock_save_config.assert_called_once()
+        mock_config_module.save_values.assert_not_called()
+        mock_config_module.save.assert_not_called()
 
-    @patch(f'{UTILS_MODULE_PATH}._save_config')
     @patch(f'{UTILS_MODULE_PATH}.config')
-    def test_set_config(self, mock_config_module, mock_save_config):
-        """Test set_config sets key and saves."""
-        current_config = {}
-        mock_config_module.get_configuration.return_value = current_config
-
+    def test_set_config(self, mock_config_module):
+        """Test set_config saves the key through the config object."""
         utils.set_config("another_key", "another_value")
 
-        self.assertEqual(current_config["another_key"], "another_value")
-        mock_config_module.get_configuration.assert_called_once()
-        mock_save_config.assert_called_once()
+        mock_config_module.save_values.assert_called_once_with({"another_key": "another_value"})
 
 
 
@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import logging
+
+from app import version
+
+logging.disable(logging.CRITICAL)
+
+BAKED = {'semver': '2.3.0', 'build': '2.3.0+0.gabc1234', 'commit_count': '120', 'commit_hash': 'abc1234',
+         'commit_date': '2025-01-01'}
+
+
+class TestVersion(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.multiple(version, _info=None, _refresh_interval=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_baked_version_file_is_used_without_git(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, '_version.json')
+            with open(path, 'w') as f:
+                json.dump(BAKED, f)
+            with patch.object(version, 'VERSION_FILE', path), \
+                    patch('app.version.subprocess.check_output') as mock_git:
+                self.assertEqual(version.get_semver(), '2.3.0')
+                self.assertEqual(version.get_version_info()['build'], '2.3.0+0.gabc1234')
+                mock_git.assert_not_called()
+
+    def test_git_runs_once(self):
+        with patch.object(version, 'load_version_file', return_value=None), \
+                patch('app.version.subprocess.check_output', return_value='v1.4.2-3-gdeadbee') as mock_git:
+            self.assertEqual(version.get_semver(), '1.4.2+3.gdeadbee')
+            calls = mock_git.call_count
+            for _ in range(5):
+                version.get_version_info()
+            self.assertEqual(mock_git.call_count, calls)
+
+    def test_write_version_file(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch('app.version.subprocess.check_output', return_value='v1.4.2-0-gdeadbee'):
+            path = os.path.join(tmp, '_version.json')
+            info = version.write_version_file(path)
+            self.assertEqual(info['semver'], '1.4.2')
+            self.assertEqual(version.load_version_file(path), info)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)